@@ -0,0 +1,132 @@
+"""
+Benchmark of utils.status_counter_for_transactions.
+
+Compares the vectorized status bucketing with the previous implementation, which
+resampled every column of the statistics DataFrame. Run from the backend directory:
+
+    PYTHONPATH=src python perf_tests/status_counter_benchmark.py
+"""
+
+import argparse
+import timeit
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from utils import (
+    GetTransactionStatusStatisticsSchema,
+    pandas_period_from_string,
+    statistics_dataframe,
+    status_counter_for_transactions,
+)
+
+DATE_FROM = datetime(2024, 1, 1)
+DATE_TO = datetime(2024, 12, 31, 23, 59, 59)
+
+
+def resampled_status_counter(transactions, period, date_from=None, date_to=None):
+    """The resample based implementation replaced by the vectorized one."""
+    df = transactions.assign(status_code=transactions["status_code"] // 100 * 100)
+    for code in (200, 300, 400, 500):
+        df[f"status_{code}"] = df["total_transactions"].where(
+            df["status_code"] == code, 0
+        )
+    df.set_index("date", inplace=True)
+    boundaries = [pd.Timestamp(str(date)) for date in (date_from, date_to) if date]
+    if boundaries:
+        df = pd.concat(
+            [df, pd.DataFrame(index=pd.DatetimeIndex(boundaries, name="date"))]
+        )
+    result = df.resample(pandas_period_from_string(period)).agg(
+        {
+            "project_id": "first",
+            "provider": "first",
+            "model": "first",
+            "total_input_tokens": "sum",
+            "total_output_tokens": "sum",
+            "total_input_cost": "sum",
+            "total_output_cost": "sum",
+            "total_cost": "sum",
+            "status_200": "sum",
+            "status_300": "sum",
+            "status_400": "sum",
+            "status_500": "sum",
+            "latency": "sum",
+            "total_transactions": "sum",
+            "generation_speed": "sum",
+        }
+    )
+    return [
+        GetTransactionStatusStatisticsSchema(
+            date=data["date"],
+            status_200=data["status_200"],
+            status_300=data["status_300"],
+            status_400=data["status_400"],
+            status_500=data["status_500"],
+            total_transactions=data["total_transactions"],
+        )
+        for data in result.reset_index().to_dict(orient="records")
+    ]
+
+
+def random_transactions(rows: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    seconds = int((DATE_TO - DATE_FROM).total_seconds())
+    return statistics_dataframe(
+        {
+            "project_id": "project-test",
+            "provider": rng.choice(["OpenAI", "Azure OpenAI"], rows),
+            "model": rng.choice(["gpt-4o", "gpt-4o-mini", "gpt-3.5-turbo"], rows),
+            "status_code": rng.choice([200, 201, 301, 404, 429, 500, 503], rows),
+            "date": pd.Timestamp("2024-01-02 08:00")
+            + pd.to_timedelta(rng.integers(0, seconds // 2, rows), unit="s"),
+            "total_input_tokens": rng.integers(10, 1000, rows),
+            "total_output_tokens": rng.integers(10, 1000, rows),
+            "total_input_cost": 0.0,
+            "total_output_cost": 0.0,
+            "total_cost": rng.random(rows),
+            "latency": rng.random(rows),
+            "generation_speed": rng.random(rows),
+            "total_transactions": 1,
+        }
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--periods", nargs="+", default=["day", "week", "month"])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(
+        f"{'rows':>10} {'period':>8} {'resample [s]':>13} {'vectorized [s]':>15} {'speedup':>8}"
+    )
+    for rows in args.rows:
+        transactions = random_transactions(rows)
+        for period in args.periods:
+            call_args = (transactions, period, DATE_FROM, DATE_TO)
+            assert resampled_status_counter(*call_args) == (
+                status_counter_for_transactions(*call_args)
+            ), f"Different statistics for {rows} rows and period {period}"
+            old = min(
+                timeit.repeat(
+                    lambda: resampled_status_counter(*call_args),
+                    number=1,
+                    repeat=args.repeat,
+                )
+            )
+            new = min(
+                timeit.repeat(
+                    lambda: status_counter_for_transactions(*call_args),
+                    number=1,
+                    repeat=args.repeat,
+                )
+            )
+            print(
+                f"{rows:>10} {period:>8} {old:>13.3f} {new:>15.3f} {old / new:>7.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Benchmark of the middleware stack on streamed responses.
+
+Compares the chunk throughput of a StreamingResponse passing through the pure ASGI
+middlewares from app.middleware with the previous @app.middleware functions, which
+are wrapped by Starlette's BaseHTTPMiddleware. Run from the backend directory:
+
+    PYTHONPATH=src python perf_tests/streaming_middleware_benchmark.py
+"""
+
+import argparse
+import asyncio
+import time
+
+from app.app import container
+from app.middleware import ExceptionHandlerMiddleware, TransactionContextMiddleware
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+
+def base_http_middleware_app(chunks: int, chunk_size: int) -> FastAPI:
+    """An application with the replaced @app.middleware functions."""
+    app = streaming_app(chunks, chunk_size)
+
+    @app.middleware("exception_handler")
+    async def exception_handler(request: Request, call_next):
+        try:
+            return await call_next(request)
+        except Exception:
+            return JSONResponse(status_code=500, content={})
+
+    @app.middleware("transaction_context")
+    async def transaction_context(request: Request, call_next):
+        ctx = request.app.container.application().transaction_context()
+        request.state.transaction_context = ctx
+        ctx.__enter__()
+        response = await call_next(request)
+        ctx.__exit__(None, None, None)
+        return response
+
+    return app
+
+
+def asgi_middleware_app(chunks: int, chunk_size: int) -> FastAPI:
+    """An application with the pure ASGI middlewares."""
+    app = streaming_app(chunks, chunk_size)
+    app.add_middleware(ExceptionHandlerMiddleware)
+    app.add_middleware(TransactionContextMiddleware)
+    return app
+
+
+def streaming_app(chunks: int, chunk_size: int) -> FastAPI:
+    app = FastAPI()
+    app.container = container
+    chunk = b"x" * chunk_size
+
+    @app.get("/stream")
+    async def stream():
+        async def iterate():
+            for _ in range(chunks):
+                yield chunk
+
+        return StreamingResponse(iterate(), media_type="text/event-stream")
+
+    return app
+
+
+async def stream_once(app: FastAPI) -> int:
+    """Send a request directly to the ASGI app and count the received chunks."""
+    received = 0
+    request_sent = False
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/stream",
+        "raw_path": b"/stream",
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"host", b"benchmark")],
+        "client": ("127.0.0.1", 1),
+        "server": ("benchmark", 80),
+    }
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await asyncio.Event().wait()
+
+    async def send(message):
+        nonlocal received
+        if message["type"] == "http.response.body" and message.get("body"):
+            received += 1
+
+    await app(scope, receive, send)
+    return received
+
+
+async def measure(app: FastAPI, chunks: int, repeat: int) -> float:
+    """Return the best throughput in chunks per second."""
+    await stream_once(app)
+    best = 0.0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        received = await stream_once(app)
+        elapsed = time.perf_counter() - start
+        assert received == chunks, f"Received {received} of {chunks} chunks"
+        best = max(best, received / elapsed)
+    return best
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--chunks", type=int, nargs="+", default=[1_000, 10_000])
+    parser.add_argument("--chunk-size", type=int, default=64)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(
+        f"{'chunks':>8} {'BaseHTTPMiddleware [chunk/s]':>29} {'ASGI [chunk/s]':>15} {'speedup':>8}"
+    )
+    for chunks in args.chunks:
+        old = await measure(
+            base_http_middleware_app(chunks, args.chunk_size), chunks, args.repeat
+        )
+        new = await measure(
+            asgi_middleware_app(chunks, args.chunk_size), chunks, args.repeat
+        )
+        print(f"{chunks:>8} {old:>29,.0f} {new:>15,.0f} {new / old:>7.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,136 @@
+"""
+Benchmark of the per-request dependency injection overhead.
+
+Compares creating transaction contexts backed by the TransactionContainer shared by the
+worker with the previous implementation, which built a new TransactionContainer and
+resolved types with inspect.getmembers for every context. No database is needed, the
+repositories are created but not used. Run from the backend directory:
+
+    PYTHONPATH=src python perf_tests/transaction_context_benchmark.py
+"""
+
+import argparse
+import copy
+import inspect
+import timeit
+import uuid
+
+from app.app import container
+from app.logging import logger
+from config.containers import TransactionContainer, create_application
+from dependency_injector import providers
+from dependency_injector.providers import Dependency, Factory, Singleton
+from lato import DependencyProvider, TransactionContext
+from projects.repositories import ProjectRepository
+from seedwork.cache import ResponseCache
+from transactions.repositories import TransactionRepository
+
+
+class RebuiltContainerProvider(DependencyProvider):
+    """The replaced provider resolving types by inspecting the whole container."""
+
+    def __init__(self, container):
+        self.container = container
+        self.counter = 0
+
+    def resolve_provider_by_type(self, cls):
+        def inspect_provider(provider) -> bool:
+            if isinstance(provider, (Factory, Singleton)):
+                return issubclass(provider.cls, cls)
+            elif isinstance(provider, Dependency):
+                return issubclass(provider.instance_of, cls)
+            return False
+
+        matching_providers = inspect.getmembers(self.container, inspect_provider)
+        return matching_providers[0][1] if matching_providers else None
+
+    def has_dependency(self, identifier) -> bool:
+        if isinstance(identifier, type) and self.resolve_provider_by_type(identifier):
+            return True
+        if type(identifier) is str:
+            return identifier in self.container.providers
+
+    def register_dependency(self, identifier, dependency_instance):
+        pr = providers.Object(dependency_instance)
+        try:
+            setattr(self.container, identifier, pr)
+        except TypeError:
+            setattr(self.container, f"{str(identifier)}-{self.counter}", pr)
+            self.counter += 1
+
+    def get_dependency(self, identifier):
+        if isinstance(identifier, type):
+            provider = self.resolve_provider_by_type(identifier)
+        else:
+            provider = getattr(self.container, identifier)
+        return provider()
+
+    def copy(self, *args, **kwargs):
+        dp = RebuiltContainerProvider(copy.copy(self.container))
+        dp.update(*args, **kwargs)
+        return dp
+
+
+def rebuilding_application():
+    """An application building a new TransactionContainer for every transaction context."""
+    application = create_application(container)
+
+    @application.on_create_transaction_context
+    def on_create_transaction_context():
+        transaction_level_container = TransactionContainer(
+            logger=logger,
+            db_client=container.db_client,
+            async_db_client=container.async_db_client,
+            response_cache=container.response_cache,
+            app=application,
+        )
+        transaction_level_container.correlation_id = providers.Object(uuid.uuid4())
+        return TransactionContext(
+            dependency_provider=RebuiltContainerProvider(transaction_level_container)
+        )
+
+    return application
+
+
+def use_case(
+    transaction_repository: TransactionRepository,
+    project_repository: ProjectRepository,
+    response_cache: ResponseCache,
+    project_id: str,
+):
+    return project_id
+
+
+def request(application):
+    """The dependency injection work of a typical API request."""
+    with application.transaction_context() as ctx:
+        ctx["transaction_repository"]
+        ctx.call(use_case, project_id="project-test")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--number", type=int, default=2_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'implementation':>33} {'per request [us]':>17}")
+    results = {}
+    for name, application in (
+        ("TransactionContainer per request", rebuilding_application()),
+        ("shared TransactionContainer", container.application()),
+    ):
+        request(application)
+        best = min(
+            timeit.repeat(
+                lambda: request(application), number=args.number, repeat=args.repeat
+            )
+        )
+        results[name] = best / args.number * 1e6
+        print(f"{name:>33} {results[name]:>17.1f}")
+    old, new = results.values()
+    print(f"speedup: {old / new:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,31 +1,106 @@
+import asyncio
 from contextlib import asynccontextmanager
 
+from app.logging import logger
 from config import config
-from config.containers import TopLevelContainer
+from config.containers import TopLevelContainer, get_indexed_repository_names
 from fastapi import FastAPI
+from utils import warm_up_encoders
 
 container = TopLevelContainer()
 container.config.override(config)
 
 
+async def warm_up_token_encoders():
+    """
+    Load the tiktoken encoders for the priced models in a worker thread.
+
+    Failures are only logged, tokens are still counted with lazily loaded encoders.
+    """
+    try:
+        encodings = await asyncio.to_thread(
+            warm_up_encoders, container.provider_pricelist()
+        )
+        logger.info(f"Loaded tiktoken encodings: {encodings}")
+    except Exception as e:
+        logger.warning(f"Failed to warm up tiktoken encoders: {e}")
+
+
+async def compact_transaction_rollups_periodically():
+    """
+    Compact the closed transaction rollups in a worker thread every compaction interval.
+
+    Failures are only logged, the statistics read the finer rollups until the next compaction.
+    """
+    from transactions.use_cases import compact_transaction_rollups
+
+    def compact():
+        with container.application().transaction_context() as ctx:
+            return ctx.call(compact_transaction_rollups)
+
+    while True:
+        await asyncio.sleep(config.TRANSACTION_ROLLUP_COMPACTION_INTERVAL)
+        try:
+            compacted = await asyncio.to_thread(compact)
+            logger.debug(f"Compacted transaction rollups: {compacted}")
+        except Exception as e:
+            logger.warning(f"Failed to compact transaction rollups: {e}")
+
+
+def create_indexes(ctx):
+    """
+    Create the MongoDB indexes declared by the repositories.
+
+    A failure is logged and does not stop the application, e.g. when existing
+    documents violate a unique index.
+
+    :param ctx: The TransactionContext.
+    """
+    for name in get_indexed_repository_names():
+        try:
+            created = ctx[name].create_indexes()
+            logger.debug(f"Indexes of {name}: {created}")
+        except Exception as e:
+            logger.warning(f"Failed to create indexes of {name}: {e}")
+
+
 @asynccontextmanager
 async def fastapi_lifespan(app: FastAPI):
     import os
 
     from dotenv import find_dotenv, load_dotenv
     from projects.models import AIProvider, Project
-    from projects.use_cases import add_project
+    from projects.use_cases import (
+        add_project,
+        load_project_routes,
+        rebuild_project_stats,
+    )
     from settings.models import OrganizationSettings
     from settings.use_cases import add_settings
+    from transactions.use_cases import rebuild_transaction_rollups
 
     load_dotenv(find_dotenv())
 
     application = container.application()
     with application.transaction_context() as ctx:
+        create_indexes(ctx)
         project_repository = ctx["project_repository"]
         settings_repository = ctx["settings_repository"]
 
-        if project_repository.count() == 0:
+        if (
+            not ctx["project_stats_repository"].exists()
+            and ctx["transaction_repository"].exists()
+        ):
+            projects = ctx.call(rebuild_project_stats)
+            logger.info(f"Backfilled transaction counters of {projects} projects")
+
+        if ctx["transaction_rollup_repository"].get_watermarks() is None:
+            # other workers starting at the same time skip the rebuild
+            rollups = ctx.call(rebuild_transaction_rollups, only_missing=True)
+            if rollups is not None:
+                logger.info(f"Backfilled transaction rollups: {rollups}")
+
+        if not project_repository.exists():
             data1 = Project(
                 name="Models Playground",
                 slug="models-playground",
@@ -63,7 +138,7 @@ async def fastapi_lifespan(app: FastAPI):
             ctx.call(add_project, data1)
             ctx.call(add_project, data2)
 
-        if settings_repository.count() == 0:
+        if not settings_repository.exists():
             organization_name = os.getenv("ORGANIZATION_NAME", "PromptSail")
 
             if organization_name is not None:
@@ -76,8 +151,19 @@ async def fastapi_lifespan(app: FastAPI):
                 raise ValueError(
                     "Theres no ORGANIZATION_NAME in environment variables!"
                 )
+
+        routes = ctx.call(load_project_routes)
+        logger.debug(f"Loaded routes of {routes} projects")
+    transaction_writer = container.transaction_writer()
+    transaction_writer.start()
+    encoders_warm_up = asyncio.create_task(warm_up_token_encoders())
+    rollups_compaction = asyncio.create_task(compact_transaction_rollups_periodically())
     yield
-    ...
+    encoders_warm_up.cancel()
+    rollups_compaction.cancel()
+    await transaction_writer.stop()
+    await container.upstream_client_pool().aclose()
+    container.async_db_client().close()
 
 
 app = FastAPI(lifespan=fastapi_lifespan, 
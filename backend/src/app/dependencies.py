@@ -35,3 +35,63 @@ def get_logger(request: Request):
 
 def get_provider_pricelist(request: Request):
     return request.app.container.application().dependency_provider["provider_pricelist"]
+
+
+def get_pricing_engine(request: Request):
+    """
+    Retrieve the pricing engine used to calculate transaction costs.
+
+    :param request: The incoming request.
+    :return: The PricingEngine instance.
+    """
+    return request.app.container.pricing_engine()
+
+
+def get_upstream_client_pool(request: Request):
+    """
+    Retrieve the shared pool of upstream HTTP clients.
+
+    :param request: The incoming request.
+    :return: The UpstreamClientPool instance.
+    """
+    return request.app.container.upstream_client_pool()
+
+
+def get_transaction_writer(request: Request):
+    """
+    Retrieve the write-behind writer used to store proxied transactions.
+
+    :param request: The incoming request.
+    :return: The TransactionWriter instance.
+    """
+    return request.app.container.transaction_writer()
+
+
+def get_response_cache(request: Request):
+    """
+    Retrieve the cache of the statistics and portfolio responses.
+
+    :param request: The incoming request.
+    :return: The ResponseCache instance.
+    """
+    return request.app.container.response_cache()
+
+
+def get_jwks_key_store(request: Request):
+    """
+    Retrieve the cache of the signing keys of the OpenID Connect issuers.
+
+    :param request: The incoming request.
+    :return: The JWKSKeyStore instance.
+    """
+    return request.app.container.jwks_key_store()
+
+
+def get_token_user_cache(request: Request):
+    """
+    Retrieve the cache of the users authenticated by verified tokens.
+
+    :param request: The incoming request.
+    :return: The TokenUserCache instance.
+    """
+    return request.app.container.token_user_cache()
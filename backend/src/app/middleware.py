@@ -1,9 +1,10 @@
 from config import config
-from fastapi import HTTPException, Request
+from fastapi import HTTPException
 from fastapi.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from .app import app
-from .dependencies import get_logger
+from .logging import logger
 
 # @app.middleware("detect_subdomain")
 # async def __call__(request: Request, call_next):
@@ -29,55 +30,89 @@ from .dependencies import get_logger
 
 # if config.DEBUG:
 
-@app.middleware("exception_handler")
-async def __call__(request: Request, call_next):
+class ExceptionHandlerMiddleware:
     """
-    Middleware for managing exception handling.
+    ASGI middleware for managing exception handling.
 
-    :param request: The incoming request.
-    :param call_next: The callable representing the next middleware or endpoint in the chain.
-    :return: The response from the middleware or endpoint.
+    Unhandled exceptions raised before the response has started are logged and turned into
+    a 500 JSON response. ``send`` is only wrapped to record whether the response has
+    started, the messages are forwarded as they come so streamed responses are not
+    buffered; exceptions raised after the response has started are re-raised.
     """
-    logger = get_logger(request)
-    try:
-        return await call_next(request)
-    except HTTPException as http_exception:
-        logger.exception(f"HttpExcepion occures {http_exception.status_code} - {http_exception.detail}")
-        raise http_exception
-        # return JSONResponse(
-        #     status_code=http_exception.status_code,
-        #     content={
-        #         "error": "Client Error",
-        #         "messages": str(http_exception.detail),
-        #     },
-        # )
-    except Exception as e:
-        logger.exception(f"Error message: {e.__class__.__name__}. Args: {e.args}")
-        return JSONResponse(
-            status_code=500,
-            content={
-                "error": "Internal Server Error",
-                "message": "An unexpected error occurred.",
-            },
-        )
-
-
-@app.middleware("transaction_context")
-async def __call__(request: Request, call_next):
+
+    def __init__(self, app: ASGIApp) -> None:
+        """
+        Initialize the ExceptionHandlerMiddleware.
+
+        :param app: The ASGI application wrapped by the middleware.
+        """
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        response_started = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except HTTPException as http_exception:
+            logger.exception(
+                f"HttpExcepion occures {http_exception.status_code} - {http_exception.detail}"
+            )
+            raise http_exception
+        except Exception as e:
+            logger.exception(f"Error message: {e.__class__.__name__}. Args: {e.args}")
+            if response_started:
+                raise
+            response = JSONResponse(
+                status_code=500,
+                content={
+                    "error": "Internal Server Error",
+                    "message": "An unexpected error occurred.",
+                },
+            )
+            await response(scope, receive, send)
+
+
+class TransactionContextMiddleware:
     """
-    Middleware for managing transaction context.
+    ASGI middleware for managing transaction context.
 
-    :param request: The incoming request.
-    :param call_next: The callable representing the next middleware or endpoint in the chain.
-    :return: The response from the middleware or endpoint.
+    The context is entered before the request is handled and exited after the last
+    chunk of the response has been sent, also for streamed responses.
     """
-    application = request.app.container.application()
-    ctx = application.transaction_context()
-    request.state.transaction_context = ctx
-    ctx.__enter__()
-    response = await call_next(request)
-    ctx.__exit__(None, None, None)
-    return response
+
+    def __init__(self, app: ASGIApp) -> None:
+        """
+        Initialize the TransactionContextMiddleware.
+
+        :param app: The ASGI application wrapped by the middleware.
+        """
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        application = scope["app"].container.application()
+        ctx = application.transaction_context()
+        scope.setdefault("state", {})["transaction_context"] = ctx
+        with ctx:
+            await self.app(scope, receive, send)
+
+
+# The last added middleware is the outermost one
+app.add_middleware(ExceptionHandlerMiddleware)
+app.add_middleware(TransactionContextMiddleware)
 
 
 # @app.middleware("proxy_tunnel")
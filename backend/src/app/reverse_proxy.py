@@ -1,88 +1,103 @@
 from typing import Annotated
 
-import httpx
 from _datetime import datetime, timezone
-from app.dependencies import get_logger, get_provider_pricelist, get_transaction_context
+from app.dependencies import (
+    get_logger,
+    get_pricing_engine,
+    get_transaction_context,
+    get_transaction_writer,
+    get_upstream_client_pool,
+)
 from fastapi import Depends, Request
 from fastapi.responses import StreamingResponse
-from lato import Application, TransactionContext
-from projects.use_cases import get_project_by_slug
-from raw_transactions.use_cases import store_raw_transactions
+from lato import TransactionContext
+from projects.use_cases import get_project_route_async
 from starlette.background import BackgroundTask
-from transactions.use_cases import store_transaction
-from utils import ApiURLBuilder
+from utils import ApiURLBuilder, StreamAccumulator
 
 from .app import app
+from .transaction_writer import TransactionWriter
 
 
-async def iterate_stream(response, buffer):
+async def iterate_stream(response, buffer, accumulator=None):
     """
     Asynchronously iterate over the raw stream of a response and accumulate chunks in a buffer.
 
     This function asynchronously iterate over the raw stream of a response and accumulate chunks in a buffer
-    for later processing.
+    for later processing. Event streams are decoded on the fly by the accumulator instead, so their
+    chunks are not kept in memory.
 
     Parameters:
     - **response**: The response object containing the stream
     - **buffer**: List to store the accumulated response chunks
+    - **accumulator**: Optional StreamAccumulator decoding an event stream
 
     Yields:
     - Chunks of the response data as they are received
+
+    Notes:
+    - The response is closed when the stream ends or the client disconnects, so its
+      pooled upstream connection is released
     """
-    async for chunk in response.aiter_raw():
-        buffer.append(chunk)
-        yield chunk
+    try:
+        async for chunk in response.aiter_raw():
+            if accumulator is not None:
+                accumulator.feed(chunk)
+            else:
+                buffer.append(chunk)
+            yield chunk
+        if accumulator is not None:
+            accumulator.close()
+    finally:
+        await response.aclose()
 
 
 async def close_stream(
-    app: Application,
+    writer: TransactionWriter,
     project_id,
     ai_provider_request,
     ai_provider_response,
     buffer,
     tags,
     ai_model_version,
-    pricelist,
+    pricing_engine,
     request_time,
+    accumulator=None,
 ):
     """
-    Process and store transaction data after stream completion.
+    Hand over transaction data to the write-behind writer after stream completion.
 
-    This function handles the post-streaming tasks, including storing transaction details
-    and raw request/response data in the database.
+    This function handles the post-streaming tasks. The transaction details and raw
+    request/response data are stored in the database by the writer workers, so the
+    proxy does not wait for the database.
 
     Parameters:
-    - **app**: The Application instance
+    - **writer**: The TransactionWriter instance
     - **project_id**: The unique identifier of the project
     - **ai_provider_request**: The original request object
     - **ai_provider_response**: The response object from the AI provider
     - **buffer**: Buffer containing the accumulated response data
     - **tags**: List of tags associated with the transaction
     - **ai_model_version**: Specific model version tag for cost calculation
-    - **pricelist**: List of provider prices for cost calculation
+    - **pricing_engine**: The PricingEngine used for cost calculation
     - **request_time**: Timestamp when the request was initiated
+    - **accumulator**: Optional StreamAccumulator with the decoded event stream
     """
     await ai_provider_response.aclose()
-    with app.transaction_context() as ctx:
-        data = ctx.call(
-            store_transaction,
+    await writer.submit(
+        dict(
             project_id=project_id,
             ai_provider_request=ai_provider_request,
             ai_provider_response=ai_provider_response,
             buffer=buffer,
             tags=tags,
             ai_model_version=ai_model_version,
-            pricelist=pricelist,
+            pricing_engine=pricing_engine,
             request_time=request_time,
+            response_time=datetime.now(tz=timezone.utc),
+            stream_accumulator=accumulator,
         )
-        ctx.call(
-            store_raw_transactions,
-            request=ai_provider_request,
-            request_content=data["request_content"],
-            response=ai_provider_response,
-            response_content=data["response_content"],
-            transaction_id=data["transaction_id"],
-        )
+    )
 
 
 @app.api_route(
@@ -132,21 +147,21 @@ async def reverse_proxy(
     # project = ctx.call(get_project_by_slug, slug=request.state.slug)
 
     tags = tags.split(",") if tags is not None else []
-    project = ctx.call(get_project_by_slug, slug=project_slug)
-    url = ApiURLBuilder.build(project, provider_slug, path, target_path)
+    route = await ctx.call_async(get_project_route_async, slug=project_slug)
+    api_base = route.api_bases[provider_slug]
+    url = ApiURLBuilder.build(api_base, path, target_path)
 
-    # todo: remove this, this logic should be in the use case
-    pricelist = get_provider_pricelist(request)
+    pricing_engine = get_pricing_engine(request)
 
-    logger.debug(f"got projects for {project}")
+    logger.debug(f"got route for {project_slug}: {route}")
 
     # Get the body as bytes for non-GET requests
     body = await request.body() if request.method != "GET" else None
 
-    # Make the request to the upstream server
-    client = httpx.AsyncClient()
-    # todo: copy timeout from request, temporary set to 100s
-    timeout = httpx.Timeout(100.0, connect=50.0)
+    # Make the request to the upstream server using the provider's pooled client
+    upstream_client_pool = get_upstream_client_pool(request)
+    client = upstream_client_pool.get_client(api_base)
+    timeout = upstream_client_pool.get_timeout(api_base)
 
     request_time = datetime.now(tz=timezone.utc)
     ai_provider_request = client.build_request(
@@ -163,20 +178,22 @@ async def reverse_proxy(
     ai_provider_response = await client.send(ai_provider_request, stream=True, follow_redirects=True)
 
     buffer = []
+    accumulator = StreamAccumulator.from_response(ai_provider_response)
     return StreamingResponse(
-        iterate_stream(ai_provider_response, buffer),
+        iterate_stream(ai_provider_response, buffer, accumulator),
         status_code=ai_provider_response.status_code,
         headers=ai_provider_response.headers,
         background=BackgroundTask(
             close_stream,
-            ctx["app"],
-            project.id,
+            get_transaction_writer(request),
+            route.project_id,
             ai_provider_request,
             ai_provider_response,
             buffer,
             tags,
             ai_model_version,
-            pricelist,
+            pricing_engine,
             request_time,
+            accumulator,
         ),
     )
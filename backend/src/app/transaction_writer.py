@@ -0,0 +1,186 @@
+import asyncio
+import threading
+from typing import Any
+
+from app.logging import logger
+from lato import Application
+from raw_transactions.use_cases import prepare_raw_transactions
+from transactions.use_cases import prepare_transaction
+
+
+class OverflowPolicy:
+    block = "block"
+    drop_newest = "drop_newest"
+    drop_oldest = "drop_oldest"
+
+
+class TransactionWriter:
+    """
+    Write-behind pipeline for transactions captured by the reverse proxy.
+
+    The proxy only enqueues the captured request/response. Worker tasks drain the bounded
+    queue in batches, build the transactions and raw transactions in a worker thread
+    and store them with a single insert_many per collection, so proxy latency does not
+    depend on database latency.
+    """
+
+    def __init__(
+        self,
+        application: Application,
+        queue_size: int = 1000,
+        workers: int = 2,
+        batch_size: int = 50,
+        overflow_policy: str = OverflowPolicy.block,
+    ) -> None:
+        """
+        Initialize the TransactionWriter.
+
+        :param application: The Application used to open transaction contexts.
+        :param queue_size: Maximum number of transactions waiting to be written.
+        :param workers: Number of worker tasks draining the queue.
+        :param batch_size: Maximum number of transactions written in a single batch.
+        :param overflow_policy: What to do when the queue is full - block, drop_newest or drop_oldest.
+        """
+        if overflow_policy not in (
+            OverflowPolicy.block,
+            OverflowPolicy.drop_newest,
+            OverflowPolicy.drop_oldest,
+        ):
+            raise ValueError(f"Unknown overflow policy: {overflow_policy}")
+        self.application = application
+        self.queue_size = queue_size
+        self.workers = workers
+        self.batch_size = batch_size
+        self.overflow_policy = overflow_policy
+        self._queue: asyncio.Queue | None = None
+        self._tasks: list[asyncio.Task] = []
+        self._counters = dict(
+            enqueued=0, written=0, failed=0, dropped=0, blocked=0, batches=0
+        )
+        # Batches are written and counted in worker threads
+        self._counters_lock = threading.Lock()
+        self._high_watermark = 0
+
+    @property
+    def is_running(self) -> bool:
+        return len(self._tasks) > 0
+
+    def start(self) -> None:
+        """
+        Create the queue and start the worker tasks on the running event loop.
+        """
+        if self.is_running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"transaction-writer-{idx}")
+            for idx in range(self.workers)
+        ]
+
+    async def stop(self) -> None:
+        """
+        Flush all queued transactions to the database and stop the worker tasks.
+        """
+        if not self.is_running:
+            return
+        await self._queue.join()
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def submit(self, item: dict[str, Any]) -> None:
+        """
+        Enqueue a captured transaction to be written in the background.
+
+        When the writer is not running (e.g. the application lifespan was not started),
+        the transaction is written immediately in a worker thread.
+
+        :param item: The keyword arguments of prepare_transaction for the transaction.
+        """
+        if not self.is_running:
+            await asyncio.to_thread(self._write_batch, [item])
+            return
+
+        if self._queue.full():
+            if self.overflow_policy == OverflowPolicy.drop_newest:
+                self._count(dropped=1)
+                logger.warning("Transaction queue is full, dropping new transaction")
+                return
+            if self.overflow_policy == OverflowPolicy.drop_oldest:
+                self._queue.get_nowait()
+                self._queue.task_done()
+                self._count(dropped=1)
+                logger.warning("Transaction queue is full, dropping oldest transaction")
+            else:
+                self._count(blocked=1)
+
+        await self._queue.put(item)
+        self._count(enqueued=1)
+        self._high_watermark = max(self._high_watermark, self._queue.qsize())
+
+    def stats(self) -> dict[str, Any]:
+        """
+        Get the backpressure metrics of the writer.
+
+        :return: A dictionary with queue size, high watermark and write counters.
+        """
+        with self._counters_lock:
+            counters = dict(self._counters)
+        return dict(
+            running=self.is_running,
+            workers=len(self._tasks),
+            overflow_policy=self.overflow_policy,
+            queue_size=self._queue.qsize() if self._queue is not None else 0,
+            max_queue_size=self.queue_size,
+            high_watermark=self._high_watermark,
+            **counters,
+        )
+
+    def _count(self, **increments: int) -> None:
+        with self._counters_lock:
+            for name, increment in increments.items():
+                self._counters[name] += increment
+
+    async def _worker(self) -> None:
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            try:
+                await asyncio.to_thread(self._write_batch, batch)
+            except Exception as e:
+                # nothing of a batch which failed to be stored has been counted
+                self._count(failed=len(batch))
+                logger.exception(f"Failed to write transactions batch: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write_batch(self, batch: list[dict[str, Any]]) -> None:
+        transactions, raw_transactions = [], []
+        failed = 0
+        with self.application.transaction_context() as ctx:
+            for item in batch:
+                try:
+                    data = prepare_transaction(**item)
+                except Exception as e:
+                    failed += 1
+                    logger.exception(f"Failed to process transaction: {e}")
+                    continue
+                transactions.append(data["transaction"])
+                raw_transactions += prepare_raw_transactions(
+                    request=item["ai_provider_request"],
+                    request_content=data["request_content"],
+                    response=item["ai_provider_response"],
+                    response_content=data["response_content"],
+                    transaction_id=data["transaction"].id,
+                )
+            ctx["transaction_repository"].add_many(transactions)
+            ctx["project_stats_repository"].increment(transactions)
+            ctx["transaction_rollup_repository"].add_transactions(transactions)
+            ctx["raw_transaction_repository"].add_many(raw_transactions)
+            ctx["response_cache"].invalidate(
+                {transaction.project_id for transaction in transactions}
+            )
+        self._count(written=len(transactions), failed=failed, batches=1)
@@ -0,0 +1,83 @@
+from urllib.parse import urlparse
+
+import httpx
+
+
+class UpstreamClientPool:
+    """
+    Application-lifetime pool of httpx.AsyncClient instances used by the reverse proxy.
+
+    One client is kept per AI provider api_base, so every provider gets its own
+    connection limits and keeps its TCP/TLS connections alive between proxied calls.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30.0,
+        http2: bool = False,
+        timeout: float = 100.0,
+        connect_timeout: float = 50.0,
+        provider_timeouts: dict[str, float] | None = None,
+    ) -> None:
+        """
+        Initialize the UpstreamClientPool.
+
+        :param max_connections: Maximum number of concurrent connections per provider.
+        :param max_keepalive_connections: Maximum number of idle connections kept alive per provider.
+        :param keepalive_expiry: Time in seconds after which an idle connection is closed.
+        :param http2: Flag to enable HTTP/2 for upstream connections.
+        :param timeout: Default read/write/pool timeout in seconds.
+        :param connect_timeout: Default connect timeout in seconds.
+        :param provider_timeouts: Optional. Timeouts in seconds keyed by provider host (e.g. api.openai.com).
+        """
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.http2 = http2
+        self.default_timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.connect_timeout = connect_timeout
+        self.provider_timeouts = provider_timeouts or {}
+        self._clients: dict[str, httpx.AsyncClient] = {}
+
+    def get_timeout(self, api_base: str) -> httpx.Timeout:
+        """
+        Get the timeout configured for the given provider.
+
+        :param api_base: The api_base of the AI provider.
+        :return: The httpx.Timeout for the provider, or the default timeout.
+        """
+        host = urlparse(api_base).netloc
+        if host in self.provider_timeouts:
+            return httpx.Timeout(
+                self.provider_timeouts[host], connect=self.connect_timeout
+            )
+        return self.default_timeout
+
+    def get_client(self, api_base: str) -> httpx.AsyncClient:
+        """
+        Get the shared client for the given provider, creating it on first use.
+
+        :param api_base: The api_base of the AI provider.
+        :return: The httpx.AsyncClient bound to the provider.
+        """
+        client = self._clients.get(api_base)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                limits=self.limits,
+                timeout=self.get_timeout(api_base),
+                http2=self.http2,
+            )
+            self._clients[api_base] = client
+        return client
+
+    async def aclose(self) -> None:
+        """
+        Close all pooled clients and release their connections.
+        """
+        clients, self._clients = list(self._clients.values()), {}
+        for client in clients:
+            await client.aclose()
@@ -1,5 +1,3 @@
-import re
-from collections import defaultdict
 from typing import Annotated, Any
 
 import numpy as np
@@ -9,11 +7,18 @@ import pandas as pd
 import pandas as pd
 import utils
 from _datetime import datetime, timezone, timedelta
-from app.dependencies import get_provider_pricelist, get_transaction_context
+from app.dependencies import (
+    get_pricing_engine,
+    get_provider_pricelist,
+    get_response_cache,
+    get_transaction_context,
+    get_transaction_writer,
+)
 from auth.authorization import decode_and_validate_token
 from auth.models import User
 from auth.schemas import GetPartialUserSchema, GetUserSchema
 from auth.use_cases import get_all_users
+from config.containers import get_indexed_repository_names
 from fastapi import Depends, HTTPException, Request, Security
 from fastapi.responses import JSONResponse
 from lato import TransactionContext
@@ -31,49 +36,47 @@ from projects.schemas import (
 )
 from projects.use_cases import (
     add_project,
-    count_projects,
     delete_project,
     get_all_projects,
     get_project,
+    get_project_async,
+    get_project_stats,
+    rebuild_project_stats,
     update_project,
 )
 from raw_transactions.models import TransactionTypeEnum
 from raw_transactions.schemas import CreateRawTransactionSchema
 from raw_transactions.use_cases import (
     add_raw_transaction,
-    get_request_for_transaction,
-    get_response_for_transaction,
+    get_request_for_transaction_async,
+    get_response_for_transaction_async,
 )
 from seedwork.repositories import DocumentNotFoundException
 from settings.use_cases import get_organization_name
 from slugify import slugify
-from transactions.models import Transaction, generate_uuid
+from transactions.models import generate_uuid
 from transactions.schemas import (
     CreateTransactionWithRawDataSchema,
     GetTagStatisticsInTime,
-    GetTagStatisticsSchema,
     GetTransactionLatencyStatisticsSchema,
-    GetTransactionLatencyStatisticsWithoutDateSchema,
     GetTransactionPageResponseSchema,
     GetTransactionSchema,
     GetTransactionsLatencyStatisticsSchema,
     GetTransactionStatusStatisticsSchema,
     GetTransactionsUsageStatisticsSchema,
-    GetTransactionUsageStatisticsWithoutDateSchema,
     GetTransactionWithProjectSlugSchema,
     GetTransactionWithRawDataSchema,
-    StatisticTransactionSchema,
-    TagStatisticTransactionSchema,
+    TransactionStatisticRow,
 )
 from transactions.use_cases import (
+    add_multiple_transactions,
     add_transaction,
-    count_transactions,
-    count_transactions_for_list,
     delete_multiple_transactions,
     get_all_filtered_and_paginated_transactions,
     get_list_of_filtered_transactions,
-    get_transaction,
-    get_transactions_for_project,
+    get_statistics_for_filtered_transactions,
+    get_tag_statistics_for_filtered_transactions,
+    get_transaction_async,
 )
 
 from .app import app
@@ -122,21 +125,18 @@ async def get_projects(
     - A list of GetProjectSchema objects representing all projects.
     """
     projects = ctx.call(get_all_projects)
+    project_stats = ctx.call(
+        get_project_stats, project_ids=[project.id for project in projects]
+    )
 
     dtos = []
     for project in projects:
-        transaction_count = ctx.call(count_transactions, project_id=project.id)
-        cost = 0
-        if transaction_count > 0:
-            transactions = ctx.call(get_transactions_for_project, project_id=project.id)
-            for transaction in transactions:
-                if transaction.status_code == 200:
-                    cost += transaction.total_cost if transaction.total_cost else 0
+        stats = project_stats[project.id]
         dtos.append(
             GetProjectSchema(
                 **project.model_dump(),
-                total_transactions=transaction_count,
-                total_cost=cost,
+                total_transactions=stats.total_transactions,
+                total_cost=stats.status_costs.get("200", 0),
             )
         )
 
@@ -173,15 +173,12 @@ async def get_project_details(
     except DocumentNotFoundException:
         raise HTTPException(status_code=404, detail="Project not found")
 
-    transactions = ctx.call(get_transactions_for_project, project_id=project_id)
-    cost = 0
-    transaction_count = ctx.call(count_transactions, project_id=project_id)
-    if transaction_count > 0:
-        for transaction in transactions:
-            cost += transaction.total_cost if transaction.total_cost else 0
+    stats = ctx.call(get_project_stats, project_ids=[project_id])[project_id]
 
     project = GetProjectSchema(
-        **project.model_dump(), total_transactions=transaction_count, total_cost=cost
+        **project.model_dump(),
+        total_transactions=stats.total_transactions,
+        total_cost=stats.total_cost,
     )
     return project
 
@@ -308,16 +305,18 @@ async def get_transaction_details(
     - HTTPException: 404 error if the transaction is not found.
     """
     try:
-        transaction = ctx.call(get_transaction, transaction_id=transaction_id)
-        request_data = ctx.call(
-            get_request_for_transaction, transaction_id=transaction_id
+        transaction = await ctx.call_async(
+            get_transaction_async, transaction_id=transaction_id
+        )
+        request_data = await ctx.call_async(
+            get_request_for_transaction_async, transaction_id=transaction_id
         )
-        response_data = ctx.call(
-            get_response_for_transaction, transaction_id=transaction_id
+        response_data = await ctx.call_async(
+            get_response_for_transaction_async, transaction_id=transaction_id
         )
     except DocumentNotFoundException:
         raise HTTPException(status_code=404, detail="Transaction not found")
-    project = ctx.call(get_project, project_id=transaction.project_id)
+    project = await ctx.call_async(get_project_async, project_id=transaction.project_id)
     transaction = GetTransactionWithRawDataSchema(
         **transaction.model_dump(),
         project_name=project.name if project else "",
@@ -389,7 +388,7 @@ async def get_paginated_transactions(
                 pairs[pair[0]].append(pair[1])
         provider_models = pairs
 
-    transactions = ctx.call(
+    transactions, count = ctx.call(
         get_all_filtered_and_paginated_transactions,
         page=page,
         page_size=page_size,
@@ -417,15 +416,6 @@ async def get_paginated_transactions(
             )
         )
 
-    count = ctx.call(
-        count_transactions_for_list,
-        tags=tags,
-        date_from=date_from,
-        date_to=date_to,
-        project_id=project_id,
-        status_codes=status_codes,
-        provider_models=provider_models,
-    )
     page_response = GetTransactionPageResponseSchema(
         items=new_transactions,
         page_index=page,
@@ -442,6 +432,7 @@ async def get_paginated_transactions(
     dependencies=[Security(decode_and_validate_token)],
 )
 async def get_transaction_usage_statistics_over_time(
+    request: Request,
     ctx: Annotated[TransactionContext, Depends(get_transaction_context)],
     project_id: str,
     date_from: str ,
@@ -454,6 +445,7 @@ async def get_transaction_usage_statistics_over_time(
     The time range is inclusive - transactions exactly on the start or end date/time will be included.
 
     Parameters:
+    - **request**: The incoming request object
     - **ctx**: The transaction context dependency
     - **project_id**: The unique identifier of the project
     - **date_from**: Start date (ISO format: YYYY-MM-DD or YYYY-MM-DDTHH:MM:SS)
@@ -476,72 +468,30 @@ async def get_transaction_usage_statistics_over_time(
     except HTTPException as e:
         raise e
 
-    count = ctx.call(
-        count_transactions,
-        project_id=project_id,
-        date_from=date_from_dt,
-        date_to=date_to_dt,
-        status_codes=[200],
-    )
-    if count == 0:
-        return []
-
-    transactions = ctx.call(
-        get_list_of_filtered_transactions,
-        project_id=project_id,
-        date_from=date_from_dt,
-        date_to=date_to_dt,
-        status_codes=[200],
-    )
-    transactions = [
-        StatisticTransactionSchema(
+    def compute_statistics():
+        transactions = ctx.call(
+            get_statistics_for_filtered_transactions,
             project_id=project_id,
-            provider=transaction.provider,
-            model=transaction.model,
-            total_input_tokens=transaction.input_tokens or 0,
-            total_output_tokens=transaction.output_tokens or 0,
-            total_input_cost=transaction.input_cost or 0,
-            total_output_cost=transaction.output_cost or 0,
-            total_cost=transaction.total_cost or 0,
-            status_code=transaction.status_code,
-            date=transaction.response_time,
-            latency=(
-                transaction.response_time - transaction.request_time
-            ).total_seconds(),
-            generation_speed=transaction.generation_speed,
-            total_transactions=1,
+            date_from=date_from_dt,
+            date_to=date_to_dt,
+            period=period,
+            status_codes=[200],
         )
-        for transaction in transactions
-    ]
-    stats = utils.token_counter_for_transactions(
-        transactions, period, date_from_dt, date_to_dt
-    )
-    dates = []
-    for stat in stats:
-        dates.append(stat.date)
-    new_stats = []
-    for date in set(dates):
-        for_date = []
-        for stat in stats:
-            if stat.date == date:
-                for_date.append(
-                    GetTransactionUsageStatisticsWithoutDateSchema(
-                        provider=stat.provider,
-                        model=stat.model,
-                        total_input_tokens=stat.total_input_tokens,
-                        total_output_tokens=stat.total_output_tokens,
-                        input_cumulative_total=stat.input_cumulative_total,
-                        output_cumulative_total=stat.output_cumulative_total,
-                        total_transactions=stat.total_transactions,
-                        total_cost=stat.total_cost,
-                    )
-                )
-        new_stats.append(
-            GetTransactionsUsageStatisticsSchema(date=date, records=for_date)
+        if transactions.empty:
+            return []
+
+        return utils.token_counter_for_transactions(
+            transactions, period, date_from_dt, date_to_dt
         )
-    new_stats.sort(key=lambda statistic: statistic.date)
 
-    return new_stats
+    return get_response_cache(request).get_or_compute(
+        compute_statistics,
+        "transactions_cost",
+        project_id,
+        date_from_dt,
+        date_to_dt,
+        period,
+    )
 
 
 @app.get(
@@ -550,6 +500,7 @@ async def get_transaction_usage_statistics_over_time(
     dependencies=[Security(decode_and_validate_token)],
 )
 async def get_transaction_status_statistics_over_time(
+    request: Request,
     ctx: Annotated[TransactionContext, Depends(get_transaction_context)],
     project_id: str,
     date_from: datetime | str | None = None,
@@ -563,6 +514,7 @@ async def get_transaction_status_statistics_over_time(
     date range, and period. It then processes the data to generate status statistics
     including total transactions and the distribution of status codes over time.\n
 
+    :param request: The incoming request object.\n
     :param ctx: The transaction context, providing access to dependencies (automatically applied).\n
     :param project_id: The unique identifier of the project.\n
     :param date_from: Starting point of the time interval (optional - when empty, then the scope is counted from the
@@ -580,46 +532,29 @@ async def get_transaction_status_statistics_over_time(
     except HTTPException as e:
         raise e
 
-    count = ctx.call(
-        count_transactions,
-        project_id=project_id,
-        date_from=date_from_dt,
-        date_to=date_to_dt,
-    )
-    if count == 0:
-        return []
-
-    transactions = ctx.call(
-        get_list_of_filtered_transactions,
-        project_id=project_id,
-        date_from=date_from_dt,
-        date_to=date_to_dt,
-    )
-    transactions = [
-        StatisticTransactionSchema(
+    def compute_statistics():
+        transactions = ctx.call(
+            get_statistics_for_filtered_transactions,
             project_id=project_id,
-            provider=transaction.provider,
-            model=transaction.model,
-            total_input_tokens=transaction.input_tokens or 0,
-            total_output_tokens=transaction.output_tokens or 0,
-            total_input_cost=transaction.input_cost or 0,
-            total_output_cost=transaction.output_cost or 0,
-            total_cost=transaction.total_cost or 0,
-            status_code=transaction.status_code,
-            date=transaction.response_time,
-            latency=(
-                transaction.response_time - transaction.request_time
-            ).total_seconds(),
-            generation_speed=transaction.generation_speed,
-            total_transactions=1,
+            date_from=date_from_dt,
+            date_to=date_to_dt,
+            period=period,
         )
-        for transaction in transactions
-    ]
-    stats = utils.status_counter_for_transactions(
-        transactions, period, date_from_dt, date_to_dt
-    )
+        if transactions.empty:
+            return []
 
-    return stats
+        return utils.status_counter_for_transactions(
+            transactions, period, date_from_dt, date_to_dt
+        )
+
+    return get_response_cache(request).get_or_compute(
+        compute_statistics,
+        "transactions_count",
+        project_id,
+        date_from_dt,
+        date_to_dt,
+        period,
+    )
 
 
 @app.get(
@@ -628,6 +563,7 @@ async def get_transaction_status_statistics_over_time(
     dependencies=[Security(decode_and_validate_token)],
 )
 async def get_transactions_speed_statistics_over_time(
+    request: Request,
     ctx: Annotated[TransactionContext, Depends(get_transaction_context)],
     project_id: str,
     date_from: str,
@@ -640,6 +576,7 @@ async def get_transactions_speed_statistics_over_time(
     The time range is inclusive - transactions exactly on the start or end date/time will be included.
 
     Parameters:
+    - **request**: The incoming request object
     - **ctx**: The transaction context dependency
     - **project_id**: The unique identifier of the project
     - **date_from**: Start date (ISO format: YYYY-MM-DD or YYYY-MM-DDTHH:MM:SS)
@@ -659,73 +596,32 @@ async def get_transactions_speed_statistics_over_time(
     except HTTPException as e:
         raise e
 
-    # Continue with existing logic
-    count = ctx.call(
-        count_transactions,
-        project_id=project_id,
-        date_from=date_from,
-        date_to=date_to,
-        status_codes=[200],
-        null_generation_speed=False,
-    )
-    
-    if count == 0:
-        return []
-
-    transactions: list[Transaction] = ctx.call(
-        get_list_of_filtered_transactions,
-        project_id=project_id,
-        date_from=date_from,
-        date_to=date_to,
-        status_codes=[200],
-        null_generation_speed=False,
-    )
-    
-    transactions: list[StatisticTransactionSchema] = [
-        StatisticTransactionSchema(
+    def compute_statistics():
+        transactions: list[TransactionStatisticRow] = ctx.call(
+            get_list_of_filtered_transactions,
             project_id=project_id,
-            provider=transaction.provider,
-            model=transaction.model,
-            total_input_tokens=transaction.input_tokens or 0,
-            total_output_tokens=transaction.output_tokens or 0,
-            total_input_cost=transaction.input_cost or 0,
-            total_output_cost=transaction.output_cost or 0,
-            total_cost=transaction.total_cost or 0,
-            status_code=transaction.status_code,
-            date=transaction.response_time,
-            latency=(
-                transaction.response_time - transaction.request_time
-            ).total_seconds(),
-            generation_speed=transaction.generation_speed,
-            total_transactions=1,
+            date_from=date_from,
+            date_to=date_to,
+            status_codes=[200],
+            null_generation_speed=False,
         )
-        for transaction in transactions
-    ]
-    stats = utils.speed_counter_for_transactions(
-        transactions, period, date_from, date_to
-    )
-
-    dates = [stat.date for stat in stats]
-    new_stats = []
-    for date in set(dates):
-        for_date = []
-        for stat in stats:
-            if stat.date == date:
-                for_date.append(
-                    GetTransactionLatencyStatisticsWithoutDateSchema(
-                        provider=stat.provider,
-                        model=stat.model,
-                        mean_latency=stat.mean_latency,
-                        tokens_per_second=stat.tokens_per_second,
-                        total_transactions=stat.total_transactions,
-                    )
-                )
-        new_stats.append(
-            GetTransactionsLatencyStatisticsSchema(date=date, records=for_date)
+        if len(transactions) == 0:
+            return []
+        return utils.speed_counter_for_transactions(
+            utils.transactions_statistics_dataframe(transactions, project_id),
+            period,
+            date_from,
+            date_to,
         )
-    new_stats.sort(key=lambda statistic: statistic.date)
 
-    return new_stats
+    return get_response_cache(request).get_or_compute(
+        compute_statistics,
+        "transactions_speed_old",
+        project_id,
+        date_from,
+        date_to,
+        period,
+    )
 
 
 @app.get(
@@ -734,6 +630,7 @@ async def get_transactions_speed_statistics_over_time(
     dependencies=[Security(decode_and_validate_token)],
 )
 async def get_transactions_speed_statistics_over_time_refactored(
+    request: Request,
     ctx: Annotated[TransactionContext, Depends(get_transaction_context)],
     project_id: str,
     date_from: str,
@@ -746,6 +643,7 @@ async def get_transactions_speed_statistics_over_time_refactored(
     The time range is inclusive - transactions exactly on the start or end date/time will be included.
 
     Parameters:
+    - **request**: The incoming request object
     - **ctx**: The transaction context dependency
     - **project_id**: The unique identifier of the project
     - **date_from**: Start date (ISO format: YYYY-MM-DD or YYYY-MM-DDTHH:MM:SS)
@@ -765,33 +663,37 @@ async def get_transactions_speed_statistics_over_time_refactored(
     except HTTPException as e:
         raise e
 
-    # Continue with existing logic
-    count = ctx.call(
-        count_transactions,
-        project_id=project_id,
-        date_from=date_from_dt,
-        date_to=date_to_dt,
-        status_codes=[200],
-        null_generation_speed=False,
-    )
-    
-    if count == 0:
-        return []
+    def compute_statistics():
+        transactions: pd.DataFrame = ctx.call(
+            get_statistics_for_filtered_transactions,
+            project_id=project_id,
+            date_from=date_from_dt,
+            date_to=date_to_dt,
+            period=period,
+            status_codes=[200],
+            null_generation_speed=False,
+        )
 
-    transactions: list[Transaction] = ctx.call(
-        get_list_of_filtered_transactions,
-        project_id=project_id,
-        date_from=date_from_dt,
-        date_to=date_to_dt,
-        status_codes=[200],
-        null_generation_speed=False,
+        if transactions.empty:
+            return []
+
+        # Transform and calculate statistics
+        df = utils.prepare_transaction_dataframe(transactions, date_from_dt, date_to_dt)
+        stats_df = utils.calculate_speed_statistics(
+            df, utils.pandas_period_from_string(period)
+        )
+
+        # Format response
+        return utils.format_statistics_response(stats_df)
+
+    return get_response_cache(request).get_or_compute(
+        compute_statistics,
+        "transactions_speed",
+        project_id,
+        date_from_dt,
+        date_to_dt,
+        period,
     )
-    # Transform and calculate statistics
-    df = utils.prepare_transaction_dataframe(transactions, date_from_dt, date_to_dt)
-    stats_df = utils.calculate_speed_statistics(df, utils.pandas_period_from_string(period))
-    
-    # Format response
-    return utils.format_statistics_response(stats_df)
 
 
 @app.get(
@@ -815,31 +717,21 @@ async def get_portfolio_details(
     Returns:
     - A GetPortfolioDetailsSchema containing portfolio-wide statistics and project details
     """
-    project_count = ctx.call(count_projects)
-    total_cost_per_project, total_transactions_per_project = {}, {}
+    projects = ctx.call(get_all_projects)
     total_cost, total_transactions = 0, 0
-    projects = []
-    if project_count > 0:
-        projects = ctx.call(get_all_projects)
-        projects_ids = [project.id for project in projects]
-        for idx in projects_ids:
-            transactions = ctx.call(get_transactions_for_project, project_id=idx)
-            cost = sum(
-                [
-                    transaction.total_cost if transaction.total_cost is not None else 0
-                    for transaction in transactions
-                ]
-            )
-            total_cost_per_project[idx] = cost
-            total_cost += cost
-            count = len(transactions)
-            total_transactions_per_project[idx] = count
-            total_transactions += count
+    if len(projects) > 0:
+        project_stats = ctx.call(
+            get_project_stats, project_ids=[project.id for project in projects]
+        )
+        total_cost = sum(stats.total_cost for stats in project_stats.values())
+        total_transactions = sum(
+            stats.total_transactions for stats in project_stats.values()
+        )
         projects = [
             GetProjectPortfolioSchema(
                 **project.model_dump(),
-                total_transactions=total_transactions_per_project[project.id],
-                total_cost=total_cost_per_project[project.id],
+                total_transactions=project_stats[project.id].total_transactions,
+                total_cost=project_stats[project.id].total_cost,
             )
             for project in projects
         ]
@@ -854,6 +746,7 @@ async def get_portfolio_details(
     dependencies=[Security(decode_and_validate_token)],
 )
 async def get_portfolio_usage_in_time(
+    request: Request,
     ctx: Annotated[TransactionContext, Depends(get_transaction_context)],
     date_from: datetime | str | None = None,
     date_to: datetime | str | None = None,
@@ -866,6 +759,7 @@ async def get_portfolio_usage_in_time(
     including token consumption and costs across all projects over time.
 
     Parameters:
+    - **request**: The incoming request object
     - **ctx**: The transaction context dependency
     - **date_from**: Optional start date (format: YYYY-MM-DD or YYYY-MM-DDTHH:MM:SS)
     - **date_to**: Optional end date (format: YYYY-MM-DD or YYYY-MM-DDTHH:MM:SS)
@@ -875,124 +769,53 @@ async def get_portfolio_usage_in_time(
     - A list of GetProjectsUsageInTimeSchema objects containing usage statistics
       grouped by the specified period
     """
-    project_count = ctx.call(count_projects)
-    projects_usage_in_time = []
-    results = {}
-    if project_count > 0:
+
+    def compute_statistics(date_from, date_to):
+        projects_usage_in_time = []
         projects = ctx.call(get_all_projects)
-        project_ids = [project.id for project in projects]
-        for idx in project_ids:
+        if len(projects) > 0:
             if not date_from:
-                date_from = [
-                    project.created_at for project in projects if project.id == idx
-                ][0]
+                date_from = projects[0].created_at
             if not date_to:
                 date_to = datetime.now()
             date_from, date_to = utils.check_dates_for_statistics(date_from, date_to)
 
-            count = ctx.call(
-                count_transactions,
-                project_id=idx,
-                date_from=date_from,
-                date_to=date_to,
-                status_codes=[200],
-            )
-            if count == 0:
-                results[idx] = []
-
             transactions = ctx.call(
-                get_list_of_filtered_transactions,
-                project_id=idx,
+                get_statistics_for_filtered_transactions,
                 date_from=date_from,
                 date_to=date_to,
+                period=period,
                 status_codes=[200],
             )
-            transactions = [
-                StatisticTransactionSchema(
-                    project_id=idx,
-                    provider=transaction.provider,
-                    model=transaction.model,
-                    total_input_tokens=transaction.input_tokens or 0,
-                    total_output_tokens=transaction.output_tokens or 0,
-                    total_input_cost=transaction.input_cost or 0,
-                    total_output_cost=transaction.output_cost or 0,
-                    total_cost=transaction.total_cost or 0,
-                    status_code=transaction.status_code,
-                    date=transaction.response_time,
-                    latency=(
-                        transaction.response_time - transaction.request_time
-                    ).total_seconds(),
-                    generation_speed=transaction.generation_speed,
-                    total_transactions=1,
-                )
-                for transaction in transactions
-            ]
-
-            if len(transactions) > 0:
-                stats = utils.token_counter_for_transactions(
-                    transactions, period, date_from, date_to, False
-                )
-                results[idx] = stats
-
-        if sum([len(stat) for stat in results.items()]) == 0:
-            return []
+            if transactions.empty:
+                return []
 
-        aggregated_data = defaultdict(lambda: defaultdict(lambda: defaultdict(int)))
-
-        for project_id, records in results.items():
-            if len(records) > 0:
-                for record in records:
-                    date = record.date
-                    aggregated_data[date][project_id][
-                        "total_input_tokens"
-                    ] += record.total_input_tokens
-                    aggregated_data[date][project_id][
-                        "total_output_tokens"
-                    ] += record.total_output_tokens
-                    aggregated_data[date][project_id][
-                        "input_cumulative_total"
-                    ] += record.input_cumulative_total
-                    aggregated_data[date][project_id][
-                        "output_cumulative_total"
-                    ] += record.output_cumulative_total
-                    aggregated_data[date][project_id][
-                        "total_transactions"
-                    ] += record.total_transactions
-                    aggregated_data[date][project_id]["total_cost"] += record.total_cost
-
-        result = []
-
-        for date, statistics in aggregated_data.items():
-            date_record = {"date": date, "records": []}
-            for project_id, stats in statistics.items():
-                record = {
-                    "project_id": project_id,
-                    "total_input_tokens": stats["total_input_tokens"],
-                    "total_output_tokens": stats["total_output_tokens"],
-                    "input_cumulative_total": stats["input_cumulative_total"],
-                    "output_cumulative_total": stats["output_cumulative_total"],
-                    "total_transactions": stats["total_transactions"],
-                    "total_cost": stats["total_cost"],
-                }
-                date_record["records"].append(record)
-            result.append(date_record)
-
-        for usage in result:
-            records = []
-            for record in usage["records"]:
-                project_name = [
-                    project.name
-                    for project in projects
-                    if project.id == record["project_id"]
-                ][0]
-                records.append(
-                    GetProjectUsageSchema(**record, project_name=project_name)
-                )
-            projects_usage_in_time.append(
-                GetProjectsUsageInTimeSchema(date=usage["date"], records=records)
+            usage = utils.token_usage_dataframe(
+                transactions, period, date_from, date_to, False, keys=["project_id"]
+            )
+            project_names = {project.id: project.name for project in projects}
+            usage["project_name"] = usage["project_id"].map(project_names)
+            # The records of every date follow the order of the projects
+            project_order = {project.id: idx for idx, project in enumerate(projects)}
+            usage = usage.sort_values(
+                "project_id", key=lambda ids: ids.map(project_order), kind="stable"
             )
+            projects_usage_in_time = utils.group_statistics_by_date(
+                usage, GetProjectsUsageInTimeSchema, GetProjectUsageSchema
+            )
+
+        return projects_usage_in_time
 
-    return projects_usage_in_time
+    # Missing dates are resolved when the statistics are computed, so they are not part of the key
+    cache_from, cache_to = utils.check_dates_for_statistics(date_from, date_to)
+    return get_response_cache(request).get_or_compute(
+        lambda: compute_statistics(date_from, date_to),
+        "portfolio_usage_in_time",
+        None,
+        cache_from,
+        cache_to,
+        period,
+    )
 
 
 @app.get(
@@ -1001,6 +824,7 @@ async def get_portfolio_usage_in_time(
     dependencies=[Security(decode_and_validate_token)],
 )
 async def get_portfolio_costs_by_tag(
+    request: Request,
     ctx: Annotated[TransactionContext, Depends(get_transaction_context)],
     date_from: datetime | str | None = None,
     date_to: datetime | str | None = None,
@@ -1013,6 +837,7 @@ async def get_portfolio_costs_by_tag(
     grouped by their tags and aggregated over the specified time period.
 
     Parameters:
+    - **request**: The incoming request object
     - **ctx**: The transaction context dependency
     - **date_from**: Optional start date (format: YYYY-MM-DD or YYYY-MM-DDTHH:MM:SS)
     - **date_to**: Optional end date (format: YYYY-MM-DD or YYYY-MM-DDTHH:MM:SS)
@@ -1023,113 +848,25 @@ async def get_portfolio_costs_by_tag(
       grouped by the specified period
     """
     date_from, date_to = utils.check_dates_for_statistics(date_from, date_to)
-    count = ctx.call(
-        count_transactions,
-        date_from=date_from,
-        date_to=date_to,
-        status_codes=[200],
-    )
-    if count == 0:
-        return []
-
-    transactions = ctx.call(
-        get_list_of_filtered_transactions,
-        date_from=date_from,
-        date_to=date_to,
-        status_codes=[200],
-    )
 
-    transactions_multiplied = []
-    for transaction in transactions:
-        if len(transaction.tags) == 0:
-            transactions_multiplied.append(
-                Transaction(
-                    id=transaction.id,
-                    project_id=transaction.project_id,
-                    tags=["untagged-transactions"],
-                    provider=transaction.provider,
-                    model=transaction.model,
-                    type=transaction.type,
-                    os=transaction.os,
-                    input_tokens=transaction.input_tokens,
-                    output_tokens=transaction.output_tokens,
-                    library=transaction.library,
-                    status_code=transaction.status_code,
-                    messages=transaction.messages,
-                    last_message=transaction.last_message,
-                    prompt=transaction.prompt,
-                    error_message=transaction.error_message,
-                    generation_speed=transaction.generation_speed,
-                    input_cost=transaction.input_cost,
-                    output_cost=transaction.output_cost,
-                    total_cost=transaction.total_cost,
-                    request_time=transaction.request_time,
-                    response_time=transaction.response_time,
-                )
-            )
-        else:
-            for tag in transaction.tags:
-                transactions_multiplied.append(
-                    Transaction(
-                        id=transaction.id,
-                        project_id=transaction.project_id,
-                        tags=[tag],
-                        provider=transaction.provider,
-                        model=transaction.model,
-                        type=transaction.type,
-                        os=transaction.os,
-                        input_tokens=transaction.input_tokens,
-                        output_tokens=transaction.output_tokens,
-                        library=transaction.library,
-                        status_code=transaction.status_code,
-                        messages=transaction.messages,
-                        last_message=transaction.last_message,
-                        prompt=transaction.prompt,
-                        error_message=transaction.error_message,
-                        generation_speed=transaction.generation_speed,
-                        input_cost=transaction.input_cost,
-                        output_cost=transaction.output_cost,
-                        total_cost=transaction.total_cost,
-                        request_time=transaction.request_time,
-                        response_time=transaction.response_time,
-                    )
-                )
-
-    transactions = [
-        TagStatisticTransactionSchema(
-            tag=transaction.tags[0],
-            total_input_tokens=transaction.input_tokens or 0,
-            total_output_tokens=transaction.output_tokens or 0,
-            total_input_cost=transaction.input_cost or 0,
-            total_output_cost=transaction.output_cost or 0,
-            total_cost=transaction.total_cost or 0,
-            date=transaction.response_time,
-            total_transactions=1,
+    def compute_statistics():
+        transactions = ctx.call(
+            get_tag_statistics_for_filtered_transactions,
+            date_from=date_from,
+            date_to=date_to,
+            period=period,
+            status_codes=[200],
         )
-        for transaction in transactions_multiplied
-    ]
+        if transactions.empty:
+            return []
 
-    if len(transactions) > 0:
-        stats = utils.token_counter_for_transactions_by_tag(
+        return utils.token_counter_for_transactions_by_tag(
             transactions, period, date_from, date_to, False
         )
-        df = pd.DataFrame([stat.model_dump() for stat in stats])
-        grouped = (
-            df.groupby("date")
-            .apply(lambda x: x.to_dict(orient="records"))
-            .reset_index(name="records")
-        )
-        output = grouped.to_dict(orient="records")
-
-        response = []
-        for row in output:
-            records = []
-            for record in row["records"]:
-                records.append(GetTagStatisticsSchema(**record))
-            response.append(GetTagStatisticsInTime(date=row["date"], records=records))
-        return response
 
-    return []
+    return get_response_cache(request).get_or_compute(
+        compute_statistics, "portfolio_costs_by_tag", None, date_from, date_to, period
+    )
 
 
 @app.get(
@@ -1211,6 +948,97 @@ async def get_config(
     }
 
 
+@app.get(
+    "/api/system/transaction_writer",
+    response_class=JSONResponse,
+    dependencies=[Security(decode_and_validate_token)],
+)
+async def get_transaction_writer_stats(request: Request) -> dict[str, Any]:
+    """
+    Retrieve backpressure metrics of the write-behind transaction writer.
+
+    This endpoint returns the current state of the queue used to store proxied transactions,
+    including its size, high watermark and the number of written, failed and dropped transactions.
+
+    Parameters:
+    - **request**: The incoming request object
+
+    Returns:
+    - A dictionary containing the transaction writer metrics
+    """
+    return get_transaction_writer(request).stats()
+
+
+@app.get(
+    "/api/system/cache",
+    response_class=JSONResponse,
+    dependencies=[Security(decode_and_validate_token)],
+)
+async def get_response_cache_stats(request: Request) -> dict[str, Any]:
+    """
+    Retrieve metrics of the cache of the statistics and portfolio responses.
+
+    This endpoint returns the number of cache hits and misses, the number of entries
+    invalidated by writes of transactions and projects, and the number of cached entries.
+
+    Parameters:
+    - **request**: The incoming request object
+
+    Returns:
+    - A dictionary containing the response cache metrics
+    """
+    return get_response_cache(request).stats()
+
+
+@app.get(
+    "/api/system/indexes",
+    response_class=JSONResponse,
+    dependencies=[Security(decode_and_validate_token)],
+)
+async def get_index_stats(
+    ctx: Annotated[TransactionContext, Depends(get_transaction_context)],
+) -> dict[str, Any]:
+    """
+    Retrieve usage statistics of the MongoDB indexes.
+
+    This endpoint returns, for every repository, the indexes of its collection together with
+    the number of operations which used them since the database server started.
+
+    Parameters:
+    - **ctx**: The transaction context dependency
+
+    Returns:
+    - A dictionary with the index statistics keyed by repository name
+    """
+    return {
+        name: ctx[name].index_stats() for name in get_indexed_repository_names()
+    }
+
+
+@app.post(
+    "/api/system/project_stats/rebuild",
+    response_class=JSONResponse,
+    dependencies=[Security(decode_and_validate_token)],
+)
+async def rebuild_projects_stats(
+    ctx: Annotated[TransactionContext, Depends(get_transaction_context)],
+) -> dict[str, int]:
+    """
+    Recalculate the transaction counters of all projects.
+
+    This endpoint backfills the project totals used by the projects and portfolio endpoints
+    from the stored transactions, e.g. after an upgrade or a manual change of the database.
+
+    Parameters:
+    - **ctx**: The transaction context dependency
+
+    Returns:
+    - A dictionary with the number of projects with transactions
+    """
+    projects = ctx.call(rebuild_project_stats)
+    return {"projects": projects}
+
+
 @app.get("/api/users", dependencies=[Security(decode_and_validate_token)])
 async def get_users(
     ctx: Annotated[TransactionContext, Depends(get_transaction_context)],
@@ -1281,29 +1109,15 @@ def create_transaction(
     if ((data.status_code == 200) and data.model and data.provider) and not (
         data.input_cost or data.output_cost or data.total_cost
     ):
-        pricelist = get_provider_pricelist(request_object)
-        pricelist = [
-            item
-            for item in pricelist
-            if item.provider == data.provider
-            and re.match(item.match_pattern, data.model)
-        ]
-        if len(pricelist) > 0:
-            if pricelist[0].input_price == 0:
-                data.input_cost, data.output_cost = 0, 0
-                data.total_cost = (
-                    (data.input_tokens + data.output_tokens)
-                    / 1000
-                    * pricelist[0].total_price
-                )
-            else:
-                data.input_cost = pricelist[0].input_price * (data.input_tokens / 1000)
-                data.output_cost = pricelist[0].output_price * (
-                    data.output_tokens / 1000
-                )
-                data.total_cost = data.input_cost + data.output_cost
-        else:
-            data.input_cost, data.output_cost, data.total_cost = None, None, None
+        data.input_cost, data.output_cost, data.total_cost = get_pricing_engine(
+            request_object
+        ).price(
+            data.provider,
+            data.model,
+            data.input_tokens,
+            data.output_tokens,
+            n_images=data.request_json.get("n"),
+        )
 
     if not data.generation_speed:
         if data.output_tokens is not None and (data.output_tokens > 0):
@@ -1367,15 +1181,13 @@ async def mock_transactions(
     - A dictionary containing the status code and execution time information
     """
     time_start = datetime.now(tz=timezone.utc)
-    transactions_repo = ctx["transaction_repository"]
 
     # Delete all transactions for project-test in order to avoid duplicates transactions keys
-    transactions_repo.delete_cascade(project_id="project-test")
+    ctx.call(delete_multiple_transactions, project_id="project-test")
 
     # generate random transactions, with different models and providers
     mocked_transactions = utils.generate_mock_transactions(count, date_from, date_to)
-    for transaction in mocked_transactions:
-        transactions_repo.add(transaction)
+    ctx.call(add_multiple_transactions, transactions=mocked_transactions)
     time_stop = datetime.now(tz=timezone.utc)
 
     return {
@@ -1402,8 +1214,7 @@ async def remove_mocked_transactions(
     Returns:
     - A dictionary containing the status code and a message confirming the removal of mocked transactions.
     """
-    transactions_repo = ctx["transaction_repository"]
-    transactions_repo.delete_cascade(project_id="project-test")
+    ctx.call(delete_multiple_transactions, project_id="project-test")
 
     return {
         "status_code": 200,
@@ -1,13 +1,16 @@
-import json
-import urllib.request
+import asyncio
 from typing import Annotated
 
 import jwt
-from app.dependencies import get_transaction_context
+from app.dependencies import (
+    get_jwks_key_store,
+    get_token_user_cache,
+    get_transaction_context,
+)
 from auth.models import User
 from auth.use_cases import add_user, get_user
 from config import config
-from fastapi import Depends, HTTPException, Security
+from fastapi import Depends, HTTPException, Request, Security
 from fastapi.security import APIKeyHeader
 from lato import TransactionContext
 
@@ -53,15 +56,6 @@ class UserBuilder:
         return User(**self.__dict__)
 
 
-def get_jwks_url(issuer_url):
-    well_known_url = issuer_url + "/.well-known/openid-configuration"
-    with urllib.request.urlopen(well_known_url) as response:
-        well_known = json.load(response)
-    if "jwks_uri" not in well_known:
-        raise Exception("jwks_uri not found in OpenID configuration")
-    return well_known["jwks_uri"]
-
-
 if config.SSO_AUTH:
     api_key_header = APIKeyHeader(name="Authorization")
 
@@ -76,10 +70,54 @@ if config.SSO_AUTH:
         except ValueError:
             raise HTTPException(status_code=401, detail="Invalid authorization header")
 
-    def decode_and_validate_token(
+    def validate_token_user(
+        ctx: TransactionContext, token: str, key, algorithm: str, audience: str
+    ) -> tuple[User, dict]:
+        """
+        Verify the token and get its user, adding the user at the first login.
+
+        :param ctx: The TransactionContext.
+        :param token: The bearer token.
+        :param key: The signing key of the token.
+        :param algorithm: The signing algorithm of the token.
+        :param audience: The expected audience of the token.
+        :return: The user and the decoded token.
+        """
+        decoded_token = jwt.decode(
+            token, key, [algorithm], audience=audience, leeway=10
+        )
+        user_id = decoded_token.get("sub")
+        if (db_user := ctx.call(get_user, external_id=user_id)) is not None:
+            return db_user, decoded_token
+        token_user = (
+            UserBuilder().add_external_id(user_id).add_issuer(decoded_token.get("iss"))
+        )
+        if "microsoft" in decoded_token.get("iss"):
+            given_name, family_name = decoded_token.get("name").split(" ")
+            token_user = (
+                token_user.add_email(decoded_token.get("preferred_username"))
+                .add_given_name(given_name)
+                .add_family_name(family_name)
+            )
+
+        if "google" in decoded_token.get("iss"):
+            token_user = (
+                token_user.add_email(decoded_token.get("email"))
+                .add_organization(decoded_token.get("hd"))
+                .add_given_name(decoded_token.get("given_name"))
+                .add_family_name(decoded_token.get("family_name"))
+                .add_picture(decoded_token.get("picture"))
+            )
+        return ctx.call(add_user, user=token_user.build()), decoded_token
+
+    async def decode_and_validate_token(
+        request: Request,
         ctx: Annotated[TransactionContext, Depends(get_transaction_context)],
         token: str = Depends(verify_authorization),
     ) -> User:
+        token_user_cache = get_token_user_cache(request)
+        if (cached_user := token_user_cache.get(token)) is not None:
+            return cached_user
         try:
             unvalidated = jwt.decode(token, options={"verify_signature": False})
 
@@ -94,11 +132,6 @@ if config.SSO_AUTH:
                     issuer="test",
                 )
 
-            jwks_url = get_jwks_url(unvalidated["iss"])
-            jwks_client = jwt.PyJWKClient(jwks_url)
-            header = jwt.get_unverified_header(token)
-            key = jwks_client.get_signing_key(header["kid"]).key
-
             if "microsoft" in unvalidated["iss"]:
                 expected_audience = config.AZURE_CLIENT_ID
             elif "google" in unvalidated["iss"]:
@@ -109,36 +142,21 @@ if config.SSO_AUTH:
             if expected_audience is None:
                 expected_audience = unvalidated.get("aud")
 
-            decoded_token = jwt.decode(
-                token, key, [header["alg"]], audience=expected_audience, leeway=10
+            header = jwt.get_unverified_header(token)
+            signing_key = await get_jwks_key_store(request).get_signing_key(
+                unvalidated["iss"], header["kid"]
             )
-            user_id = decoded_token.get("sub")
-            new_user = None
-            if (db_user := ctx.call(get_user, external_id=user_id)) is None:
-                token_user = (
-                    UserBuilder()
-                    .add_external_id(user_id)
-                    .add_issuer(decoded_token.get("iss"))
-                )
-                if "microsoft" in decoded_token.get("iss"):
-                    given_name, family_name = decoded_token.get("name").split(" ")
-                    token_user = (
-                        token_user.add_email(decoded_token.get("preferred_username"))
-                        .add_given_name(given_name)
-                        .add_family_name(family_name)
-                    )
-
-                if "google" in decoded_token.get("iss"):
-                    token_user = (
-                        token_user.add_email(decoded_token.get("email"))
-                        .add_organization(decoded_token.get("hd"))
-                        .add_given_name(decoded_token.get("given_name"))
-                        .add_family_name(decoded_token.get("family_name"))
-                        .add_picture(decoded_token.get("picture"))
-                    )
-                new_user = ctx.call(add_user, user=token_user.build())
-
-            return db_user if db_user is not None else new_user
+            # the signature check and the user lookup block, so they run in a worker thread
+            user, decoded_token = await asyncio.to_thread(
+                validate_token_user,
+                ctx,
+                token,
+                signing_key.key,
+                header["alg"],
+                expected_audience,
+            )
+            token_user_cache.set(token, user, decoded_token.get("exp"))
+            return user
         except jwt.exceptions.DecodeError:
             raise HTTPException(status_code=401, detail="Invalid token")
         except jwt.exceptions.ImmatureSignatureError:
@@ -1,4 +1,5 @@
 from auth.models import User
+from pymongo import ASCENDING, IndexModel
 from seedwork.exceptions import AlreadyExistsException, NotFoundException
 from seedwork.repositories import MongoRepository
 
@@ -23,6 +24,7 @@ class UserRepository(MongoRepository):
     """
 
     model_class = User
+    indexes = [IndexModel([("external_id", ASCENDING)])]
 
     def add(self, doc):
         """
@@ -32,7 +34,7 @@ class UserRepository(MongoRepository):
         :raise SlugAlreadyExistsException: If the slug already exists in the repository.
         :return: The result of the add operation.
         """
-        if self.count({"_id": doc.id}) > 0:
+        if self.exists({"_id": doc.id}):
             raise UserAlreadyExistsException(f"Slug already exists: {doc.slug}")
         result = super().add(doc)
         return result
@@ -46,7 +48,7 @@ class UserRepository(MongoRepository):
         :raise ProjectNotFoundException: If the project with the specified identifier is not found.
         :return: The result of the update operation.
         """
-        if self.count({"_id": doc.id}) == 0:
+        if not self.exists({"_id": doc.id}):
             raise UserNotFoundException(f"User with id: {doc.id} not found.")
         result = super().update(doc)
         return result
@@ -58,7 +60,7 @@ class UserRepository(MongoRepository):
         :param doc_id: The unique identifier of the project to be retrieved.
         :return: The Project object corresponding to the specified identifier.
         """
-        if self.count({"_id": doc_id}) == 0:
+        if not self.exists({"_id": doc_id}):
             raise UserNotFoundException(f"User with id: {doc_id} not found.")
         user = super().get(doc_id)
         return User(**user.model_dump())
@@ -70,7 +72,7 @@ class UserRepository(MongoRepository):
         :param external_id: The unique external identifier of the project to be retrieved.
         :return: The Project object corresponding to the specified identifier.
         """
-        if self.count({"external_id": external_id}) == 0:
+        if not self.exists({"external_id": external_id}):
             return None
         user = super().find_one({"external_id": external_id})
         return User(**user.model_dump())
@@ -0,0 +1,148 @@
+import asyncio
+import hashlib
+import time
+
+import httpx
+import jwt
+from auth.models import User
+
+
+class JWKSKeyStore:
+    """
+    Cache of the JSON Web Key Sets of the OpenID Connect issuers.
+
+    The OpenID configuration and the key set of an issuer are fetched asynchronously on first use
+    and again after the ttl. A key id missing from the cached key set, e.g. after a key rotation,
+    refreshes the key set at most once per min_refresh_interval.
+    """
+
+    def __init__(
+        self,
+        ttl: float = 3600.0,
+        min_refresh_interval: float = 60.0,
+        timeout: float = 10.0,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ) -> None:
+        """
+        Initialize the JWKSKeyStore.
+
+        :param ttl: Time in seconds after which the key set of an issuer is fetched again.
+        :param min_refresh_interval: Minimum time in seconds between fetches caused by unknown key ids.
+        :param timeout: Timeout in seconds of the requests to the issuer.
+        :param transport: Optional. The httpx transport used for the requests, e.g. in tests.
+        """
+        self.ttl = ttl
+        self.min_refresh_interval = min_refresh_interval
+        self.timeout = timeout
+        self.transport = transport
+        self._key_sets: dict[str, tuple[float, dict[str, jwt.PyJWK]]] = {}
+        self._locks: dict[str, asyncio.Lock] = {}
+
+    async def get_signing_key(self, issuer: str, kid: str) -> jwt.PyJWK:
+        """
+        Get the key used by the issuer to sign tokens.
+
+        :param issuer: The issuer URL from the iss claim.
+        :param kid: The key id from the token header.
+        :return: The PyJWK signing key.
+        :raises jwt.exceptions.PyJWKClientError: If the issuer has no key with the key id.
+        """
+        fetched_at, keys = self._key_sets.get(issuer, (None, {}))
+        now = time.monotonic()
+        if (
+            fetched_at is None
+            or fetched_at + self.ttl <= now
+            or (kid not in keys and fetched_at + self.min_refresh_interval <= now)
+        ):
+            keys = await self._refresh(issuer, fetched_at)
+        if kid not in keys:
+            raise jwt.exceptions.PyJWKClientError(
+                f'Unable to find a signing key that matches: "{kid}"'
+            )
+        return keys[kid]
+
+    async def _refresh(
+        self, issuer: str, fetched_at: float | None
+    ) -> dict[str, jwt.PyJWK]:
+        lock = self._locks.setdefault(issuer, asyncio.Lock())
+        async with lock:
+            current = self._key_sets.get(issuer)
+            # The key set was already refreshed by a concurrent request
+            if current is not None and current[0] != fetched_at:
+                return current[1]
+            keys = await self._fetch(issuer)
+            self._key_sets[issuer] = (time.monotonic(), keys)
+            return keys
+
+    async def _fetch(self, issuer: str) -> dict[str, jwt.PyJWK]:
+        async with httpx.AsyncClient(
+            timeout=self.timeout, transport=self.transport
+        ) as client:
+            response = await client.get(issuer + "/.well-known/openid-configuration")
+            response.raise_for_status()
+            well_known = response.json()
+            if "jwks_uri" not in well_known:
+                raise Exception("jwks_uri not found in OpenID configuration")
+            response = await client.get(well_known["jwks_uri"])
+            response.raise_for_status()
+        key_set = jwt.PyJWKSet.from_dict(response.json())
+        return {key.key_id: key for key in key_set.keys}
+
+
+class TokenUserCache:
+    """
+    Cache of the users authenticated by verified tokens.
+
+    Entries are keyed by the SHA-256 hash of the token and expire with the token,
+    but not later than after the ttl.
+    """
+
+    def __init__(self, ttl: float = 300.0, max_entries: int = 10000) -> None:
+        """
+        Initialize the TokenUserCache.
+
+        :param ttl: Maximum time in seconds for which a user is cached.
+        :param max_entries: Maximum number of cached tokens.
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._users: dict[str, tuple[float, User]] = {}
+
+    @staticmethod
+    def _key(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, token: str) -> User | None:
+        """
+        Get the user authenticated by a token.
+
+        :param token: The verified token.
+        :return: The User object, or None if the token is not cached or has expired.
+        """
+        key = self._key(token)
+        entry = self._users.get(key)
+        if entry is None:
+            return None
+        expires_at, user = entry
+        if expires_at <= time.time():
+            self._users.pop(key, None)
+            return None
+        return user
+
+    def set(self, token: str, user: User, exp: float | None = None) -> None:
+        """
+        Cache the user authenticated by a verified token.
+
+        :param token: The verified token.
+        :param user: The User object.
+        :param exp: Optional. The exp claim of the token, i.e. its expiration time as a Unix timestamp.
+        """
+        now = time.time()
+        expires_at = now + self.ttl if exp is None else min(exp, now + self.ttl)
+        if len(self._users) >= self.max_entries:
+            self._users = {
+                key: entry for key, entry in self._users.items() if entry[0] > now
+            }
+            if len(self._users) >= self.max_entries:
+                del self._users[next(iter(self._users))]
+        self._users[self._key(token)] = (expires_at, user)
@@ -21,6 +21,25 @@ class Config(BaseSettings):
     AZURE_CLIENT_ID: str | None = os.getenv("AZURE_CLIENT_ID", None)
     SSO_AUTH: bool = os.getenv("SSO_AUTH", "False").lower() in ("true", "1", "t")
     PRICE_LIST_PATH: str = str((BASE_DIR / Path("config/data/provider_price_list.json")).resolve())
+    UPSTREAM_MAX_CONNECTIONS: int = 100
+    UPSTREAM_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    UPSTREAM_KEEPALIVE_EXPIRY: float = 30.0
+    UPSTREAM_HTTP2: bool = False
+    UPSTREAM_TIMEOUT: float = 100.0
+    UPSTREAM_CONNECT_TIMEOUT: float = 50.0
+    UPSTREAM_PROVIDER_TIMEOUTS: dict[str, float] = {}
+    TRANSACTION_WRITER_QUEUE_SIZE: int = 1000
+    TRANSACTION_WRITER_WORKERS: int = 2
+    TRANSACTION_WRITER_BATCH_SIZE: int = 50
+    TRANSACTION_WRITER_OVERFLOW: str = "block"
+    TRANSACTION_ROLLUP_COMPACTION_INTERVAL: float = 300.0
+    RESPONSE_CACHE_TTL: float = 60.0
+    RESPONSE_CACHE_CLOSED_TTL: float | None = None
+    RESPONSE_CACHE_MAX_ENTRIES: int = 1000
+    RESPONSE_CACHE_BACKEND: str | None = None
+    PROJECT_ROUTING_TTL: float = 10.0
+    JWKS_CACHE_TTL: float = 3600.0
+    AUTH_TOKEN_CACHE_TTL: float = 300.0
 
 
 config = Config()
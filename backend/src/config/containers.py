@@ -3,23 +3,39 @@ import inspect
 import json
 import uuid
 from logging import Logger
-from typing import Optional
-from uuid import UUID
+from typing import Any, Optional
 
 import pymongo
 from pymongo.database import Database as MongoDatabase
 from app.logging import logger, logging_context
+from app.transaction_writer import TransactionWriter
+from app.upstream import UpstreamClientPool
 from auth.repositories import UserRepository
+from auth.tokens import JWKSKeyStore, TokenUserCache
 from dependency_injector import containers, providers
 from dependency_injector.containers import Container
 from dependency_injector.providers import Dependency, Factory, Provider, Singleton
 from dependency_injector.wiring import Provide, inject  # noqa
 from lato import Application, DependencyProvider, TransactionContext
-from projects.repositories import ProjectRepository
-from raw_transactions.repositories import RawTransactionRepository
+from projects.repositories import (
+    AsyncProjectRepository,
+    ProjectRepository,
+    ProjectStatsRepository,
+)
+from projects.routing import ProjectRoutingTable
+from raw_transactions.repositories import (
+    AsyncRawTransactionRepository,
+    RawTransactionRepository,
+)
+from seedwork.cache import InMemoryCacheBackend, ResponseCache, load_cache_backend
+from seedwork.repositories import AsyncMongoClientPool, MongoRepository
 from settings.repositories import SettingsRepository
-from transactions.repositories import TransactionRepository
-from utils import read_provider_pricelist
+from transactions.repositories import (
+    AsyncTransactionRepository,
+    TransactionRepository,
+    TransactionRollupRepository,
+)
+from utils import PricingEngine, read_provider_pricelist
 
 # logger = logging.getLogger("ps")
 # logger.setLevel(logging.DEBUG)
@@ -62,6 +78,42 @@ def resolve_provider_by_type(container: Container, cls: type) -> Optional[Provid
     return None
 
 
+def get_indexed_repository_names() -> list[str]:
+    """
+    List the names of the transaction level repositories which manage MongoDB indexes.
+
+    :return: The names of the repository providers in TransactionContainer.
+    """
+    return [
+        name
+        for name, provider in TransactionContainer.providers.items()
+        if isinstance(provider, Singleton) and issubclass(provider.cls, MongoRepository)
+    ]
+
+
+def create_response_cache(config) -> ResponseCache:
+    """
+    Create the ResponseCache of the worker.
+
+    Invalidations of the in-memory cache reach only the worker storing the transactions,
+    so unless a shared backend is configured, entries of closed date ranges expire after
+    RESPONSE_CACHE_TTL when RESPONSE_CACHE_CLOSED_TTL is not set.
+
+    :param config: The application configuration.
+    :return: The ResponseCache.
+    """
+    closed_ttl = config.RESPONSE_CACHE_CLOSED_TTL
+    if config.RESPONSE_CACHE_BACKEND:
+        backend = load_cache_backend(config.RESPONSE_CACHE_BACKEND)
+    else:
+        backend = InMemoryCacheBackend(config.RESPONSE_CACHE_MAX_ENTRIES)
+        if closed_ttl is None:
+            closed_ttl = config.RESPONSE_CACHE_TTL
+    return ResponseCache(
+        backend=backend, ttl=config.RESPONSE_CACHE_TTL, closed_ttl=closed_ttl
+    )
+
+
 def _default(val):
     """
     Convert a value to its default representation.
@@ -94,6 +146,7 @@ class ContainerProvider(DependencyProvider):
     Dependency provider for integrating a dependency injection container.
 
     This provider interacts with the specified container to manage dependencies.
+    The providers resolved for identifiers are cached until a dependency is registered.
     """
 
     def __init__(self, container: Container):
@@ -104,6 +157,25 @@ class ContainerProvider(DependencyProvider):
         """
         self.container = container
         self.counter = 0
+        self._providers: dict[str | type, Optional[Provider]] = {}
+
+    def get_provider(self, identifier: str | type) -> Optional[Provider]:
+        """
+        Get the provider of the dependency identified by the specified identifier.
+
+        :param identifier: The identifier (either a string or a type) of the dependency.
+        :return: The Provider object, or None if the container has no such dependency.
+        """
+        try:
+            return self._providers[identifier]
+        except KeyError:
+            pass
+        if isinstance(identifier, type):
+            provider = resolve_provider_by_type(self.container, identifier)
+        else:
+            provider = self.container.providers.get(identifier)
+        self._providers[identifier] = provider
+        return provider
 
     def has_dependency(self, identifier: str | type) -> bool:
         """
@@ -112,12 +184,7 @@ class ContainerProvider(DependencyProvider):
         :param identifier: The identifier (either a string or a type) of the dependency.
         :return: True if the dependency is found, False otherwise.
         """
-        if isinstance(identifier, type) and resolve_provider_by_type(
-            self.container, identifier
-        ):
-            return True
-        if type(identifier) is str:
-            return identifier in self.container.providers
+        return self.get_provider(identifier) is not None
 
     def register_dependency(self, identifier, dependency_instance):
         """
@@ -132,6 +199,7 @@ class ContainerProvider(DependencyProvider):
         except TypeError:
             setattr(self.container, f"{str(identifier)}-{self.counter}", pr)
             self.counter += 1
+        self._providers.clear()
 
     def get_dependency(self, identifier):
         """
@@ -140,15 +208,10 @@ class ContainerProvider(DependencyProvider):
         :param identifier: The identifier of the dependency to be retrieved.
         :return: The instance of the dependency.
         """
-        try:
-            if isinstance(identifier, type):
-                provider = resolve_provider_by_type(self.container, identifier)
-            else:
-                provider = getattr(self.container, identifier)
-            instance = provider()
-        except Exception as e:
-            raise e
-        return instance
+        provider = self.get_provider(identifier)
+        if provider is None:
+            raise ValueError(f"Cannot resolve dependency {identifier}")
+        return provider()
 
     def copy(self, *args, **kwargs):
         """
@@ -163,6 +226,71 @@ class ContainerProvider(DependencyProvider):
         return dp
 
 
+class TransactionProvider(DependencyProvider):
+    """
+    Dependency provider of a single transaction context.
+
+    Dependencies registered for the transaction, e.g. its correlation id, are kept by the
+    provider, all other dependencies are resolved by the ContainerProvider of the
+    TransactionContainer shared by all transactions of the worker.
+    """
+
+    def __init__(self, container_provider: ContainerProvider, **dependencies):
+        """
+        Initialize the TransactionProvider.
+
+        :param container_provider: The ContainerProvider of the shared TransactionContainer.
+        :param dependencies: The dependencies of the transaction keyed by name.
+        """
+        self.container_provider = container_provider
+        self.dependencies: dict[str | type, Any] = dependencies
+
+    def has_dependency(self, identifier: str | type) -> bool:
+        """
+        Check if the transaction or the shared container has a dependency identified by the specified identifier.
+
+        :param identifier: The identifier (either a string or a type) of the dependency.
+        :return: True if the dependency is found, False otherwise.
+        """
+        return (
+            identifier in self.dependencies
+            or self.container_provider.has_dependency(identifier)
+        )
+
+    def register_dependency(self, identifier, dependency_instance):
+        """
+        Register a dependency of the transaction.
+
+        :param identifier: The identifier for the dependency.
+        :param dependency_instance: The instance of the dependency to be registered.
+        """
+        self.dependencies[identifier] = dependency_instance
+
+    def get_dependency(self, identifier):
+        """
+        Get the instance of a dependency of the transaction or the shared container.
+
+        :param identifier: The identifier of the dependency to be retrieved.
+        :return: The instance of the dependency.
+        """
+        try:
+            return self.dependencies[identifier]
+        except KeyError:
+            return self.container_provider.get_dependency(identifier)
+
+    def copy(self, *args, **kwargs):
+        """
+        Create a copy of the TransactionProvider with updated parameters.
+
+        :param args: Additional positional arguments.
+        :param kwargs: Additional keyword arguments.
+        :return: A new instance of TransactionProvider sharing the container.
+        """
+        dp = TransactionProvider(self.container_provider, **self.dependencies)
+        dp.update(*args, **kwargs)
+        return dp
+
+
 def create_application(container, **kwargs):
     """
     Create and configure an application with a dependency injection container.
@@ -179,6 +307,19 @@ def create_application(container, **kwargs):
     # application.include_module(...)
     # application.include_module(...)
 
+    # The repositories are stateless, so they are shared by all transactions of the worker,
+    # the async ones look up the Motor collection of the running event loop on every call
+    transaction_level_provider = ContainerProvider(
+        TransactionContainer(
+            logger=logger,
+            db_client=container.db_client,
+            async_db_client=container.async_db_client,
+            response_cache=container.response_cache,
+            project_routing_table=container.project_routing_table,
+            app=application,
+        )
+    )
+
     @application.on_create_transaction_context
     def on_create_transaction_context():
         """
@@ -186,15 +327,11 @@ def create_application(container, **kwargs):
 
         :return: A new TransactionContext.
         """
-        correlation_id = uuid.uuid4()
-        transaction_level_container = TransactionContainer(
-            correlation_id=correlation_id,
-            logger=logger,
-            db_client=container.db_client,
-            app=application,
+        return TransactionContext(
+            dependency_provider=TransactionProvider(
+                transaction_level_provider, correlation_id=uuid.uuid4()
+            )
         )
-        transaction_level_provider = ContainerProvider(transaction_level_container)
-        return TransactionContext(dependency_provider=transaction_level_provider)
 
     @application.on_enter_transaction_context
     def on_enter_transaction_context(ctx: TransactionContext):
@@ -242,6 +379,10 @@ class TopLevelContainer(containers.DeclarativeContainer):
         ),
         config=config,
     )
+    async_db_client = providers.Singleton(
+        lambda config: AsyncMongoClientPool(config.MONGO_URL, config.DATABASE_NAME),
+        config=config,
+    )
     application: Application = providers.Singleton(
         create_application,
         db_client=db_client,
@@ -254,6 +395,46 @@ class TopLevelContainer(containers.DeclarativeContainer):
         lambda config: read_provider_pricelist(config.PRICE_LIST_PATH),
         config=config
     )
+    pricing_engine = providers.Singleton(PricingEngine, pricelist=provider_pricelist)
+
+    upstream_client_pool = providers.Singleton(
+        lambda config: UpstreamClientPool(
+            max_connections=config.UPSTREAM_MAX_CONNECTIONS,
+            max_keepalive_connections=config.UPSTREAM_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=config.UPSTREAM_KEEPALIVE_EXPIRY,
+            http2=config.UPSTREAM_HTTP2,
+            timeout=config.UPSTREAM_TIMEOUT,
+            connect_timeout=config.UPSTREAM_CONNECT_TIMEOUT,
+            provider_timeouts=config.UPSTREAM_PROVIDER_TIMEOUTS,
+        ),
+        config=config,
+    )
+
+    transaction_writer = providers.Singleton(
+        lambda config, application: TransactionWriter(
+            application=application,
+            queue_size=config.TRANSACTION_WRITER_QUEUE_SIZE,
+            workers=config.TRANSACTION_WRITER_WORKERS,
+            batch_size=config.TRANSACTION_WRITER_BATCH_SIZE,
+            overflow_policy=config.TRANSACTION_WRITER_OVERFLOW,
+        ),
+        config=config,
+        application=application,
+    )
+
+    response_cache = providers.Singleton(create_response_cache, config=config)
+
+    project_routing_table = providers.Singleton(
+        lambda config: ProjectRoutingTable(ttl=config.PROJECT_ROUTING_TTL),
+        config=config,
+    )
+
+    jwks_key_store = providers.Singleton(
+        lambda config: JWKSKeyStore(ttl=config.JWKS_CACHE_TTL), config=config
+    )
+    token_user_cache = providers.Singleton(
+        lambda config: TokenUserCache(ttl=config.AUTH_TOKEN_CACHE_TTL), config=config
+    )
 
 
 class TransactionContainer(containers.DeclarativeContainer):
@@ -263,17 +444,27 @@ class TransactionContainer(containers.DeclarativeContainer):
     Inherits from containers.DeclarativeContainer.
     """
 
-    correlation_id = providers.Dependency(instance_of=UUID)
     logger = providers.Dependency(instance_of=Logger)
     db_client = providers.Dependency(instance_of=MongoDatabase)
+    async_db_client = providers.Dependency(instance_of=AsyncMongoClientPool)
+    response_cache = providers.Dependency(instance_of=ResponseCache)
+    project_routing_table = providers.Dependency(instance_of=ProjectRoutingTable)
     app = providers.Dependency(instance_of=Application)
 
     project_repository = providers.Singleton(
         ProjectRepository, db_client=db_client, collection_name="projects"
     )
+    project_stats_repository = providers.Singleton(
+        ProjectStatsRepository, db_client=db_client, collection_name="project_stats"
+    )
     transaction_repository = providers.Singleton(
         TransactionRepository, db_client=db_client, collection_name="transactions"
     )
+    transaction_rollup_repository = providers.Singleton(
+        TransactionRollupRepository,
+        db_client=db_client,
+        collection_name="transaction_rollups",
+    )
     raw_transaction_repository = providers.Singleton(
         RawTransactionRepository,
         db_client=db_client,
@@ -285,5 +476,19 @@ class TransactionContainer(containers.DeclarativeContainer):
     user_repository = providers.Singleton(
         UserRepository, db_client=db_client, collection_name="users"
     )
+
+    async_project_repository = providers.Singleton(
+        AsyncProjectRepository, db_client=async_db_client, collection_name="projects"
+    )
+    async_transaction_repository = providers.Singleton(
+        AsyncTransactionRepository,
+        db_client=async_db_client,
+        collection_name="transactions",
+    )
+    async_raw_transaction_repository = providers.Singleton(
+        AsyncRawTransactionRepository,
+        db_client=async_db_client,
+        collection_name="raw_transactions",
+    )
     
     #todo: move price calculation provider here
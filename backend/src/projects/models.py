@@ -21,3 +21,11 @@ class Project(BaseModel):
     org_id: str | None
     created_at: datetime = datetime.now(tz=timezone.utc)
     owner: str
+
+
+class ProjectStats(BaseModel):
+    id: str  # project id
+    total_cost: int | float = 0
+    total_transactions: int = 0
+    status_counts: dict[str, int] = {}
+    status_costs: dict[str, int | float] = {}
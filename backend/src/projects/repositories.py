@@ -1,6 +1,10 @@
-from projects.models import Project
+from collections import defaultdict
+
+from projects.models import Project, ProjectStats
+from pymongo import ASCENDING, IndexModel
+from pymongo.errors import DuplicateKeyError
 from seedwork.exceptions import AlreadyExistsException, NotFoundException
-from seedwork.repositories import MongoRepository
+from seedwork.repositories import AsyncMongoRepository, MongoRepository
 
 
 class ProjectNotFoundException(NotFoundException):
@@ -23,6 +27,7 @@ class ProjectRepository(MongoRepository):
     """
 
     model_class = Project
+    indexes = [IndexModel([("slug", ASCENDING)], unique=True)]
 
     def add(self, doc):
         """
@@ -32,9 +37,13 @@ class ProjectRepository(MongoRepository):
         :raise SlugAlreadyExistsException: If the slug already exists in the repository.
         :return: The result of the add operation.
         """
-        if self.count({"slug": doc.slug}) > 0:
+        if self.exists({"slug": doc.slug}):
+            raise SlugAlreadyExistsException(f"Slug already exists: {doc.slug}")
+        try:
+            result = super().add(doc)
+        except DuplicateKeyError:
+            # the slug was taken by a concurrent request after the check
             raise SlugAlreadyExistsException(f"Slug already exists: {doc.slug}")
-        result = super().add(doc)
         return result
 
     def update(self, doc) -> Project:
@@ -49,9 +58,13 @@ class ProjectRepository(MongoRepository):
         same_slug = [p for p in self.find({"slug": doc.slug}) if p.id != doc.id]
         if len(same_slug) > 0:
             raise SlugAlreadyExistsException(f"Slug already exists: {doc.slug}")
-        if self.count({"_id": doc.id}) == 0:
+        if not self.exists({"_id": doc.id}):
             raise ProjectNotFoundException(f"Project not found: {doc.id}")
-        result = super().update(doc)
+        try:
+            result = super().update(doc)
+        except DuplicateKeyError:
+            # the slug was taken by a concurrent request after the check
+            raise SlugAlreadyExistsException(f"Slug already exists: {doc.slug}")
         return result
 
     def get(self, doc_id: str) -> Project:
@@ -72,3 +85,118 @@ class ProjectRepository(MongoRepository):
         :return: The Project object corresponding to the specified slug.
         """
         return self.find_one({"slug": slug})
+
+
+class ProjectStatsRepository(MongoRepository):
+    """
+    Repository for managing the transaction counters of the projects.
+
+    The counters are incremented when transactions are stored, so the totals of a project
+    can be read without loading its transactions.
+    """
+
+    model_class = ProjectStats
+
+    def increment(self, transactions: list):
+        """
+        Atomically add the stored transactions to the counters of their projects.
+
+        :param transactions: The stored transactions (anything with project_id, status_code and total_cost).
+        :return: The number of updated projects.
+        """
+        increments = defaultdict(lambda: defaultdict(int))
+        for transaction in transactions:
+            cost = transaction.total_cost or 0
+            status_code = str(transaction.status_code)
+            project_increments = increments[transaction.project_id]
+            project_increments["total_cost"] += cost
+            project_increments["total_transactions"] += 1
+            project_increments[f"status_counts.{status_code}"] += 1
+            project_increments[f"status_costs.{status_code}"] += cost
+        for project_id, project_increments in increments.items():
+            self._collection.update_one(
+                {"_id": project_id}, {"$inc": dict(project_increments)}, upsert=True
+            )
+        return len(increments)
+
+    def get_for_projects(self, project_ids: list[str]) -> dict[str, ProjectStats]:
+        """
+        Retrieve the counters of the given projects.
+
+        :param project_ids: The unique identifiers of the projects.
+        :return: A dictionary of ProjectStats keyed by project id, empty counters for projects without transactions.
+        """
+        found = {
+            stats.id: stats for stats in self.find({"_id": {"$in": project_ids}})
+        }
+        return {
+            project_id: found.get(project_id, ProjectStats(id=project_id))
+            for project_id in project_ids
+        }
+
+    def replace_all(self, stats: list[ProjectStats]):
+        """
+        Replace the counters of all projects.
+
+        :param stats: The new ProjectStats objects.
+        :return: The result of the add operation.
+        """
+        self.remove_all()
+        return self.add_many(stats)
+
+
+class AsyncProjectRepository(AsyncMongoRepository):
+    """
+    Asynchronous repository for managing and accessing project data.
+
+    Inherits from AsyncMongoRepository and is specific to the Project model.
+    """
+
+    model_class = Project
+
+    async def add(self, doc):
+        """
+        Add a project document to the repository.
+
+        :param doc: The Project object to be added.
+        :raise SlugAlreadyExistsException: If the slug already exists in the repository.
+        :return: The result of the add operation.
+        """
+        if await self.exists({"slug": doc.slug}):
+            raise SlugAlreadyExistsException(f"Slug already exists: {doc.slug}")
+        try:
+            result = await super().add(doc)
+        except DuplicateKeyError:
+            # the slug was taken by a concurrent request after the check
+            raise SlugAlreadyExistsException(f"Slug already exists: {doc.slug}")
+        return result
+
+    async def update(self, doc) -> Project:
+        """
+        Update a project document in the repository.
+
+        :param doc: The Project object to be updated.
+        :raise SlugAlreadyExistsException: If the updated slug already exists in the repository.
+        :raise ProjectNotFoundException: If the project with the specified identifier is not found.
+        :return: The result of the update operation.
+        """
+        same_slug = [p for p in await self.find({"slug": doc.slug}) if p.id != doc.id]
+        if len(same_slug) > 0:
+            raise SlugAlreadyExistsException(f"Slug already exists: {doc.slug}")
+        if not await self.exists({"_id": doc.id}):
+            raise ProjectNotFoundException(f"Project not found: {doc.id}")
+        try:
+            result = await super().update(doc)
+        except DuplicateKeyError:
+            # the slug was taken by a concurrent request after the check
+            raise SlugAlreadyExistsException(f"Slug already exists: {doc.slug}")
+        return result
+
+    async def get_by_slug(self, slug: str) -> Project:
+        """
+        Retrieve a project by its slug.
+
+        :param slug: The unique slug of the project to be retrieved.
+        :return: The Project object corresponding to the specified slug.
+        """
+        return await self.find_one({"slug": slug})
@@ -0,0 +1,112 @@
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Iterable
+
+from projects.models import Project
+
+
+@dataclass(frozen=True)
+class ProjectRoute:
+    """
+    Routing data of a project used by the reverse proxy.
+
+    :param project_id: The Project ID.
+    :param api_bases: The api_base of every AI provider of the project keyed by its slug.
+    :param loaded_at: Monotonic time when the route was loaded.
+    """
+
+    project_id: str
+    api_bases: dict[str, str]
+    loaded_at: float = field(default_factory=time.monotonic)
+
+    @classmethod
+    def from_project(cls, project: Project) -> "ProjectRoute":
+        """
+        Create the route of a project.
+
+        :param project: The Project object.
+        :return: The ProjectRoute of the project.
+        """
+        return cls(
+            project_id=project.id,
+            api_bases={
+                provider.slug: provider.api_base for provider in project.ai_providers
+            },
+        )
+
+
+class ProjectRoutingTable:
+    """
+    In-memory map of project slugs to the routes of the reverse proxy.
+
+    The table is loaded at startup and updated by the project use cases. Routes expire after
+    the ttl, so changes of projects made by other workers are picked up.
+    """
+
+    def __init__(self, ttl: float = 10.0) -> None:
+        """
+        Initialize the ProjectRoutingTable.
+
+        :param ttl: Time in seconds after which a route is read from the database again.
+        """
+        self.ttl = ttl
+        self._routes: dict[str, ProjectRoute] = {}
+        self._slugs: dict[str, str] = {}
+        # Routes are also updated from worker threads
+        self._lock = threading.Lock()
+
+    def get(self, slug: str) -> ProjectRoute | None:
+        """
+        Get the route of a project.
+
+        :param slug: The slug of the project.
+        :return: The ProjectRoute, or None if the project is unknown or its route has expired.
+        """
+        route = self._routes.get(slug)
+        if route is None or route.loaded_at + self.ttl <= time.monotonic():
+            return None
+        return route
+
+    def set(self, project: Project) -> ProjectRoute:
+        """
+        Add or replace the route of a project, also when its slug has changed.
+
+        :param project: The Project object.
+        :return: The ProjectRoute of the project.
+        """
+        route = ProjectRoute.from_project(project)
+        with self._lock:
+            self._remove(project.id)
+            self._routes[project.slug] = route
+            self._slugs[project.id] = project.slug
+        return route
+
+    def remove(self, project_id: str) -> None:
+        """
+        Remove the route of a project.
+
+        :param project_id: The Project ID.
+        """
+        with self._lock:
+            self._remove(project_id)
+
+    def load(self, projects: Iterable[Project]) -> int:
+        """
+        Replace all routes with the routes of the given projects.
+
+        :param projects: All projects.
+        :return: The number of loaded routes.
+        """
+        routes = {
+            project.slug: ProjectRoute.from_project(project) for project in projects
+        }
+        with self._lock:
+            self._routes = routes
+            self._slugs = {route.project_id: slug for slug, route in routes.items()}
+        return len(routes)
+
+    def _remove(self, project_id: str) -> None:
+        slug = self._slugs.pop(project_id, None)
+        if slug is not None:
+            self._routes.pop(slug, None)
@@ -1,5 +1,12 @@
-from projects.models import Project
-from projects.repositories import ProjectRepository
+from projects.models import Project, ProjectStats
+from projects.repositories import (
+    AsyncProjectRepository,
+    ProjectRepository,
+    ProjectStatsRepository,
+)
+from projects.routing import ProjectRoute, ProjectRoutingTable
+from seedwork.cache import ResponseCache
+from transactions.repositories import TransactionRepository
 
 
 def get_project(
@@ -17,6 +24,21 @@ def get_project(
     return project
 
 
+async def get_project_async(
+    project_id: str,
+    async_project_repository: AsyncProjectRepository,
+) -> Project:
+    """
+    Retrieve a project by its unique identifier without blocking the event loop.
+
+    :param project_id: The unique identifier of the project to be retrieved.
+    :param async_project_repository: An instance of AsyncProjectRepository used for accessing project data.
+    :return: The Project object corresponding to the specified identifier.
+    """
+    project = await async_project_repository.find_one({"_id": project_id})
+    return project
+
+
 def get_project_by_slug(
     slug: str,
     project_repository: ProjectRepository,
@@ -32,6 +54,57 @@ def get_project_by_slug(
     return project
 
 
+async def get_project_by_slug_async(
+    slug: str,
+    async_project_repository: AsyncProjectRepository,
+) -> Project:
+    """
+    Retrieve a project by its slug without blocking the event loop.
+
+    :param slug: The unique slug of the project to be retrieved.
+    :param async_project_repository: An instance of AsyncProjectRepository used for accessing project data.
+    :return: The Project object corresponding to the specified slug.
+    """
+    project = await async_project_repository.get_by_slug(slug)
+    return project
+
+
+async def get_project_route_async(
+    slug: str,
+    async_project_repository: AsyncProjectRepository,
+    project_routing_table: ProjectRoutingTable,
+) -> ProjectRoute:
+    """
+    Retrieve the reverse proxy route of a project by its slug.
+
+    The route is read from the database only if it is not in the routing table or has expired.
+
+    :param slug: The unique slug of the project.
+    :param async_project_repository: An instance of AsyncProjectRepository used for accessing project data.
+    :param project_routing_table: The ProjectRoutingTable of the reverse proxy.
+    :return: The ProjectRoute of the project.
+    """
+    route = project_routing_table.get(slug)
+    if route is None:
+        project = await async_project_repository.get_by_slug(slug)
+        route = project_routing_table.set(project)
+    return route
+
+
+def load_project_routes(
+    project_repository: ProjectRepository,
+    project_routing_table: ProjectRoutingTable,
+) -> int:
+    """
+    Load the reverse proxy routes of all projects into the routing table.
+
+    :param project_repository: An instance of ProjectRepository used for accessing project data.
+    :param project_routing_table: The ProjectRoutingTable of the reverse proxy.
+    :return: The number of loaded routes.
+    """
+    return project_routing_table.load(project_repository.get_all())
+
+
 def get_all_projects(project_repository: ProjectRepository) -> list[Project]:
     """
     Retrieve a list of all projects.
@@ -46,25 +119,37 @@ def get_all_projects(project_repository: ProjectRepository) -> list[Project]:
 def add_project(
     project: Project,
     project_repository: ProjectRepository,
+    response_cache: ResponseCache,
+    project_routing_table: ProjectRoutingTable,
 ) -> Project:
     """
     Add a new project to the repository.
 
     :param project: The Project object to be added.
     :param project_repository: An instance of ProjectRepository used for storing project data.
+    :param response_cache: The ResponseCache whose portfolio statistics are invalidated.
+    :param project_routing_table: The ProjectRoutingTable to which the project route is added.
     :return: The newly added Project object.
     """
     project_repository.add(project)
+    response_cache.invalidate()
+    project_routing_table.set(project)
     return project
 
 
 def update_project(
-    project_repository: ProjectRepository, project_id: str, fields_to_update: dict
+    project_repository: ProjectRepository,
+    response_cache: ResponseCache,
+    project_routing_table: ProjectRoutingTable,
+    project_id: str,
+    fields_to_update: dict,
 ) -> Project:
     """
     Update a project with specified fields.
 
     :param project_repository: An instance of ProjectRepository used for accessing project data.
+    :param response_cache: The ResponseCache whose portfolio statistics are invalidated.
+    :param project_routing_table: The ProjectRoutingTable in which the project route is replaced.
     :param project_id: The unique identifier of the project to be updated.
     :param fields_to_update: A dictionary containing the fields and values to update in the project.
     :return: The updated Project object.
@@ -72,22 +157,72 @@ def update_project(
     project = project_repository.get(project_id)
     project.__dict__.update(**fields_to_update)
     project_repository.update(project)
+    response_cache.invalidate()
+    project_routing_table.set(project)
     return project
 
 
 def delete_project(
     project_id: str,
     project_repository: ProjectRepository,
+    response_cache: ResponseCache,
+    project_routing_table: ProjectRoutingTable,
 ) -> None:
     """
     Delete a project and associated data.
 
     :param project_id: The unique identifier of the project to be deleted.
     :param project_repository: An instance of ProjectRepository used for accessing project data.
+    :param response_cache: The ResponseCache whose statistics of the project are invalidated.
+    :param project_routing_table: The ProjectRoutingTable from which the project route is removed.
     :return: None
     """
     project_repository.delete(project_id)
+    response_cache.invalidate([project_id])
+    project_routing_table.remove(project_id)
 
 
 def count_projects(project_repository: ProjectRepository) -> int:
     return project_repository.count()
+
+
+def get_project_stats(
+    project_ids: list[str],
+    project_stats_repository: ProjectStatsRepository,
+) -> dict[str, ProjectStats]:
+    """
+    Retrieve the transaction counters of the given projects.
+
+    :param project_ids: The unique identifiers of the projects.
+    :param project_stats_repository: An instance of ProjectStatsRepository used for accessing the counters.
+    :return: A dictionary of ProjectStats objects keyed by project id.
+    """
+    return project_stats_repository.get_for_projects(project_ids)
+
+
+def rebuild_project_stats(
+    transaction_repository: TransactionRepository,
+    project_stats_repository: ProjectStatsRepository,
+) -> int:
+    """
+    Recalculate the transaction counters of all projects from the stored transactions.
+
+    Used to backfill the counters of transactions stored before they were maintained.
+    Transactions stored while the counters are rebuilt may be missed.
+
+    :param transaction_repository: An instance of TransactionRepository used for accessing transaction data.
+    :param project_stats_repository: An instance of ProjectStatsRepository used for storing the counters.
+    :return: The number of projects with transactions.
+    """
+    stats = {}
+    for row in transaction_repository.get_costs_by_project_and_status():
+        project_stats = stats.setdefault(
+            row["project_id"], ProjectStats(id=row["project_id"])
+        )
+        status_code = str(row["status_code"])
+        project_stats.total_cost += row["total_cost"]
+        project_stats.total_transactions += row["total_transactions"]
+        project_stats.status_counts[status_code] = row["total_transactions"]
+        project_stats.status_costs[status_code] = row["total_cost"]
+    project_stats_repository.replace_all(list(stats.values()))
+    return len(stats)
@@ -1,6 +1,7 @@
+from pymongo import ASCENDING, IndexModel
 from raw_transactions.models import RawTransaction, TransactionTypeEnum
 from seedwork.exceptions import NotFoundException
-from seedwork.repositories import MongoRepository
+from seedwork.repositories import AsyncMongoRepository, MongoRepository
 
 
 class RawTransactionNotFoundException(NotFoundException):
@@ -19,6 +20,7 @@ class RawTransactionRepository(MongoRepository):
     """
 
     model_class = RawTransaction
+    indexes = [IndexModel([("transaction_id", ASCENDING), ("type", ASCENDING)])]
 
     def add(self, doc):
         """
@@ -69,3 +71,53 @@ class RawTransactionRepository(MongoRepository):
         :return: The result of the cascading deletion operation.
         """
         return self.delete_many(filter_by={"transaction_id": transaction_id})
+
+
+class AsyncRawTransactionRepository(AsyncMongoRepository):
+    """
+    Asynchronous repository for managing and accessing raw transaction data.
+
+    Inherits from AsyncMongoRepository and is specific to the RawTransaction model.
+    """
+
+    model_class = RawTransaction
+
+    async def get_for_transaction(self, transaction_id: str) -> list[RawTransaction]:
+        """
+        Retrieve a list of raw transactions associated with a specific transaction.
+
+        :param transaction_id: The identifier of the transaction for which raw transactions are retrieved.
+        :return: A list of RawTransaction objects associated with the specified transaction.
+        """
+        return await self.find({"transaction_id": transaction_id})
+
+    async def get_request_by_transaction_id(self, transaction_id: str) -> RawTransaction:
+        """
+        Retrieve the raw request of a specific transaction.
+
+        :param transaction_id: The unique identifier of the transaction to retrieve.
+        :return: The RawTransaction object (type - request) corresponding to the specified transaction_id.
+        """
+        return await self.find_one(
+            {"transaction_id": transaction_id, "type": TransactionTypeEnum.request}
+        )
+
+    async def get_response_by_transaction_id(self, transaction_id: str) -> RawTransaction:
+        """
+        Retrieve the raw response of a specific transaction.
+
+        :param transaction_id: The unique identifier of the transaction to retrieve.
+        :return: The RawTransaction object (type - response) corresponding to the specified transaction_id.
+        """
+        return await self.find_one(
+            {"transaction_id": transaction_id, "type": TransactionTypeEnum.response}
+        )
+
+    async def delete_cascade(self, transaction_id: str):
+        """
+        Delete all raw transactions of a specific transaction.
+
+        :param transaction_id: The identifier of the transaction for which raw transactions will be deleted.
+        :return: The result of the delete operation.
+        """
+        return await self.delete_many(filter_by={"transaction_id": transaction_id})
@@ -1,5 +1,5 @@
 from .models import RawTransaction, TransactionTypeEnum
-from .repositories import RawTransactionRepository
+from .repositories import AsyncRawTransactionRepository, RawTransactionRepository
 from .schemas import CreateRawTransactionSchema
 
 
@@ -31,6 +31,22 @@ def get_request_for_transaction(
     return request
 
 
+async def get_request_for_transaction_async(
+    transaction_id: str, async_raw_transaction_repository: AsyncRawTransactionRepository
+) -> RawTransaction:
+    """
+    Retrieve a specific raw transaction (type - request) by transaction unique identifier without blocking the event loop.
+
+    :param transaction_id: The unique identifier of the transaction to retrieve.
+    :param async_raw_transaction_repository: An instance of AsyncRawTransactionRepository used for accessing raw transaction data.
+    :return: The RawTransaction object corresponding to the specified transaction_id.
+    """
+    request = await async_raw_transaction_repository.get_request_by_transaction_id(
+        transaction_id
+    )
+    return request
+
+
 def get_response_for_transaction(
     transaction_id: str, raw_transaction_repository: RawTransactionRepository
 ) -> RawTransaction:
@@ -45,6 +61,22 @@ def get_response_for_transaction(
     return response
 
 
+async def get_response_for_transaction_async(
+    transaction_id: str, async_raw_transaction_repository: AsyncRawTransactionRepository
+) -> RawTransaction:
+    """
+    Retrieve a specific raw transaction (type - response) by transaction unique identifier without blocking the event loop.
+
+    :param transaction_id: The unique identifier of the transaction to retrieve.
+    :param async_raw_transaction_repository: An instance of AsyncRawTransactionRepository used for accessing raw transaction data.
+    :return: The RawTransaction object corresponding to the specified transaction_id.
+    """
+    response = await async_raw_transaction_repository.get_response_by_transaction_id(
+        transaction_id
+    )
+    return response
+
+
 def delete_raw_transactions(
     transaction_id: str, raw_transaction_repository: RawTransactionRepository
 ) -> None:
@@ -67,14 +99,23 @@ def add_raw_transaction(
     return raw_transaction
 
 
-def store_raw_transactions(
+def prepare_raw_transactions(
     request,
     request_content,
     response,
     response_content,
     transaction_id: str,
-    raw_transaction_repository: RawTransactionRepository,
-):
+) -> list[RawTransaction]:
+    """
+    Build the raw request and response documents of a transaction without storing them.
+
+    :param request: The request object sent to the AI provider.
+    :param request_content: The decoded request content.
+    :param response: The response object received from the AI provider.
+    :param response_content: The decoded response content.
+    :param transaction_id: The Transaction ID the raw transactions belong to.
+    :return: A list with the request and response RawTransaction objects.
+    """
     request_data = RawTransaction(
         transaction_id=transaction_id,
         type=TransactionTypeEnum.request,
@@ -101,5 +142,18 @@ def store_raw_transactions(
             encoding=response.encoding,
         ),
     )
-    raw_transaction_repository.add(request_data)
-    raw_transaction_repository.add(response_data)
+    return [request_data, response_data]
+
+
+def store_raw_transactions(
+    request,
+    request_content,
+    response,
+    response_content,
+    transaction_id: str,
+    raw_transaction_repository: RawTransactionRepository,
+):
+    raw_transactions = prepare_raw_transactions(
+        request, request_content, response, response_content, transaction_id
+    )
+    raw_transaction_repository.add_many(raw_transactions)
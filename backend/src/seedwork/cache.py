@@ -0,0 +1,298 @@
+import importlib
+from abc import ABC, abstractmethod
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Callable, Iterable
+
+PORTFOLIO_TAG = "portfolio"
+
+
+def project_tag(project_id: str) -> str:
+    """
+    Get the tag of the cache entries computed from the transactions of a project.
+
+    :param project_id: The Project ID.
+    :return: The tag of the project entries.
+    """
+    return f"project:{project_id}"
+
+
+class ResponseCacheBackend(ABC):
+    """
+    Storage of the ResponseCache entries.
+
+    Implement this interface to share the cached responses between workers, e.g. in Redis.
+    The values are the responses of the API handlers, i.e. lists of pydantic models.
+    """
+
+    @abstractmethod
+    def get(self, key: str) -> Any | None:
+        """
+        Get a cached value.
+
+        :param key: The key of the entry.
+        :return: The cached value, or None if the entry does not exist or has expired.
+        """
+
+    @abstractmethod
+    def set(self, key: str, value: Any, ttl: float | None, tag: str) -> None:
+        """
+        Store a value.
+
+        :param key: The key of the entry.
+        :param value: The value to store.
+        :param ttl: Time in seconds after which the entry expires, None means never.
+        :param tag: The tag used to invalidate the entry.
+        """
+
+    @abstractmethod
+    def invalidate(self, tags: Iterable[str]) -> int:
+        """
+        Remove all entries with the given tags.
+
+        :param tags: The tags of the entries to remove.
+        :return: The number of removed entries.
+        """
+
+    @abstractmethod
+    def clear(self) -> None:
+        """
+        Remove all entries.
+        """
+
+    @abstractmethod
+    def size(self) -> int:
+        """
+        Get the number of stored entries.
+
+        :return: The number of entries.
+        """
+
+
+class InMemoryCacheBackend(ResponseCacheBackend):
+    """
+    Process-local ResponseCacheBackend evicting the least recently used entries.
+    """
+
+    def __init__(self, max_entries: int = 1000) -> None:
+        """
+        Initialize the InMemoryCacheBackend.
+
+        :param max_entries: Maximum number of stored entries.
+        """
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float | None, str, Any]] = OrderedDict()
+        self._tags: dict[str, set[str]] = {}
+        # Entries are invalidated from the transaction writer threads
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, _, value = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: float | None, tag: str) -> None:
+        expires_at = None if ttl is None else time.monotonic() + ttl
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (expires_at, tag, value)
+            self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self, tags: Iterable[str]) -> int:
+        removed = 0
+        with self._lock:
+            for tag in tags:
+                for key in self._tags.pop(tag, ()):
+                    del self._entries[key]
+                    removed += 1
+        return removed
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+
+    def size(self) -> int:
+        return len(self._entries)
+
+    def _remove(self, key: str) -> None:
+        _, tag, _ = self._entries.pop(key)
+        keys = self._tags[tag]
+        keys.discard(key)
+        if not keys:
+            del self._tags[tag]
+
+
+def load_cache_backend(path: str) -> ResponseCacheBackend:
+    """
+    Create a custom ResponseCacheBackend.
+
+    :param path: Import path of the backend class, e.g. "mypackage.cache:RedisCacheBackend".
+    :return: The backend instantiated without arguments.
+    """
+    module_name, _, class_name = path.partition(":")
+    backend_class = getattr(importlib.import_module(module_name), class_name)
+    if not issubclass(backend_class, ResponseCacheBackend):
+        raise ValueError(f"{path} is not a ResponseCacheBackend")
+    return backend_class()
+
+
+def _normalize_date(date: datetime | None) -> datetime | None:
+    if date is not None and date.tzinfo is not None:
+        date = date.astimezone(timezone.utc).replace(tzinfo=None)
+    return date
+
+
+class ResponseCache:
+    """
+    Cache of the statistics computed by the statistics and portfolio endpoints.
+
+    Entries are keyed by the endpoint, project and the normalized date range and period.
+    Writes of transactions invalidate the entries of their project and the portfolio-wide entries.
+    Entries of closed date ranges, ending in the past, expire only after closed_ttl.
+    A response computed while its tag was invalidated is returned but not stored.
+    """
+
+    def __init__(
+        self,
+        backend: ResponseCacheBackend,
+        ttl: float = 60.0,
+        closed_ttl: float | None = None,
+    ) -> None:
+        """
+        Initialize the ResponseCache.
+
+        :param backend: The storage of the entries.
+        :param ttl: Time in seconds after which entries of date ranges reaching the present expire.
+        :param closed_ttl: Optional. Time in seconds after which entries of closed date ranges expire,
+            they are kept until invalidated by default.
+        """
+        self.backend = backend
+        self.ttl = ttl
+        self.closed_ttl = closed_ttl
+        self._counters = dict(hits=0, misses=0, invalidated=0)
+        self._generations: dict[str, int] = {}
+        self._clears = 0
+        # Orders the stores after computing with the invalidations from the writer threads
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(
+        endpoint: str,
+        project_id: str | None = None,
+        date_from: datetime | None = None,
+        date_to: datetime | None = None,
+        period: Any = None,
+    ) -> str:
+        """
+        Build the key of a cached response.
+
+        :param endpoint: The name of the endpoint.
+        :param project_id: Optional. The Project ID, None for portfolio-wide responses.
+        :param date_from: Optional. The start of the date range.
+        :param date_to: Optional. The end of the date range.
+        :param period: Optional. The period of the statistics.
+        :return: The key of the entry.
+        """
+        date_from, date_to = _normalize_date(date_from), _normalize_date(date_to)
+        return "|".join(
+            [
+                endpoint,
+                project_id or "",
+                date_from.isoformat() if date_from else "",
+                date_to.isoformat() if date_to else "",
+                str(getattr(period, "value", period) or ""),
+            ]
+        )
+
+    def get_or_compute(
+        self,
+        compute: Callable[[], Any],
+        endpoint: str,
+        project_id: str | None = None,
+        date_from: datetime | None = None,
+        date_to: datetime | None = None,
+        period: Any = None,
+    ) -> Any:
+        """
+        Get a cached response, computing and storing it on a miss.
+
+        :param compute: Function computing the response.
+        :param endpoint: The name of the endpoint.
+        :param project_id: Optional. The Project ID, None for portfolio-wide responses.
+        :param date_from: Optional. The start of the date range.
+        :param date_to: Optional. The end of the date range, None means the present.
+        :param period: Optional. The period of the statistics.
+        :return: The cached or computed response.
+        """
+        key = self.key(endpoint, project_id, date_from, date_to, period)
+        value = self.backend.get(key)
+        if value is not None:
+            self._counters["hits"] += 1
+            return value
+        self._counters["misses"] += 1
+        tag = project_tag(project_id) if project_id else PORTFOLIO_TAG
+        generation = (self._clears, self._generations.get(tag, 0))
+        value = compute()
+        date_to = _normalize_date(date_to)
+        closed = date_to is not None and date_to < datetime.now(
+            tz=timezone.utc
+        ).replace(tzinfo=None)
+        with self._lock:
+            # the value may miss the writes which invalidated the tag while computing
+            if (self._clears, self._generations.get(tag, 0)) == generation:
+                self.backend.set(
+                    key, value, self.closed_ttl if closed else self.ttl, tag
+                )
+        return value
+
+    def invalidate(self, project_ids: Iterable[str] = ()) -> int:
+        """
+        Remove the entries of the given projects and the portfolio-wide entries.
+
+        :param project_ids: Optional. The IDs of the projects whose data changed.
+        :return: The number of removed entries.
+        """
+        tags = [PORTFOLIO_TAG, *{project_tag(project_id) for project_id in project_ids}]
+        with self._lock:
+            for tag in tags:
+                self._generations[tag] = self._generations.get(tag, 0) + 1
+            removed = self.backend.invalidate(tags)
+        self._counters["invalidated"] += removed
+        return removed
+
+    def clear(self) -> None:
+        """
+        Remove all entries.
+        """
+        with self._lock:
+            self._clears += 1
+            self.backend.clear()
+
+    def stats(self) -> dict[str, Any]:
+        """
+        Get the metrics of the cache.
+
+        :return: A dictionary with the number of hits, misses, invalidated and stored entries.
+        """
+        lookups = self._counters["hits"] + self._counters["misses"]
+        return {
+            **self._counters,
+            "hit_ratio": self._counters["hits"] / lookups if lookups else 0.0,
+            "entries": self.backend.size(),
+            "backend": type(self.backend).__name__,
+            "ttl": self.ttl,
+            "closed_ttl": self.closed_ttl,
+        }
@@ -1,6 +1,10 @@
+import asyncio
+import threading
 from typing import Any
 
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
 from pydantic import BaseModel
+from pymongo import IndexModel
 from seedwork.exceptions import NotFoundException
 from utils import deserialize_data, serialize_data
 
@@ -9,6 +13,34 @@ class DocumentNotFoundException(NotFoundException):
     pass
 
 
+def projection_from_fields(fields: list[str] | None) -> dict[str, int] | None:
+    """
+    Create a MongoDB projection which fetches only the given fields.
+
+    :param fields: Names of the fields to fetch, "id" stands for the document identifier.
+    :return: The projection, or None if all fields should be fetched.
+    """
+    if fields is None:
+        return None
+    projection = {("_id" if field == "id" else field): 1 for field in fields}
+    projection.setdefault("_id", 0)
+    return projection
+
+
+def total_from_page(skip: int, limit: int, fetched: int) -> int | None:
+    """
+    Derive the number of all matching documents from a fetched page.
+
+    :param skip: The number of skipped documents.
+    :param limit: The page size, 0 means no limit.
+    :param fetched: The number of fetched documents.
+    :return: The total, or None if the page is full or empty after skipped documents and the total is unknown.
+    """
+    if (limit and fetched >= limit) or (fetched == 0 and skip > 0):
+        return None
+    return skip + fetched
+
+
 class MongoRepository:
     """
     Generic repository for managing and accessing MongoDB data.
@@ -17,6 +49,7 @@ class MongoRepository:
     """
 
     model_class = BaseModel
+    indexes: list[IndexModel] = []
 
     def __init__(self, db_client, collection_name):
         """
@@ -38,6 +71,19 @@ class MongoRepository:
         result = self._collection.insert_one(data)
         return result
 
+    def add_many(self, docs: list[BaseModel]):
+        """
+        Add multiple documents to the repository in a single round trip.
+
+        :param docs: The list of BaseModel objects to be added.
+        :return: The result of the add operation, or None if there is nothing to add.
+        """
+        if not docs:
+            return None
+        data = [serialize_data(doc.model_dump()) for doc in docs]
+        result = self._collection.insert_many(data, ordered=False)
+        return result
+
     def update(self, doc: BaseModel):
         """
         Update a document in the repository.
@@ -81,17 +127,19 @@ class MongoRepository:
             raise DocumentNotFoundException(f"Document not found: {filter_by}")
         return self.model_class(**deserialize_data(data))
 
-    def find(self, filter_by=None):
+    def find(self, filter_by=None, fields: list[str] | None = None, as_model=True):
         """
         Retrieve a list of documents from the repository based on the provided filter.
 
         :param filter_by: The filter criteria for retrieving documents.
-        :return: A list of BaseModel objects corresponding to the specified filter.
+        :param fields: Optional. Names of the fields to fetch, all fields are fetched if not provided.
+        :param as_model: If false, the documents are returned as dictionaries without validation.
+        :return: A list of BaseModel objects (or dictionaries) corresponding to the specified filter.
         """
-        return [
-            self.model_class(**deserialize_data(data))
-            for data in self._collection.find(filter_by or {})
-        ]
+        cursor = self._collection.find(filter_by or {}, projection_from_fields(fields))
+        if not as_model:
+            return [deserialize_data(data) for data in cursor]
+        return [self.model_class(**deserialize_data(data)) for data in cursor]
 
     def get(self, doc_id: str) -> BaseModel:
         """
@@ -128,5 +176,295 @@ class MongoRepository:
         """
         return self._collection.delete_many({})
 
-    # def exists(self, filter_by=None) -> bool:
-    #     return self._collection.find_one(filter_by or {}) is not None
+    def create_indexes(self) -> list[str]:
+        """
+        Create the indexes declared for the repository if they do not exist yet.
+
+        :return: The names of the declared indexes.
+        """
+        if not self.indexes:
+            return []
+        return self._collection.create_indexes(self.indexes)
+
+    def index_stats(self) -> list[dict[str, Any]]:
+        """
+        Retrieve usage statistics of the collection indexes.
+
+        :return: A list with the name, key and number of accesses of every index.
+        """
+        return [
+            {
+                "name": stats["name"],
+                "key": stats["key"],
+                "accesses": stats["accesses"]["ops"],
+                "since": stats["accesses"]["since"],
+            }
+            for stats in self._collection.aggregate([{"$indexStats": {}}])
+        ]
+
+    def exists(self, filter_by=None) -> bool:
+        """
+        Check if any document matches the provided filter.
+
+        Stops at the first matching document instead of counting all of them.
+
+        :param filter_by: The filter criteria for the documents.
+        :return: True if a matching document exists, False otherwise.
+        """
+        return self._collection.find_one(filter_by or {}, {"_id": 1}) is not None
+
+    def find_with_total(
+        self,
+        filter_by=None,
+        sort: list[tuple[str, int]] | None = None,
+        skip: int = 0,
+        limit: int = 0,
+        fields: list[str] | None = None,
+        as_model=True,
+    ) -> tuple[list, int]:
+        """
+        Retrieve a page of documents together with the number of all matching documents.
+
+        The total is derived from the fetched page when it is the last one,
+        the documents are counted by MongoDB only if there are more pages.
+
+        :param filter_by: The filter criteria for retrieving documents.
+        :param sort: Optional. The sort specification, e.g. [("request_time", -1)].
+        :param skip: The number of documents to skip.
+        :param limit: The maximum number of documents to return, 0 means no limit.
+        :param fields: Optional. Names of the fields to fetch, all fields are fetched if not provided.
+        :param as_model: If false, the documents are returned as dictionaries without validation.
+        :return: A tuple of the list of BaseModel objects (or dictionaries) and the total number of documents.
+        """
+        cursor = self._collection.find(filter_by or {}, projection_from_fields(fields))
+        if sort:
+            cursor = cursor.sort(sort)
+        documents = [deserialize_data(data) for data in cursor.skip(skip).limit(limit)]
+        total = total_from_page(skip, limit, len(documents))
+        if total is None:
+            total = self.count(filter_by)
+        if not as_model:
+            return documents, total
+        return [self.model_class(**data) for data in documents], total
+
+
+class AsyncMongoClientPool:
+    """
+    Motor clients of the event loops accessing MongoDB.
+
+    A Motor client is bound to the event loop it is first used on and fails on any
+    other loop, so one client is kept per running loop. Clients of closed loops are
+    closed when the next client is created.
+    """
+
+    def __init__(self, mongo_url: str, database_name: str) -> None:
+        """
+        Initialize the AsyncMongoClientPool.
+
+        :param mongo_url: The connection URL of the MongoDB server.
+        :param database_name: The name of the MongoDB database.
+        """
+        self.mongo_url = mongo_url
+        self.database_name = database_name
+        self._clients: dict[asyncio.AbstractEventLoop, AsyncIOMotorClient] = {}
+        self._lock = threading.Lock()
+
+    def get_database(self) -> AsyncIOMotorDatabase:
+        """
+        Get the database of the client bound to the running event loop, creating it on first use.
+
+        :return: The Motor database.
+        :raises RuntimeError: If there is no running event loop.
+        """
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            with self._lock:
+                for closed_loop in [
+                    other for other in self._clients if other.is_closed()
+                ]:
+                    self._clients.pop(closed_loop).close()
+                client = self._clients.get(loop)
+                if client is None:
+                    client = AsyncIOMotorClient(self.mongo_url)
+                    self._clients[loop] = client
+        return client.get_database(self.database_name)
+
+    def __getitem__(self, collection_name: str):
+        """
+        Get a collection of the database bound to the running event loop.
+
+        :param collection_name: The name of the collection.
+        :return: The Motor collection.
+        """
+        return self.get_database()[collection_name]
+
+    def close(self) -> None:
+        """
+        Close the clients of all event loops.
+        """
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+        for client in clients:
+            client.close()
+
+
+class AsyncMongoRepository:
+    """
+    Generic asynchronous repository for managing and accessing MongoDB data.
+
+    Counterpart of MongoRepository backed by Motor, so the I/O can be awaited
+    instead of blocking the event loop. The collection is looked up on every call,
+    so the repository can be used from any event loop.
+    """
+
+    model_class = BaseModel
+
+    def __init__(self, db_client: AsyncMongoClientPool, collection_name):
+        """
+        Initialize the AsyncMongoRepository with the Motor client pool and collection name.
+
+        :param db_client: The pool of Motor clients of the running event loops.
+        :param collection_name: The name of the collection in the MongoDB database.
+        """
+        self._db_client = db_client
+        self._collection_name = collection_name
+
+    @property
+    def _collection(self):
+        """
+        The collection of the database bound to the running event loop.
+        """
+        return self._db_client[self._collection_name]
+
+    async def add(self, doc: BaseModel):
+        """
+        Add a document to the repository.
+
+        :param doc: The BaseModel object to be added.
+        :return: The result of the add operation.
+        """
+        data = serialize_data(doc.model_dump())
+        result = await self._collection.insert_one(data)
+        return result
+
+    async def add_many(self, docs: list[BaseModel]):
+        """
+        Add multiple documents to the repository in a single round trip.
+
+        :param docs: The list of BaseModel objects to be added.
+        :return: The result of the add operation, or None if there is nothing to add.
+        """
+        if not docs:
+            return None
+        data = [serialize_data(doc.model_dump()) for doc in docs]
+        result = await self._collection.insert_many(data, ordered=False)
+        return result
+
+    async def update(self, doc: BaseModel):
+        """
+        Update a document in the repository.
+
+        :param doc: The BaseModel object to be updated.
+        :return: The result of the update operation.
+        """
+        data = serialize_data(doc.model_dump())
+        result = await self._collection.update_one({"_id": doc.id}, {"$set": data})
+        return result
+
+    async def delete(self, doc_id: str):
+        """
+        Delete a document from the repository by its unique identifier.
+
+        :param doc_id: The unique identifier of the document to be deleted.
+        :return: The result of the delete operation.
+        """
+        result = await self._collection.delete_one({"_id": doc_id})
+        return result
+
+    async def delete_many(self, filter_by: dict[str, Any]):
+        """
+        Delete multiple documents from the repository based on the provided filter.
+
+        :param filter_by: The filter criteria for deleting documents.
+        :return: The result of the delete operation.
+        """
+        result = await self._collection.delete_many(filter_by)
+        return result
+
+    async def find_one(self, filter_by=None):
+        """
+        Retrieve a single document from the repository based on the provided filter.
+
+        :param filter_by: The filter criteria for retrieving the document.
+        :return: The BaseModel object corresponding to the specified filter.
+        """
+        data = await self._collection.find_one(filter_by or {})
+        if data is None:
+            raise DocumentNotFoundException(f"Document not found: {filter_by}")
+        return self.model_class(**deserialize_data(data))
+
+    async def find(
+        self, filter_by=None, fields: list[str] | None = None, as_model=True
+    ):
+        """
+        Retrieve a list of documents from the repository based on the provided filter.
+
+        :param filter_by: The filter criteria for retrieving documents.
+        :param fields: Optional. Names of the fields to fetch, all fields are fetched if not provided.
+        :param as_model: If false, the documents are returned as dictionaries without validation.
+        :return: A list of BaseModel objects (or dictionaries) corresponding to the specified filter.
+        """
+        cursor = self._collection.find(filter_by or {}, projection_from_fields(fields))
+        if not as_model:
+            return [deserialize_data(data) async for data in cursor]
+        return [self.model_class(**deserialize_data(data)) async for data in cursor]
+
+    async def get(self, doc_id: str) -> BaseModel:
+        """
+        Retrieve a document by its unique identifier.
+
+        :param doc_id: The unique identifier of the document to be retrieved.
+        :return: The BaseModel object corresponding to the specified identifier.
+        """
+        return await self.find_one({"_id": doc_id})
+
+    async def get_all(self, **kwargs):
+        """
+        Retrieve all documents from the repository.
+
+        :param kwargs: Additional optional parameters for filtering.
+        :return: A list of all BaseModel objects stored in the repository.
+        """
+        return await self.find(kwargs)
+
+    async def count(self, filter_by=None):
+        """
+        Count the number of documents in the repository based on the provided filter.
+
+        :param filter_by: The filter criteria for counting documents.
+        :return: The count of documents that meet the specified filtering criteria.
+        """
+        return await self._collection.count_documents(filter_by or {})
+
+    async def remove_all(self):
+        """
+        Remove all documents from the repository.
+
+        :return: The result of the delete operation for all documents.
+        """
+        return await self._collection.delete_many({})
+
+    async def exists(self, filter_by=None) -> bool:
+        """
+        Check if any document matches the provided filter.
+
+        Stops at the first matching document instead of counting all of them.
+
+        :param filter_by: The filter criteria for the documents.
+        :return: True if a matching document exists, False otherwise.
+        """
+        return (
+            await self._collection.find_one(filter_by or {}, {"_id": 1})
+        ) is not None
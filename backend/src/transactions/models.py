@@ -39,3 +39,24 @@ class Transaction(BaseModel):
     # self_harm: Any = None
     # violence: Any = None
     # sexual: Any = None
+
+
+class TransactionRollup(BaseModel):
+    id: str
+    granularity: str  # 5minutes, hour or day
+    project_id: str
+    provider: str
+    model: str | None
+    status_code: int  # status code class: 200, 300, 400 or 500
+    date: datetime  # start of the bucket
+    total_input_tokens: int = 0
+    total_output_tokens: int = 0
+    total_input_cost: int | float = 0
+    total_output_cost: int | float = 0
+    total_cost: int | float = 0
+    latency: int | float = 0  # milliseconds
+    generation_speed: int | float = 0
+    total_transactions: int = 0
+    # latency and number of the transactions with generation speed
+    speed_latency: int | float = 0
+    speed_transactions: int = 0
@@ -1,9 +1,17 @@
-from datetime import datetime
-from operator import attrgetter
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any
 
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import DuplicateKeyError
 from seedwork.exceptions import NotFoundException
-from seedwork.repositories import MongoRepository
-from transactions.models import Transaction
+from seedwork.repositories import (
+    AsyncMongoRepository,
+    MongoRepository,
+    total_from_page,
+)
+from transactions.models import Transaction, TransactionRollup
+from utils import deserialize_data, mongo_date_trunc_from_period
 
 
 class TransactionNotFoundException(NotFoundException):
@@ -20,6 +28,36 @@ class TransactionRepository(MongoRepository):
     """
 
     model_class = Transaction
+    indexes = [
+        # statistics: create_transaction_query_from_filters
+        IndexModel([("project_id", ASCENDING), ("response_time", ASCENDING)]),
+        IndexModel(
+            [
+                ("project_id", ASCENDING),
+                ("provider", ASCENDING),
+                ("model", ASCENDING),
+                ("response_time", ASCENDING),
+            ]
+        ),
+        IndexModel(
+            [
+                ("project_id", ASCENDING),
+                ("status_code", ASCENDING),
+                ("response_time", ASCENDING),
+            ]
+        ),
+        IndexModel([("response_time", ASCENDING)]),
+        IndexModel([("tags", ASCENDING), ("response_time", ASCENDING)]),
+        # transactions list: create_transaction_list_query_from_filters
+        IndexModel([("request_time", DESCENDING), ("_id", DESCENDING)]),
+        IndexModel(
+            [
+                ("project_id", ASCENDING),
+                ("request_time", DESCENDING),
+                ("_id", DESCENDING),
+            ]
+        ),
+    ]
 
     def add(self, doc):
         """
@@ -31,14 +69,18 @@ class TransactionRepository(MongoRepository):
         result = super().add(doc)
         return result
 
-    def get_for_project(self, project_id: str) -> list[Transaction]:
+    def get_for_project(
+        self, project_id: str, fields: list[str] | None = None, as_model=True
+    ) -> list[Transaction] | list[dict[str, Any]]:
         """
         Retrieve a list of transactions associated with a specific project.
 
         :param project_id: The identifier of the project for which transactions are retrieved.
+        :param fields: Optional. Fields to fetch, all fields are fetched if not provided.
+        :param as_model: If false, the transactions are returned as dictionaries without validation.
         :return: A list of Transaction objects associated with the specified project.
         """
-        return self.find({"project_id": project_id})
+        return self.find({"project_id": project_id}, fields=fields, as_model=as_model)
 
     def get_one_by_id(self, transaction_id: str) -> Transaction:
         """
@@ -56,49 +98,237 @@ class TransactionRepository(MongoRepository):
         query: dict[str, str | datetime | None] = None,
         sort_field: str | None = None,
         sort_type: str | None = None,
-    ) -> list[Transaction]:
+        fields: list[str] | None = None,
+    ) -> tuple[list[Transaction], int]:
         """
         Retrieve a paginated and filtered list of transactions from the repository.
 
+        Transactions with a value in the sort field are fetched by a sorted query, the page is
+        filled up with transactions without a value by a second query, so they are placed after all
+        the others, regardless of the ordering method. The total is derived from the fetched pages
+        when they are the last ones, otherwise the matching transactions are counted.
+
         :param page: The page number for pagination.
         :param page_size: The number of transactions per page.
         :param query: Optional query parameters to filter transactions.
-        :param sort_field: Optional. Field to sort by.
+        :param sort_field: Optional. Field to sort by, newest transactions come first if not provided.
         :param sort_type: Optional. Ordering method (asc or desc).
-        :return: A paginated and filtered list of Transaction objects based on the specified criteria.
-        """
-        transactions = self.find(query)
-        sort = False if sort_type == "asc" else True
-        if sort_field:
-            transactions_to_sort = [
-                transaction
-                for transaction in transactions
-                if getattr(transaction, sort_field) is not None
-            ]
-            transactions_rest = [
-                transaction
-                for transaction in transactions
-                if getattr(transaction, sort_field) is None
-            ]
-            sorted_transactions = sorted(
-                transactions_to_sort, key=attrgetter(sort_field), reverse=sort
+        :param fields: Optional. Fields to fetch, all fields are fetched if not provided.
+        :return: A tuple of the paginated and filtered list of Transaction objects
+            and the number of all transactions matching the query.
+        """
+        query = query or {}
+        skip = max(page - 1, 0) * page_size
+        newest_first = [("request_time", DESCENDING), ("_id", DESCENDING)]
+        if not sort_field:
+            return self.find_with_total(
+                query, sort=newest_first, skip=skip, limit=page_size, fields=fields
             )
-            sorted_transactions += transactions_rest
-        else:
-            sorted_transactions = transactions[::-1]
 
-        paginated = sorted_transactions[
-            (page - 1) * page_size : (page - 1) * page_size + page_size
+        projection = dict.fromkeys(fields, 1) if fields else None
+        sort_field = "_id" if sort_field == "id" else sort_field
+        direction = ASCENDING if sort_type == "asc" else DESCENDING
+        with_value = {"$and": [query, {sort_field: {"$ne": None}}]}
+        documents = list(
+            self._collection.find(with_value, projection)
+            .sort([(sort_field, direction), ("_id", direction)])
+            .skip(skip)
+            .limit(page_size)
+        )
+        total = None
+        if len(documents) < page_size:
+            with_value_total = total_from_page(skip, page_size, len(documents))
+            if with_value_total is None:
+                with_value_total = self._collection.count_documents(with_value)
+            nulls_skip = max(skip - with_value_total, 0)
+            missing = page_size - len(documents)
+            nulls = list(
+                self._collection.find({"$and": [query, {sort_field: None}]}, projection)
+                .sort(newest_first)
+                .skip(nulls_skip)
+                .limit(missing)
+            )
+            documents += nulls
+            nulls_total = total_from_page(nulls_skip, missing, len(nulls))
+            if nulls_total is not None:
+                total = with_value_total + nulls_total
+        if total is None:
+            total = self.count(query)
+        transactions = [
+            self.model_class(**deserialize_data(data)) for data in documents
+        ]
+        return transactions, total
+
+    def get_statistics_by_period(
+        self, query: dict[str, Any], period: str
+    ) -> list[dict[str, Any]]:
+        """
+        Aggregate filtered transactions into buckets of the given period.
+
+        Transactions are grouped by the period of their response time, project, provider, model and
+        status code class (200, 300, 400, 500) and the group sums are calculated by MongoDB.
+
+        :param query: Query parameters to filter transactions.
+        :param period: The period of the buckets.
+        :return: A list of dictionaries with the bucket date, project_id, provider, model, status code class,
+            token, cost and latency (in milliseconds) sums, generation speed sum and number of transactions,
+            and the latency sum and number of the transactions with generation speed, ordered by date.
+        """
+        pipeline = [
+            {"$match": query},
+            {
+                "$group": {
+                    "_id": {
+                        "date": {
+                            "$dateTrunc": {
+                                "date": "$response_time",
+                                **mongo_date_trunc_from_period(period),
+                            }
+                        },
+                        "project_id": "$project_id",
+                        "provider": "$provider",
+                        "model": "$model",
+                        "status_code": {
+                            "$subtract": [
+                                "$status_code",
+                                {"$mod": ["$status_code", 100]},
+                            ]
+                        },
+                    },
+                    "total_input_tokens": {"$sum": "$input_tokens"},
+                    "total_output_tokens": {"$sum": "$output_tokens"},
+                    "total_input_cost": {"$sum": "$input_cost"},
+                    "total_output_cost": {"$sum": "$output_cost"},
+                    "total_cost": {"$sum": "$total_cost"},
+                    "latency": {
+                        "$sum": {"$subtract": ["$response_time", "$request_time"]}
+                    },
+                    "generation_speed": {"$sum": "$generation_speed"},
+                    "total_transactions": {"$sum": 1},
+                    "speed_latency": {
+                        "$sum": {
+                            "$cond": [
+                                {"$ne": ["$generation_speed", None]},
+                                {"$subtract": ["$response_time", "$request_time"]},
+                                0,
+                            ]
+                        }
+                    },
+                    "speed_transactions": {
+                        "$sum": {"$cond": [{"$ne": ["$generation_speed", None]}, 1, 0]}
+                    },
+                }
+            },
+            {"$sort": {"_id.date": 1}},
+        ]
+        return [
+            {
+                **row.pop("_id"),
+                **row,
+            }
+            for row in self._collection.aggregate(pipeline)
+        ]
+
+    def get_tag_statistics_by_period(
+        self, query: dict[str, Any], period: str
+    ) -> list[dict[str, Any]]:
+        """
+        Aggregate filtered transactions into buckets of the given period for every tag.
+
+        Transactions are unwound by their tags, transactions without tags are counted
+        under the "untagged-transactions" tag. Only the numeric fields reach the group stage.
+
+        :param query: Query parameters to filter transactions.
+        :param period: The period of the buckets.
+        :return: A list of dictionaries with the bucket date, tag, token and cost sums
+            and number of transactions, ordered by date.
+        """
+        pipeline = [
+            {"$match": query},
+            {
+                "$project": {
+                    "response_time": 1,
+                    "input_tokens": 1,
+                    "output_tokens": 1,
+                    "input_cost": 1,
+                    "output_cost": 1,
+                    "total_cost": 1,
+                    "tags": {
+                        "$cond": [
+                            {"$gt": [{"$size": {"$ifNull": ["$tags", []]}}, 0]},
+                            "$tags",
+                            ["untagged-transactions"],
+                        ]
+                    },
+                }
+            },
+            {"$unwind": "$tags"},
+            {
+                "$group": {
+                    "_id": {
+                        "date": {
+                            "$dateTrunc": {
+                                "date": "$response_time",
+                                **mongo_date_trunc_from_period(period),
+                            }
+                        },
+                        "tag": "$tags",
+                    },
+                    "total_input_tokens": {"$sum": "$input_tokens"},
+                    "total_output_tokens": {"$sum": "$output_tokens"},
+                    "total_input_cost": {"$sum": "$input_cost"},
+                    "total_output_cost": {"$sum": "$output_cost"},
+                    "total_cost": {"$sum": "$total_cost"},
+                    "total_transactions": {"$sum": 1},
+                }
+            },
+            {"$sort": {"_id.date": 1}},
+        ]
+        return [
+            {
+                **row.pop("_id"),
+                **row,
+            }
+            for row in self._collection.aggregate(pipeline)
+        ]
+
+    def get_costs_by_project_and_status(self) -> list[dict[str, Any]]:
+        """
+        Sum the costs and count the transactions of every project and status code.
+
+        :return: A list of dictionaries with project_id, status_code, total_cost and total_transactions.
+        """
+        pipeline = [
+            {
+                "$group": {
+                    "_id": {"project_id": "$project_id", "status_code": "$status_code"},
+                    "total_cost": {"$sum": "$total_cost"},
+                    "total_transactions": {"$sum": 1},
+                }
+            }
+        ]
+        return [
+            {
+                **row.pop("_id"),
+                **row,
+            }
+            for row in self._collection.aggregate(pipeline)
         ]
-        return paginated
 
-    def get_filtered(self, query: dict[str, str | datetime | None]):
+    def get_filtered(
+        self,
+        query: dict[str, str | datetime | None],
+        fields: list[str] | None = None,
+        as_model=True,
+    ):
         """
         Retrieve a paginated and filtered list of transactions from the repository.
         :param query: Query parameters to filter transactions.
+        :param fields: Optional. Fields to fetch, all fields are fetched if not provided.
+        :param as_model: If false, the transactions are returned as dictionaries without validation.
         :return: A filtered list of Transaction objects based on the specified criteria.
         """
-        return self.find(query)
+        return self.find(query, fields=fields, as_model=as_model)
 
     def delete_cascade(self, project_id: str):
         """
@@ -108,3 +338,512 @@ class TransactionRepository(MongoRepository):
         :return: The result of the cascading deletion operation.
         """
         return self.delete_many(filter_by={"project_id": project_id})
+
+
+ROLLUP_BUCKETS = {
+    "5minutes": timedelta(minutes=5),
+    "hour": timedelta(hours=1),
+    "day": timedelta(days=1),
+}
+ROLLUP_KEYS = ["granularity", "project_id", "provider", "model", "status_code", "date"]
+ROLLUP_SUMS = [
+    "total_input_tokens",
+    "total_output_tokens",
+    "total_input_cost",
+    "total_output_cost",
+    "total_cost",
+    "latency",
+    "generation_speed",
+    "total_transactions",
+    "speed_latency",
+    "speed_transactions",
+]
+_EPOCH = datetime(1970, 1, 1)
+
+
+def rollup_bucket_start(date: datetime, granularity: str) -> datetime:
+    """
+    Calculate the start of the rollup bucket containing the given date.
+
+    :param date: The date, naive dates are assumed to be in UTC.
+    :param granularity: The rollup granularity (5minutes, hour or day).
+    :return: The naive UTC start of the bucket.
+    """
+    if date.tzinfo is not None:
+        date = date.astimezone(timezone.utc).replace(tzinfo=None)
+    return date - (date - _EPOCH) % ROLLUP_BUCKETS[granularity]
+
+
+class TransactionRollupRepository(MongoRepository):
+    """
+    Repository for managing the time-bucket rollups of the transactions.
+
+    Stored transactions are added to 5-minute rollups per project, provider, model and status code
+    class. The 5-minute rollups are compacted into hour rollups and those into day rollups.
+    The rollups of a granularity are complete up to its watermark. Transactions stored later for an
+    already compacted bucket mark the bucket as stale, the statistics are read from the transactions
+    until the next compaction recomputes the bucket from the finer rollups.
+    """
+
+    model_class = TransactionRollup
+    indexes = [
+        IndexModel(
+            [
+                ("granularity", ASCENDING),
+                ("project_id", ASCENDING),
+                ("date", ASCENDING),
+            ]
+        ),
+    ]
+    state_id = "compacted_until"
+    lock_id = "lock"
+
+    def get_watermarks(self) -> dict[str, datetime | None] | None:
+        """
+        Retrieve the dates up to which the hour and day rollups are complete.
+
+        :return: The watermarks keyed by granularity, or None if the rollups have not been built yet.
+        """
+        state = self._collection.find_one({"_id": self.state_id})
+        if state is None:
+            return None
+        return self._watermarks_from_state(state)
+
+    def get_stale_buckets(self) -> dict[str, dict[datetime, int]]:
+        """
+        Retrieve the compacted buckets which miss transactions stored after their compaction.
+
+        :return: The start dates of the stale buckets with their number of marks, keyed by granularity.
+        """
+        state = self._collection.find_one({"_id": self.state_id}) or {}
+        return self._stale_buckets_from_state(state)
+
+    def acquire_lock(self, ttl: timedelta) -> str | None:
+        """
+        Acquire the lock guarding the compaction and the rebuild of the rollups between workers.
+
+        :param ttl: Time after which the lock expires if it is not released.
+        :return: The token of the acquired lock, or None if another worker holds it.
+        """
+        now = datetime.now(tz=timezone.utc).replace(tzinfo=None)
+        token = uuid.uuid4().hex
+        try:
+            # matches only an expired lock, otherwise the upsert conflicts with the held one
+            self._collection.update_one(
+                {"_id": self.lock_id, "expires_at": {"$lt": now}},
+                {"$set": {"expires_at": now + ttl, "token": token}},
+                upsert=True,
+            )
+        except DuplicateKeyError:
+            return None
+        return token
+
+    def release_lock(self, token: str):
+        """
+        Release the lock acquired with the given token.
+
+        :param token: The token returned by acquire_lock.
+        :return: The result of the delete operation.
+        """
+        return self._collection.delete_one({"_id": self.lock_id, "token": token})
+
+    def set_watermarks(self, watermarks: dict[str, datetime | None]):
+        """
+        Store the dates up to which the hour and day rollups are complete.
+
+        :param watermarks: The watermarks keyed by granularity.
+        :return: The result of the update operation.
+        """
+        return self._collection.update_one(
+            {"_id": self.state_id}, {"$set": watermarks}, upsert=True
+        )
+
+    def add_transactions(self, transactions: list[Transaction]) -> int:
+        """
+        Add stored transactions to the 5-minute rollups and mark the compacted buckets as stale.
+
+        :param transactions: The stored transactions.
+        :return: The number of updated rollups.
+        """
+        increments = {}
+        for transaction in transactions:
+            latency = (
+                transaction.response_time - transaction.request_time
+            ).total_seconds() * 1000
+            with_speed = transaction.generation_speed is not None
+            values = dict(
+                total_input_tokens=transaction.input_tokens or 0,
+                total_output_tokens=transaction.output_tokens or 0,
+                total_input_cost=transaction.input_cost or 0,
+                total_output_cost=transaction.output_cost or 0,
+                total_cost=transaction.total_cost or 0,
+                latency=latency,
+                generation_speed=transaction.generation_speed or 0,
+                total_transactions=1,
+                speed_latency=latency if with_speed else 0,
+                speed_transactions=1 if with_speed else 0,
+            )
+            key = (
+                "5minutes",
+                transaction.project_id,
+                transaction.provider,
+                transaction.model,
+                transaction.status_code // 100 * 100,
+                rollup_bucket_start(transaction.response_time, "5minutes"),
+            )
+            rollup = increments.setdefault(key, dict.fromkeys(ROLLUP_SUMS, 0))
+            for name, value in values.items():
+                rollup[name] += value
+        for key, rollup in increments.items():
+            self._collection.update_one(
+                {"_id": self._rollup_id(*key)},
+                {"$setOnInsert": dict(zip(ROLLUP_KEYS, key)), "$inc": rollup},
+                upsert=True,
+            )
+
+        # The watermarks are read after the upserts: a compaction moving them later
+        # aggregates the upserted rollups, the buckets compacted earlier are marked
+        watermarks = self.get_watermarks() or {}
+        marks = {}
+        for key in increments:
+            for granularity in ("hour", "day"):
+                date = rollup_bucket_start(key[-1], granularity)
+                watermark = watermarks.get(granularity)
+                if watermark is not None and date < watermark:
+                    marks[f"stale.{granularity}.{date.isoformat()}"] = 1
+        if marks:
+            self._collection.update_one({"_id": self.state_id}, {"$inc": marks})
+        return len(increments)
+
+    def replace_all(self, rows: list[dict[str, Any]]):
+        """
+        Replace all rollups with 5-minute rollups and reset the watermarks and the stale buckets.
+
+        :param rows: The 5-minute buckets of TransactionRepository.get_statistics_by_period.
+        :return: The result of the add operation.
+        """
+        self.delete_many({"granularity": {"$exists": True}})
+        self._collection.replace_one(
+            {"_id": self.state_id}, {"hour": None, "day": None}, upsert=True
+        )
+        return self.add_many([self._rollup_from_row("5minutes", row) for row in rows])
+
+    def compact(self, until: datetime) -> dict[str, int]:
+        """
+        Compact the 5-minute rollups into hour rollups and the hour rollups into day rollups.
+
+        The buckets which end before the given date and after the current watermark are compacted,
+        and the stale buckets are recomputed. The coarser rollups are always recomputed from the
+        finer ones, so compacting a bucket again does not count its transactions twice.
+        Must be called while holding the lock.
+
+        :param until: The date up to which the rollups are compacted.
+        :return: The number of created or recomputed rollups keyed by granularity.
+        """
+        state = self._collection.find_one({"_id": self.state_id}) or {}
+        watermarks = self._watermarks_from_state(state)
+        stale = self._stale_buckets_from_state(state)
+        compacted = {}
+        for source, target in [("5minutes", "hour"), ("hour", "day")]:
+            compacted[target] = 0
+            start = watermarks[target]
+            end = rollup_bucket_start(until, target)
+            if source != "5minutes":
+                # the source rollups are complete only up to their own watermark
+                end = (
+                    None
+                    if watermarks[source] is None
+                    else min(end, rollup_bucket_start(watermarks[source], target))
+                )
+            if end is not None and (start is None or end > start):
+                date_filter = {"$lt": end}
+                if start is not None:
+                    date_filter["$gte"] = start
+                self._compact_buckets(source, target, [date_filter])
+                watermarks[target] = end
+                self.set_watermarks({target: end})
+                # transactions added while compacting did not see the new watermark,
+                # so they were not marked as stale
+                compacted[target] = self._compact_buckets(source, target, [date_filter])
+
+            dates = set(stale[target])
+            if target == "day":
+                # the recomputed hour rollups change their days as well
+                dates.update(rollup_bucket_start(date, "day") for date in stale["hour"])
+            dates = sorted(
+                date
+                for date in dates
+                if watermarks[target] is not None and date < watermarks[target]
+            )
+            if dates:
+                compacted[target] += self._compact_buckets(
+                    source,
+                    target,
+                    [
+                        {"$gte": date, "$lt": date + ROLLUP_BUCKETS[target]}
+                        for date in dates
+                    ],
+                )
+
+        for granularity, buckets in stale.items():
+            for date, marks in buckets.items():
+                # a bucket marked again since the state was read stays stale
+                field = f"stale.{granularity}.{date.isoformat()}"
+                self._collection.update_one(
+                    {"_id": self.state_id, field: marks}, {"$unset": {field: ""}}
+                )
+        return compacted
+
+    def get_statistics_by_period(
+        self,
+        period: str,
+        date_from: datetime | None = None,
+        date_to: datetime | None = None,
+        project_id: str | None = None,
+        null_generation_speed: bool = True,
+        status_codes: list[int] | None = None,
+        providers: list[str] | None = None,
+        models: list[str] | None = None,
+    ) -> list[dict[str, Any]] | None:
+        """
+        Aggregate the rollups into buckets of the given period.
+
+        The coarsest rollups whose buckets fit both the period and the date range are read,
+        completed with finer rollups after their watermark.
+
+        :param period: The period of the buckets.
+        :param date_from: Optional. The starting date of the range.
+        :param date_to: Optional. The inclusive end date of the range.
+        :param project_id: Optional. The unique identifier of the project.
+        :param null_generation_speed: Optional. If false, the latency and the number of transactions
+            include only the transactions with generation speed.
+        :param status_codes: Optional. The status code classes of the transactions.
+        :param providers: Optional. The providers of the transactions.
+        :param models: Optional. The models of the transactions.
+        :return: The buckets in the format of TransactionRepository.get_statistics_by_period,
+            or None if the rollups are not built, cannot serve the date range or are stale in it.
+        """
+        state = self._collection.find_one({"_id": self.state_id})
+        if state is None:
+            return None
+        watermarks = self._watermarks_from_state(state)
+        granularity, end = self._granularity_for(period, date_from, date_to)
+        if granularity is None:
+            return None
+        for level, buckets in self._stale_buckets_from_state(state).items():
+            for date in buckets:
+                if (date_from is None or date + ROLLUP_BUCKETS[level] > date_from) and (
+                    end is None or date < end
+                ):
+                    return None
+
+        ranges, start = [], date_from
+        for level in ["day", "hour", "5minutes"][
+            ["day", "hour", "5minutes"].index(granularity) :
+        ]:
+            level_end = end if level == "5minutes" else watermarks[level]
+            if level != "5minutes" and level_end is None:
+                continue
+            if level_end is not None and end is not None:
+                level_end = min(level_end, end)
+            date_filter = {}
+            if start is not None:
+                date_filter["$gte"] = start
+            if level_end is not None:
+                date_filter["$lt"] = level_end
+            ranges.append(
+                {"granularity": level, **({"date": date_filter} if date_filter else {})}
+            )
+            if level != "5minutes":
+                start = (
+                    watermarks[level]
+                    if start is None
+                    else max(start, watermarks[level])
+                )
+
+        query = {"$or": ranges}
+        if project_id is not None:
+            query["project_id"] = project_id
+        status_classes = [code for code in status_codes or [] if code % 100 == 0]
+        if status_classes:
+            query["status_code"] = {"$in": status_classes}
+        if providers is not None:
+            query["provider"] = {"$in": providers}
+        if models is not None:
+            query["model"] = {"$in": models}
+        rows = self._aggregate(query, period, with_speed_only=not null_generation_speed)
+        return sorted(rows, key=lambda row: row["date"])
+
+    def delete_cascade(self, project_id: str):
+        """
+        Delete the rollups of a specific project.
+
+        :param project_id: The Project ID for which rollups will be deleted.
+        :return: The result of the delete operation.
+        """
+        return self.delete_many(filter_by={"project_id": project_id})
+
+    @staticmethod
+    def _watermarks_from_state(state: dict[str, Any]) -> dict[str, datetime | None]:
+        return {"hour": state.get("hour"), "day": state.get("day")}
+
+    @staticmethod
+    def _stale_buckets_from_state(
+        state: dict[str, Any],
+    ) -> dict[str, dict[datetime, int]]:
+        stale = state.get("stale", {})
+        return {
+            granularity: {
+                datetime.fromisoformat(date): marks
+                for date, marks in stale.get(granularity, {}).items()
+            }
+            for granularity in ("hour", "day")
+        }
+
+    def _compact_buckets(
+        self, source: str, target: str, date_filters: list[dict[str, datetime]]
+    ) -> int:
+        rows = self._aggregate(
+            {
+                "granularity": source,
+                "$or": [{"date": date_filter} for date_filter in date_filters],
+            },
+            target,
+        )
+        for row in rows:
+            rollup = self._rollup_from_row(target, row)
+            data = rollup.model_dump()
+            del data["id"]
+            self._collection.update_one({"_id": rollup.id}, {"$set": data}, upsert=True)
+        return len(rows)
+
+    def _aggregate(
+        self, query: dict[str, Any], period: str, with_speed_only: bool = False
+    ) -> list[dict[str, Any]]:
+        sums = {name: {"$sum": f"${name}"} for name in ROLLUP_SUMS}
+        if with_speed_only:
+            sums["latency"] = {"$sum": "$speed_latency"}
+            sums["total_transactions"] = {"$sum": "$speed_transactions"}
+        pipeline = [
+            {"$match": query},
+            {
+                "$group": {
+                    "_id": {
+                        "date": {
+                            "$dateTrunc": {
+                                "date": "$date",
+                                **mongo_date_trunc_from_period(period),
+                            }
+                        },
+                        "project_id": "$project_id",
+                        "provider": "$provider",
+                        "model": "$model",
+                        "status_code": "$status_code",
+                    },
+                    **sums,
+                }
+            },
+            {"$match": {"total_transactions": {"$gt": 0}}},
+        ]
+        return [
+            {
+                **row.pop("_id"),
+                **row,
+            }
+            for row in self._collection.aggregate(pipeline)
+        ]
+
+    @staticmethod
+    def _granularity_for(
+        period: str, date_from: datetime | None, date_to: datetime | None
+    ) -> tuple[str | None, datetime | None]:
+        """Choose the coarsest rollups fitting the period and the date range, and the exclusive end of the range."""
+        if period == "5minutes":
+            candidates = ["5minutes"]
+        elif period == "hour":
+            candidates = ["hour", "5minutes"]
+        else:
+            candidates = ["day", "hour", "5minutes"]
+        for granularity in candidates:
+            if (
+                date_from is not None
+                and rollup_bucket_start(date_from, granularity) != date_from
+            ):
+                continue
+            if date_to is None:
+                return granularity, None
+            # an inclusive end like 23:59:59 closes the bucket ending at midnight
+            for end in (
+                date_to + timedelta(seconds=1),
+                date_to + timedelta(microseconds=1),
+            ):
+                if rollup_bucket_start(end, granularity) == end:
+                    return granularity, end
+        return None, None
+
+    @staticmethod
+    def _rollup_id(granularity, project_id, provider, model, status_code, date) -> str:
+        return f"{granularity}|{project_id}|{provider}|{model}|{status_code}|{date.isoformat()}"
+
+    def _rollup_from_row(
+        self, granularity: str, row: dict[str, Any]
+    ) -> TransactionRollup:
+        key = dict(
+            granularity=granularity,
+            project_id=row["project_id"],
+            provider=row["provider"],
+            model=row["model"],
+            status_code=int(row["status_code"]),
+            date=row["date"],
+        )
+        return TransactionRollup(
+            id=self._rollup_id(**key),
+            **key,
+            **{name: row.get(name, 0) for name in ROLLUP_SUMS},
+        )
+
+
+class AsyncTransactionRepository(AsyncMongoRepository):
+    """
+    Asynchronous repository for managing and accessing transaction data.
+
+    Inherits from AsyncMongoRepository and is specific to the Transaction model.
+    """
+
+    model_class = Transaction
+
+    async def get_for_project(self, project_id: str) -> list[Transaction]:
+        """
+        Retrieve a list of transactions associated with a specific project.
+
+        :param project_id: The identifier of the project for which transactions are retrieved.
+        :return: A list of Transaction objects associated with the specified project.
+        """
+        return await self.find({"project_id": project_id})
+
+    async def get_one_by_id(self, transaction_id: str) -> Transaction:
+        """
+        Retrieve a specific transaction by its unique identifier.
+
+        :param transaction_id: The unique identifier of the transaction to retrieve.
+        :return: The Transaction object corresponding to the specified transaction_id.
+        """
+        return await self.find_one({"_id": transaction_id})
+
+    async def get_filtered(self, query: dict[str, str | datetime | None]):
+        """
+        Retrieve a filtered list of transactions from the repository.
+
+        :param query: Query parameters to filter transactions.
+        :return: A filtered list of Transaction objects based on the specified criteria.
+        """
+        return await self.find(query)
+
+    async def delete_cascade(self, project_id: str):
+        """
+        Delete all transactions of a specific project.
+
+        :param project_id: The Project ID for which transactions will be deleted.
+        :return: The result of the delete operation.
+        """
+        return await self.delete_many(filter_by={"project_id": project_id})
@@ -1,4 +1,4 @@
-from typing import Any
+from typing import Any, NamedTuple
 
 from _datetime import datetime, timedelta
 from pydantic import BaseModel
@@ -90,6 +90,32 @@ class CreateTransactionSchema(BaseModel):
 
 
 
+class TransactionCostRow(NamedTuple):
+    """Cost fields of a transaction, read without the prompt and the messages."""
+
+    project_id: str | None = None
+    status_code: int | None = None
+    total_cost: int | float | None = None
+
+
+class TransactionStatisticRow(NamedTuple):
+    """Numeric fields of a transaction used by the statistics, read without the prompt and the messages."""
+
+    project_id: str | None = None
+    provider: str | None = None
+    model: str | None = None
+    tags: list[str] | None = None
+    status_code: int | None = None
+    input_tokens: int | None = None
+    output_tokens: int | None = None
+    input_cost: int | float | None = None
+    output_cost: int | float | None = None
+    total_cost: int | float | None = None
+    generation_speed: int | float | None = None
+    request_time: datetime | None = None
+    response_time: datetime | None = None
+
+
 class StatisticTransactionSchema(BaseModel):
     project_id: str
     provider: str
@@ -1,26 +1,46 @@
-import json
-import re
-
+import pandas as pd
 import utils
-from _datetime import datetime, timezone
+from _datetime import datetime, timedelta, timezone
+from projects.repositories import ProjectStatsRepository
+from seedwork.cache import ResponseCache
 from transactions.models import Transaction
-from transactions.repositories import TransactionRepository
-from transactions.schemas import CreateTransactionSchema
-from utils import create_transaction_query_from_filters
+from transactions.repositories import (
+    AsyncTransactionRepository,
+    TransactionRepository,
+    TransactionRollupRepository,
+)
+from transactions.schemas import (
+    CreateTransactionSchema,
+    GetTransactionWithProjectSlugSchema,
+    TransactionCostRow,
+    TransactionStatisticRow,
+)
+from utils import (
+    create_transaction_query_from_filters,
+    statistics_dataframe,
+    tag_statistics_dataframe,
+)
+
+# Longest expected compaction or rebuild, after which the lock of a crashed worker expires
+ROLLUP_LOCK_TTL = timedelta(hours=1)
+# Time after which a rollup bucket is closed and compacted
+ROLLUP_COMPACTION_DELAY = timedelta(minutes=10)
 
 
 def get_transactions_for_project(
     project_id: str, transaction_repository: TransactionRepository
-) -> list[Transaction]:
+) -> list[TransactionCostRow]:
     """
-    Retrieve a list of transactions associated with a specific project.
+    Retrieve the costs of the transactions associated with a specific project.
 
     :param project_id: The identifier of the project for which transactions are retrieved.
     :param transaction_repository: An instance of TransactionRepository used for accessing transaction data.
-    :return: A list of Transaction objects associated with the specified project.
+    :return: A list of TransactionCostRow objects associated with the specified project.
     """
-    transactions = transaction_repository.get_for_project(project_id)
-    return transactions
+    transactions = transaction_repository.get_for_project(
+        project_id, fields=list(TransactionCostRow._fields), as_model=False
+    )
+    return [TransactionCostRow(**transaction) for transaction in transactions]
 
 
 def get_transaction(
@@ -37,6 +57,20 @@ def get_transaction(
     return transaction
 
 
+async def get_transaction_async(
+    transaction_id: str, async_transaction_repository: AsyncTransactionRepository
+) -> Transaction:
+    """
+    Retrieve a specific transaction by its unique identifier without blocking the event loop.
+
+    :param transaction_id: The unique identifier of the transaction to retrieve.
+    :param async_transaction_repository: An instance of AsyncTransactionRepository used for accessing transaction data.
+    :return: The Transaction object corresponding to the specified transaction_id.
+    """
+    transaction = await async_transaction_repository.get_one_by_id(transaction_id)
+    return transaction
+
+
 def get_all_transactions(
     transaction_repository: TransactionRepository,
 ) -> list[Transaction]:
@@ -135,7 +169,7 @@ def get_all_filtered_and_paginated_transactions(
     sort_type: str | None = None,
     status_codes: list[int] | None = None,
     provider_models: list[dict[str, list[str]]] = None,
-) -> list[Transaction]:
+) -> tuple[list[Transaction], int]:
     """
     Retrieve a paginated and filtered list of transactions based on specified criteria.
 
@@ -150,44 +184,60 @@ def get_all_filtered_and_paginated_transactions(
     :param sort_type: Optional. Ordering method (asc or desc).
     :param status_codes: The transactions' status codes.
     :param provider_models: The transactions' providers and models.
-    :return: A paginated and filtered list of Transaction objects based on the specified criteria.
+    :return: A tuple of the paginated and filtered list of Transaction objects based on the specified criteria
+        and the number of all transactions meeting the criteria.
     """
     query = utils.create_transaction_list_query_from_filters(
         tags, date_from, date_to, project_id, True, status_codes, provider_models
     )
 
-    transactions = transaction_repository.get_paginated_and_filtered(
-        page, page_size, query, sort_field, sort_type
+    fields = [
+        "_id" if field == "id" else field
+        for field in GetTransactionWithProjectSlugSchema.model_fields
+        if field != "project_name"
+    ]
+    return transaction_repository.get_paginated_and_filtered(
+        page, page_size, query, sort_field, sort_type, fields
     )
-    return transactions
 
 
 def delete_multiple_transactions(
-    transaction_repository: TransactionRepository, project_id: str
+    transaction_repository: TransactionRepository,
+    project_stats_repository: ProjectStatsRepository,
+    transaction_rollup_repository: TransactionRollupRepository,
+    response_cache: ResponseCache,
+    project_id: str,
 ) -> None:
     """
      Delete multiple transactions and related data for a specific project.
 
     :param transaction_repository: An instance of TransactionRepository used for accessing transaction data.
+    :param project_stats_repository: An instance of ProjectStatsRepository used for resetting the project counters.
+    :param transaction_rollup_repository: An instance of TransactionRollupRepository used for deleting the rollups.
+    :param response_cache: The ResponseCache whose statistics of the project are invalidated.
     :param project_id: The Project ID for which transactions and related data will be deleted.
     :return: None
     """
     transaction_repository.delete_cascade(project_id=project_id)
+    project_stats_repository.delete(project_id)
+    transaction_rollup_repository.delete_cascade(project_id=project_id)
+    response_cache.invalidate([project_id])
 
 
-def store_transaction(
+def prepare_transaction(
     ai_provider_request,
     ai_provider_response,
     buffer,
     project_id,
     tags,
     ai_model_version,
-    pricelist,
+    pricing_engine: utils.PricingEngine,
     request_time,
-    transaction_repository: TransactionRepository,
+    response_time: datetime | None = None,
+    stream_accumulator: utils.StreamAccumulator | None = None,
 ) -> dict:
     """
-    Store a transaction in the repository based on request, response, and additional information.
+    Build a transaction based on request, response, and additional information without storing it.
 
     :param ai_provider_request: The request object.
     :param ai_provider_response: The response object.
@@ -196,15 +246,27 @@ def store_transaction(
     :param tags: The tags associated with the transaction.
     :param request_time: The timestamp of the request.
     :param ai_model_version: Optional. Specific tag for AI model. Helps with cost count.
-    :param pricelist: The pricelist for the models.
-    :param transaction_repository: An instance of TransactionRepository used for storing transaction data.
-    :return: None
+    :param pricing_engine: The PricingEngine used to calculate the costs.
+    :param response_time: Optional. The timestamp of the end of the response, defaults to now.
+    :param stream_accumulator: Optional. The accumulator of a streamed response, used instead of the buffer.
+    :return: A dictionary with the Transaction object and the decoded request and response content.
     """
-    
-    response_content = utils.preprocess_buffer(ai_provider_request, ai_provider_response, buffer)
+    response_time = (
+        response_time if response_time is not None else datetime.now(tz=timezone.utc)
+    )
+    # The request is decoded once and shared with the raw transaction
+    request_content = utils.decode_request_content(ai_provider_request)
+    if stream_accumulator is not None:
+        response_content = stream_accumulator.build(
+            ai_provider_request, request_content
+        )
+    else:
+        response_content = utils.preprocess_buffer(
+            ai_provider_request, ai_provider_response, buffer, request_content
+        )
 
     param_extractor = utils.TransactionParamExtractor(
-        ai_provider_request, ai_provider_response, response_content
+        ai_provider_request, ai_provider_response, response_content, request_content
     )
     params = param_extractor.extract()
 
@@ -212,61 +274,31 @@ def store_transaction(
         ai_model_version if ai_model_version is not None else params["model"]
     )
     
-    pricelist = [
-        item
-        for item in pricelist
-        if item.provider == params["provider"]
-        and re.match(item.match_pattern, ai_model_version)
-    ]
-
     if (
         params["status_code"] == 200
         and params["input_tokens"] is not None
         and params["output_tokens"] is not None
     ):
-        if len(pricelist) > 0:
-            if pricelist[0].mode == "image_generation":
-                input_cost = 0
-                output_cost = (
-                    int(param_extractor.request_content["n"]) * pricelist[0].total_price
-                )
-                total_cost = output_cost
-            else:
-                if pricelist[0].input_price == 0:
-                    input_cost, output_cost = 0, 0
-                    total_cost = (
-                        (params["input_tokens"] + params["output_tokens"])
-                        / 1000
-                        * pricelist[0].total_price
-                    )
-                else:
-                    input_cost = pricelist[0].input_price * (
-                        params["input_tokens"] / 1000
-                    )
-                    output_cost = pricelist[0].output_price * (
-                        params["output_tokens"] / 1000
-                    )
-                    total_cost = input_cost + output_cost
-        else:
-            input_cost, output_cost, total_cost = None, None, None
+        input_cost, output_cost, total_cost = pricing_engine.price(
+            params["provider"],
+            ai_model_version,
+            params["input_tokens"],
+            params["output_tokens"],
+            n_images=request_content.get("n"),
+        )
     else:
         input_cost, output_cost, total_cost = 0, 0, 0
 
     if params["output_tokens"] is not None and params["output_tokens"] > 0:
         generation_speed = (
             params["output_tokens"]
-            / (datetime.now(tz=timezone.utc) - request_time).total_seconds()
+            / (response_time - request_time).total_seconds()
         )
     elif params["output_tokens"] == 0:
         generation_speed = None
     else:
         generation_speed = 0
 
-    try:
-        content = json.loads(ai_provider_request.content)
-    except UnicodeDecodeError:
-        content = param_extractor.request_content
-
     transaction = Transaction(
         project_id=project_id,
         tags=tags,
@@ -286,13 +318,71 @@ def store_transaction(
         output_cost=output_cost,
         total_cost=total_cost,
         request_time=request_time,
+        response_time=response_time,
         generation_speed=generation_speed,
     )
-    transaction_repository.add(transaction)
     return {
+        "transaction": transaction,
         "response_content": response_content,
-        "request_content": param_extractor.request_content,
-        "transaction_id": transaction.id,
+        "request_content": request_content,
+    }
+
+
+def store_transaction(
+    ai_provider_request,
+    ai_provider_response,
+    buffer,
+    project_id,
+    tags,
+    ai_model_version,
+    pricing_engine: utils.PricingEngine,
+    request_time,
+    transaction_repository: TransactionRepository,
+    project_stats_repository: ProjectStatsRepository,
+    transaction_rollup_repository: TransactionRollupRepository,
+    response_cache: ResponseCache,
+    response_time: datetime | None = None,
+    stream_accumulator: utils.StreamAccumulator | None = None,
+) -> dict:
+    """
+    Store a transaction in the repository based on request, response, and additional information.
+
+    :param ai_provider_request: The request object.
+    :param ai_provider_response: The response object.
+    :param buffer: The buffer containing the response content.
+    :param project_id: The Project ID associated with the transaction.
+    :param tags: The tags associated with the transaction.
+    :param request_time: The timestamp of the request.
+    :param ai_model_version: Optional. Specific tag for AI model. Helps with cost count.
+    :param pricing_engine: The PricingEngine used to calculate the costs.
+    :param transaction_repository: An instance of TransactionRepository used for storing transaction data.
+    :param project_stats_repository: An instance of ProjectStatsRepository used for updating the project counters.
+    :param transaction_rollup_repository: An instance of TransactionRollupRepository used for updating the rollups.
+    :param response_cache: The ResponseCache whose statistics of the project are invalidated.
+    :param response_time: Optional. The timestamp of the end of the response, defaults to now.
+    :param stream_accumulator: Optional. The accumulator of a streamed response, used instead of the buffer.
+    :return: A dictionary with the decoded request and response content and the transaction ID.
+    """
+    data = prepare_transaction(
+        ai_provider_request,
+        ai_provider_response,
+        buffer,
+        project_id,
+        tags,
+        ai_model_version,
+        pricing_engine,
+        request_time,
+        response_time,
+        stream_accumulator,
+    )
+    transaction_repository.add(data["transaction"])
+    project_stats_repository.increment([data["transaction"]])
+    transaction_rollup_repository.add_transactions([data["transaction"]])
+    response_cache.invalidate([project_id])
+    return {
+        "response_content": data["response_content"],
+        "request_content": data["request_content"],
+        "transaction_id": data["transaction"].id,
     }
 
 
@@ -305,7 +395,7 @@ def get_list_of_filtered_transactions(
     status_codes: list[str] | None = None,
     providers: list[str] | None = None,
     models: list[str] | None = None,
-) -> list[Transaction]:
+) -> list[TransactionStatisticRow]:
     """
     Retrieve a list of transactions filtered by project ID and date range.
 
@@ -320,7 +410,7 @@ def get_list_of_filtered_transactions(
     :param status_codes: The transactions' status codes.
     :param providers: The transactions' providers.
     :param models: The transactions' models.
-    :return: A list of Transaction objects that meet the specified criteria.
+    :return: A list of TransactionStatisticRow objects that meet the specified criteria.
     """
     query = create_transaction_query_from_filters(
         date_from=date_from,
@@ -331,13 +421,197 @@ def get_list_of_filtered_transactions(
         providers=providers,
         models=models,
     )
-    transactions = transaction_repository.get_filtered(query)
-    return transactions
+    transactions = transaction_repository.get_filtered(
+        query, fields=list(TransactionStatisticRow._fields), as_model=False
+    )
+    return [TransactionStatisticRow(**transaction) for transaction in transactions]
+
+
+def get_statistics_for_filtered_transactions(
+    date_from: datetime,
+    date_to: datetime,
+    period: str,
+    transaction_repository: TransactionRepository,
+    transaction_rollup_repository: TransactionRollupRepository,
+    project_id: str | None = None,
+    null_generation_speed: bool = True,
+    status_codes: list[int] | None = None,
+    providers: list[str] | None = None,
+    models: list[str] | None = None,
+) -> pd.DataFrame:
+    """
+    Retrieve filtered transactions aggregated by MongoDB into buckets of the given period.
+
+    Every bucket sums the transactions with the same provider, model and status code class,
+    so the statistics helpers only have to fill the empty periods and format the response.
+    The buckets are read from the transaction rollups when they can serve the date range,
+    otherwise the transactions are aggregated.
+
+    :param date_from: The starting date for the filter.
+    :param date_to: The ending date for the filter.
+    :param period: The period of the buckets.
+    :param transaction_repository: An instance of TransactionRepository for data retrieval.
+    :param transaction_rollup_repository: An instance of TransactionRollupRepository for data retrieval.
+    :param project_id: The unique identifier of the project.
+    :param null_generation_speed: Optional. Flag to include transactions with null generation speed.
+    :param status_codes: The transactions' status codes.
+    :param providers: The transactions' providers.
+    :param models: The transactions' models.
+    :return: A statistics DataFrame (see statistics_dataframe) ordered by date, latency in seconds.
+    """
+    buckets = transaction_rollup_repository.get_statistics_by_period(
+        period,
+        date_from=date_from,
+        date_to=date_to,
+        project_id=project_id,
+        null_generation_speed=null_generation_speed,
+        status_codes=status_codes,
+        providers=providers,
+        models=models,
+    )
+    if buckets is None:
+        query = create_transaction_query_from_filters(
+            date_from=date_from,
+            date_to=date_to,
+            project_id=project_id,
+            null_generation_speed=null_generation_speed,
+            status_codes=status_codes,
+            providers=providers,
+            models=models,
+        )
+        buckets = transaction_repository.get_statistics_by_period(query, period)
+    df = statistics_dataframe(buckets)
+    df["latency"] /= 1000
+    return df
+
+
+def get_tag_statistics_for_filtered_transactions(
+    date_from: datetime | None,
+    date_to: datetime | None,
+    period: str,
+    transaction_repository: TransactionRepository,
+    status_codes: list[int] | None = None,
+) -> pd.DataFrame:
+    """
+    Retrieve filtered transactions aggregated by MongoDB into buckets of the given period for every tag.
+
+    :param date_from: The starting date for the filter.
+    :param date_to: The ending date for the filter.
+    :param period: The period of the buckets.
+    :param transaction_repository: An instance of TransactionRepository for data retrieval.
+    :param status_codes: The transactions' status codes.
+    :return: A statistics DataFrame (see statistics_dataframe) with an additional tag column, ordered by date.
+    """
+    query = create_transaction_query_from_filters(
+        date_from=date_from,
+        date_to=date_to,
+        status_codes=status_codes,
+    )
+    buckets = transaction_repository.get_tag_statistics_by_period(query, period)
+    return tag_statistics_dataframe(buckets)
+
+
 def add_transaction(
-    data: CreateTransactionSchema, transaction_repository: TransactionRepository
+    data: CreateTransactionSchema,
+    transaction_repository: TransactionRepository,
+    project_stats_repository: ProjectStatsRepository,
+    transaction_rollup_repository: TransactionRollupRepository,
+    response_cache: ResponseCache,
 ) -> Transaction:
     transaction = Transaction(**data.model_dump())
     transaction_repository.add(transaction)
+    project_stats_repository.increment([transaction])
+    transaction_rollup_repository.add_transactions([transaction])
+    response_cache.invalidate([transaction.project_id])
     return transaction
 
 
+def add_multiple_transactions(
+    transactions: list[Transaction],
+    transaction_repository: TransactionRepository,
+    project_stats_repository: ProjectStatsRepository,
+    transaction_rollup_repository: TransactionRollupRepository,
+    response_cache: ResponseCache,
+) -> None:
+    """
+    Add multiple transactions and update the related project counters, rollups and cached statistics.
+
+    :param transactions: The list of Transaction objects to be added.
+    :param transaction_repository: An instance of TransactionRepository used for storing transaction data.
+    :param project_stats_repository: An instance of ProjectStatsRepository used for updating the project counters.
+    :param transaction_rollup_repository: An instance of TransactionRollupRepository used for updating the rollups.
+    :param response_cache: The ResponseCache whose statistics of the projects are invalidated.
+    :return: None
+    """
+    transaction_repository.add_many(transactions)
+    project_stats_repository.increment(transactions)
+    transaction_rollup_repository.add_transactions(transactions)
+    response_cache.invalidate({transaction.project_id for transaction in transactions})
+
+
+def compact_transaction_rollups(
+    transaction_rollup_repository: TransactionRollupRepository,
+    response_cache: ResponseCache,
+    delay: timedelta = ROLLUP_COMPACTION_DELAY,
+) -> dict[str, int] | None:
+    """
+    Compact the closed 5-minute rollups into hour rollups and the hour rollups into day rollups.
+
+    Skipped while another worker compacts or rebuilds the rollups.
+
+    :param transaction_rollup_repository: An instance of TransactionRollupRepository used for the rollups.
+    :param response_cache: The ResponseCache cleared after the rollups changed.
+    :param delay: Optional. Time after which a bucket is closed, so transactions still waiting to be stored
+        are added to the 5-minute rollups before they are compacted.
+    :return: The number of created or recomputed rollups keyed by granularity, or None if the lock is held.
+    """
+    token = transaction_rollup_repository.acquire_lock(ROLLUP_LOCK_TTL)
+    if token is None:
+        return None
+    try:
+        compacted = transaction_rollup_repository.compact(
+            datetime.now(tz=timezone.utc) - delay
+        )
+    finally:
+        transaction_rollup_repository.release_lock(token)
+    if any(compacted.values()):
+        # statistics read while compacting may miss the transactions stored meanwhile
+        response_cache.clear()
+    return compacted
+
+
+def rebuild_transaction_rollups(
+    transaction_repository: TransactionRepository,
+    transaction_rollup_repository: TransactionRollupRepository,
+    only_missing: bool = False,
+) -> dict[str, int] | None:
+    """
+    Recalculate the rollups of all stored transactions.
+
+    Used to backfill the rollups of transactions stored before they were maintained.
+    Transactions stored while the rollups are rebuilt may be missed.
+    Skipped while another worker compacts or rebuilds the rollups.
+
+    :param transaction_repository: An instance of TransactionRepository used for accessing transaction data.
+    :param transaction_rollup_repository: An instance of TransactionRollupRepository used for the rollups.
+    :param only_missing: Optional. If true, the rollups are rebuilt only if they have not been built yet.
+    :return: The number of created rollups keyed by granularity, or None if the rebuild was skipped.
+    """
+    token = transaction_rollup_repository.acquire_lock(ROLLUP_LOCK_TTL)
+    if token is None:
+        return None
+    try:
+        if only_missing and transaction_rollup_repository.get_watermarks() is not None:
+            return None
+        rows = transaction_repository.get_statistics_by_period(
+            {}, utils.PeriodEnum.minutes
+        )
+        transaction_rollup_repository.replace_all(rows)
+        return {
+            "5minutes": len(rows),
+            **transaction_rollup_repository.compact(
+                datetime.now(tz=timezone.utc) - ROLLUP_COMPACTION_DELAY
+            ),
+        }
+    finally:
+        transaction_rollup_repository.release_lock(token)
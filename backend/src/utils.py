@@ -1,10 +1,12 @@
 import base64
+import codecs
 import json
 import random
 import re
 from collections import OrderedDict
-from copy import deepcopy
+from copy import copy
 from enum import Enum
+from functools import lru_cache
 from io import BytesIO
 from typing import Any
 from urllib.parse import parse_qs, unquote, urlparse
@@ -13,15 +15,16 @@ import numpy as np
 import pandas as pd
 import tiktoken
 from _datetime import datetime, timedelta
+from pandas.tseries.frequencies import to_offset
+from pandas.tseries.offsets import Tick
 from PIL import Image
+from pydantic import BaseModel
 from transactions.models import Transaction
 from transactions.schemas import (
-    GetTagStatisticTransactionSchema,
+    GetTagStatisticsInTime,
+    GetTagStatisticsSchema,
     GetTransactionLatencyStatisticsSchema,
     GetTransactionStatusStatisticsSchema,
-    GetTransactionUsageStatisticsSchema,
-    StatisticTransactionSchema,
-    TagStatisticTransactionSchema,
     GetTransactionLatencyStatisticsWithoutDateSchema,
     GetTransactionPageResponseSchema,
     GetTransactionSchema,
@@ -31,8 +34,7 @@ from transactions.schemas import (
     GetTransactionUsageStatisticsWithoutDateSchema,
     GetTransactionWithProjectSlugSchema,
     GetTransactionWithRawDataSchema,
-    StatisticTransactionSchema,
-    TagStatisticTransactionSchema,
+    TransactionStatisticRow,
 )
 
 from fastapi import HTTPException
@@ -46,8 +48,8 @@ def serialize_data(obj):
 
 
 def deserialize_data(obj):
-    obj["id"] = obj["_id"]
-    del obj["_id"]
+    if "_id" in obj:
+        obj["id"] = obj.pop("_id")
     return obj
 
 
@@ -311,82 +313,214 @@ class UnsupportedProviderError(Exception):
         super().__init__(self.message)
 
 
+PROVIDER_PATTERNS = [
+    (name, re.compile(pattern), extractor)
+    for name, pattern, extractor in (
+        (
+            "Azure Embeddings",
+            r".*openai\.azure\.com.*embeddings.*",
+            "_extract_from_azure_embeddings",
+        ),
+        (
+            "Azure Completions",
+            r".*openai\.azure\.com.*completions.*",
+            "_extract_from_azure_completions",
+        ),
+        (
+            "Azure Images Generations",
+            r".*openai\.azure\.com.*images\/generations.*",
+            "_extract_from_azure_images_generations",
+        ),
+        (
+            "Azure Images Variations",
+            r".*openai\.azure\.com.*images\/variations.*",
+            "_extract_from_azure_images_variations",
+        ),
+        (
+            "Azure Images Edits",
+            r".*openai\.azure\.com.*images\/edits.*",
+            "_extract_from_azure_images_edit",
+        ),
+        (
+            "OpenAI Chat Completions",
+            r".*api\.openai\.com.*chat.*completions.*",
+            "_extract_from_openai_chat_completions",
+        ),
+        (
+            "OpenAI Completions",
+            r".*api\.openai\.com(?!.*chat).*\/completions.*",
+            "_extract_from_openai_completions",
+        ),
+        (
+            "OpenAI Embeddings",
+            r".*api\.openai\.com.*embeddings.*",
+            "_extract_from_openai_embeddings",
+        ),
+        (
+            "OpenAI Images Variations",
+            r".*api\.openai\.com.*images.*variations.*",
+            "_extract_from_openai_images_variations",
+        ),
+        (
+            "OpenAI Images Generations",
+            r".*api\.openai\.com.*images.*generations.*",
+            "_extract_from_openai_images_generations",
+        ),
+        (
+            "OpenAI Images Edits",
+            r".*api\.openai\.com.*images.*edits.*",
+            "_extract_from_openai_images_edit",
+        ),
+        (
+            "Groq",
+            r".*api\.groq\.com.*\/openai\/v1\/chat\/completions",
+            "_extract_from_groq",
+        ),
+        ("Anthropic", r".*anthropic\.com.*", "_extract_from_anthropic"),
+        ("VertexAI", r".*-aiplatform\.googleapis\.com/v1.*", "_extract_from_vertexai"),
+        (
+            "Ollama",
+            r".*(host\.docker\.internal|localhost).*\/api\/generate",
+            "_extract_from_ollama",
+        ),
+        ("Huggingface", r".*huggingface\.cloud.*", "_extract_from_huggingface"),
+    )
+]
+PROVIDER_EXTRACTORS = {name: extractor for name, _, extractor in PROVIDER_PATTERNS}
+
+
+@lru_cache(maxsize=1024)
+def detect_provider_pattern(url: str) -> str:
+    """
+    Detect which provider pattern handles the URL of a proxied request.
+
+    Patterns are checked in order and the result is memoized, so each distinct
+    api_base and path is matched against the regexes only once.
+
+    :param url: The request URL without the query string.
+    :return: The name of the matching pattern or "Unsupported".
+    """
+    for pattern_name, pattern_regex, _ in PROVIDER_PATTERNS:
+        if pattern_regex.match(url):
+            return pattern_name
+    return "Unsupported"
+
+
+def decode_request_content(request) -> dict:
+    """
+    Decode the JSON or multipart body of a request sent to an AI provider.
+
+    Images of multipart requests are encoded with base64.
+
+    :param request: The request sent to the AI provider.
+    :return: The decoded request content.
+    """
+    try:
+        return json.loads(request.__dict__["_content"].decode("utf8"))
+    except UnicodeDecodeError:
+        data = {}
+        parts = request.__dict__["_content"].split(
+            request.__dict__["_content"].split(b"\r\n")[0]
+        )[:-1]
+
+        if b"mask" not in request.__dict__["_content"]:
+            photo_part = parts[-1]
+            parts = parts[:-1]
+        else:
+            mask_part = parts[-1]
+            photo_part = parts[-2]
+            parts = parts[:-2]
+            mask_bytes = mask_part.split(b"\r\n\r\n")[1]
+            data["mask"] = base64.b64encode(mask_bytes).decode("utf-8")
+
+        for part in parts:
+            if part:
+                part = part.strip().split(b"; ")[1]
+                header, value = part.split(b"\r\n\r\n")
+                header = header.split(b"=")[1].replace(b'"', b"").decode("utf-8")
+                data[header] = value.decode("utf-8")
+
+        photo_bytes = photo_part.split(b"\r\n\r\n")[1]
+        data["image"] = base64.b64encode(photo_bytes).decode("utf-8")
+
+        return data
+
+
 class TransactionParamExtractor:
-    def __init__(self, request, response, response_content) -> None:
+    def __init__(
+        self, request, response, response_content, request_content=None
+    ) -> None:
         self.response_headers = parse_headers_to_dict(
             response.__dict__["headers"].__dict__["_list"]
         )
         self.request_headers = parse_headers_to_dict(
             request.__dict__["headers"].__dict__["_list"]
         )
-        self.request_content = self._decode_request_content(request)
-        self.request_content_updated = deepcopy(self.request_content)
+        self.request_content = (
+            request_content
+            if request_content is not None
+            else decode_request_content(request)
+        )
+        # Shallow copies, the extractors clone the nested objects they change,
+        # so the decoded contents can be shared with the raw transactions
+        self.request_content_updated = copy(self.request_content)
 
         self.response = response
         self.response_content = response_content
-        self.response_content_updated = deepcopy(response_content)
+        self.response_content_updated = copy(response_content)
         self.url = str(getattr(request, "url", ""))
         self.pattern = self._detect_pattern(self.url)
 
     @staticmethod
-    def _decode_request_content(request):
-        try:
-            return json.loads(request.__dict__["_content"].decode("utf8"))
-        except UnicodeDecodeError:
-            data = {}
-            parts = request.__dict__["_content"].split(
-                request.__dict__["_content"].split(b"\r\n")[0]
-            )[:-1]
-
-            if b"mask" not in request.__dict__["_content"]:
-                photo_part = parts[-1]
-                parts = parts[:-1]
-            else:
-                mask_part = parts[-1]
-                photo_part = parts[-2]
-                parts = parts[:-2]
-                mask_bytes = mask_part.split(b"\r\n\r\n")[1]
-                data["mask"] = base64.b64encode(mask_bytes).decode("utf-8")
+    def _detect_pattern(url):
+        return detect_provider_pattern(url.split("?", 1)[0])
 
-            for part in parts:
-                if part:
-                    part = part.strip().split(b"; ")[1]
-                    header, value = part.split(b"\r\n\r\n")
-                    header = header.split(b"=")[1].replace(b'"', b"").decode("utf-8")
-                    data[header] = value.decode("utf-8")
+    def _resize_message_images(self) -> None:
+        """
+        Resize the images of the user messages in the updated request content.
 
-            photo_bytes = photo_part.split(b"\r\n\r\n")[1]
-            data["image"] = base64.b64encode(photo_bytes).decode("utf-8")
+        Only the messages and content parts holding images are cloned,
+        the decoded request content is not changed.
+        """
+        messages = list(self.request_content["messages"])
+        for idx_message, message in enumerate(messages):
+            if (
+                message["role"] == "user"
+                and not isinstance(message["content"], str)
+                and len(message["content"]) > 1
+            ):
+                contents = list(message["content"])
+                for idx_content, content in enumerate(contents):
+                    if content["type"] == "image_url":
+                        contents[idx_content] = {
+                            **content,
+                            "image_url": {
+                                **content["image_url"],
+                                "url": resize_b64_image(
+                                    content["image_url"]["url"].replace(
+                                        "data:image/png;base64,", ""
+                                    ),
+                                    (128, 128),
+                                ),
+                            },
+                        }
+                messages[idx_message] = {**message, "content": contents}
+        self.request_content_updated["messages"] = messages
 
-            return data
+    def _resize_response_images(self) -> list[dict]:
+        """
+        Resize the base64 images of the updated response content.
 
-    @staticmethod
-    def _detect_pattern(url):
-        patterns = {
-            "Azure Embeddings": r".*openai\.azure\.com.*embeddings.*",
-            "Azure Completions": r".*openai\.azure\.com.*completions.*",
-            "Azure Images Generations": r".*openai\.azure\.com.*images\/generations.*",
-            "Azure Images Variations": r".*openai\.azure\.com.*images\/variations.*",
-            "Azure Images Edits": r".*openai\.azure\.com.*images\/edits.*",
-            "OpenAI Chat Completions": r".*api\.openai\.com.*chat.*completions.*",
-            "OpenAI Completions": r".*api\.openai\.com(?!.*chat).*\/completions.*",
-            "OpenAI Embeddings": r".*api\.openai\.com.*embeddings.*",
-            "OpenAI Images Variations": r".*api\.openai\.com.*images.*variations.*",
-            "OpenAI Images Generations": r".*api\.openai\.com.*images.*generations.*",
-            "OpenAI Images Edits": r".*api\.openai\.com.*images.*edits.*",
-            "Groq": r".*api\.groq\.com.*\/openai\/v1\/chat\/completions",
-            "Anthropic": r".*anthropic\.com.*",
-            "VertexAI": r".*-aiplatform\.googleapis\.com/v1.*",
-            "Ollama": r".*(host\.docker\.internal|localhost).*\/api\/generate",
-            "Huggingface": r".*huggingface\.cloud.*",
-        }
+        The data list is replaced, the decoded response content is not changed.
 
-        for pattern_name, pattern_regex in patterns.items():
-            if re.match(pattern_regex, url):
-                print(pattern_regex)
-                print(url)
-                return pattern_name
-        return "Unsupported"
+        :return: The system messages holding the resized images.
+        """
+        images = [
+            resize_b64_image(data["b64_json"], (128, 128))
+            for data in self.response_content_updated["data"]
+        ]
+        self.response_content_updated["data"] = images
+        return [{"role": "system", "content": image} for image in images]
 
     def _extract_from_azure_embeddings(self) -> dict:
         extracted = {
@@ -432,22 +566,7 @@ class TransactionParamExtractor:
         return extracted
 
     def _extract_from_azure_completions(self) -> dict:
-        for idx_message, message in enumerate(self.request_content["messages"]):
-            if (
-                message["role"] == "user"
-                and not isinstance(message["content"], str)
-                and len(message["content"]) > 1
-            ):
-                for idx_content, content in enumerate(message["content"]):
-                    if content["type"] == "image_url":
-                        self.request_content_updated["messages"][idx_message][
-                            "content"
-                        ][idx_content]["image_url"]["url"] = resize_b64_image(
-                            content["image_url"]["url"].replace(
-                                "data:image/png;base64,", ""
-                            ),
-                            (128, 128),
-                        )
+        self._resize_message_images()
 
         extracted = {
             "type": "completions",
@@ -537,16 +656,7 @@ class TransactionParamExtractor:
                     "url"
                 ]
             except KeyError:
-                for idx, data in enumerate(self.response_content_updated["data"]):
-                    self.response_content_updated["data"][idx] = resize_b64_image(
-                        data["b64_json"], (128, 128)
-                    )
-                    messages.append(
-                        {
-                            "role": "system",
-                            "content": self.response_content_updated["data"][idx],
-                        }
-                    )
+                messages.extend(self._resize_response_images())
                 extracted["last_message"] = self.response_content_updated["data"][-1]
         extracted["messages"] = messages
 
@@ -600,16 +710,7 @@ class TransactionParamExtractor:
                     "url"
                 ]
             except KeyError:
-                for idx, data in enumerate(self.response_content_updated["data"]):
-                    self.response_content_updated["data"][idx] = resize_b64_image(
-                        data["b64_json"], (128, 128)
-                    )
-                    messages.append(
-                        {
-                            "role": "system",
-                            "content": self.response_content_updated["data"][idx],
-                        }
-                    )
+                messages.extend(self._resize_response_images())
                 extracted["last_message"] = self.response_content_updated["data"][-1]
         extracted["messages"] = messages
 
@@ -671,38 +772,14 @@ class TransactionParamExtractor:
                     "url"
                 ]
             except KeyError:
-                for idx, data in enumerate(self.response_content_updated["data"]):
-                    self.response_content_updated["data"][idx] = resize_b64_image(
-                        data["b64_json"], (128, 128)
-                    )
-                    messages.append(
-                        {
-                            "role": "system",
-                            "content": self.response_content_updated["data"][idx],
-                        }
-                    )
+                messages.extend(self._resize_response_images())
                 extracted["last_message"] = self.response_content_updated["data"][-1]
         extracted["messages"] = messages
 
         return extracted
 
     def _extract_from_openai_chat_completions(self) -> dict:
-        for idx_message, message in enumerate(self.request_content["messages"]):
-            if (
-                message["role"] == "user"
-                and not isinstance(message["content"], str)
-                and len(message["content"]) > 1
-            ):
-                for idx_content, content in enumerate(message["content"]):
-                    if content["type"] == "image_url":
-                        self.request_content_updated["messages"][idx_message][
-                            "content"
-                        ][idx_content]["image_url"]["url"] = resize_b64_image(
-                            content["image_url"]["url"].replace(
-                                "data:image/png;base64,", ""
-                            ),
-                            (128, 128),
-                        )
+        self._resize_message_images()
 
         extracted = {
             "type": "chat completions",
@@ -817,16 +894,7 @@ class TransactionParamExtractor:
                     "url"
                 ]
             except KeyError:
-                for idx, data in enumerate(self.response_content_updated["data"]):
-                    self.response_content_updated["data"][idx] = resize_b64_image(
-                        data["b64_json"], (128, 128)
-                    )
-                    messages.append(
-                        {
-                            "role": "system",
-                            "content": self.response_content_updated["data"][idx],
-                        }
-                    )
+                messages.extend(self._resize_response_images())
                 extracted["last_message"] = self.response_content_updated["data"][-1]
         extracted["messages"] = messages
 
@@ -875,16 +943,7 @@ class TransactionParamExtractor:
                     "url"
                 ]
             except KeyError:
-                for idx, data in enumerate(self.response_content_updated["data"]):
-                    self.response_content_updated["data"][idx] = resize_b64_image(
-                        data["b64_json"], (128, 128)
-                    )
-                    messages.append(
-                        {
-                            "role": "system",
-                            "content": self.response_content_updated["data"][idx],
-                        }
-                    )
+                messages.extend(self._resize_response_images())
                 extracted["last_message"] = self.response_content_updated["data"][-1]
         extracted["messages"] = messages
 
@@ -946,16 +1005,7 @@ class TransactionParamExtractor:
                     "url"
                 ]
             except KeyError:
-                for idx, data in enumerate(self.response_content_updated["data"]):
-                    self.response_content_updated["data"][idx] = resize_b64_image(
-                        data["b64_json"], (128, 128)
-                    )
-                    messages.append(
-                        {
-                            "role": "system",
-                            "content": self.response_content_updated["data"][idx],
-                        }
-                    )
+                messages.extend(self._resize_response_images())
                 extracted["last_message"] = self.response_content_updated["data"][-1]
         extracted["messages"] = messages
 
@@ -1006,7 +1056,7 @@ class TransactionParamExtractor:
             "provider": "Anthropic",
             "prompt": self.request_content["messages"][0]["content"],
         }
-        messages = self.request_content["messages"]
+        messages = list(self.request_content["messages"])
 
         if self.response.__dict__["status_code"] > 200:
             messages.append(
@@ -1113,7 +1163,7 @@ class TransactionParamExtractor:
             "output_tokens": self.response_content["usage"]["completion_tokens"],
         }
 
-        messages = self.request_content["messages"]
+        messages = list(self.request_content["messages"])
 
         if self.response.__dict__["status_code"] > 200:
             extracted["error_message"] = self.response_content["error"]["message"]
@@ -1179,40 +1229,9 @@ class TransactionParamExtractor:
             output_tokens = self.response_content["usage"].get("completion_tokens", 0)
             transaction_params.add_output_tokens(output_tokens)
 
-        if self.pattern == "Azure Embeddings":
-            extracted = self._extract_from_azure_embeddings()
-        if self.pattern == "Azure Completions":
-            extracted = self._extract_from_azure_completions()
-        if self.pattern == "Azure Images Generations":
-            extracted = self._extract_from_azure_images_generations()
-        if self.pattern == "Azure Images Variations":
-            extracted = self._extract_from_azure_images_variations()
-        if self.pattern == "Azure Images Edits":
-            extracted = self._extract_from_azure_images_edit()
-        if self.pattern == "OpenAI Chat Completions":
-            extracted = self._extract_from_openai_chat_completions()
-        if self.pattern == "OpenAI Completions":
-            extracted = self._extract_from_openai_completions()
-        if self.pattern == "OpenAI Embeddings":
-            extracted = self._extract_from_openai_embeddings()
-        if self.pattern == "Anthropic":
-            extracted = self._extract_from_anthropic()
-        if self.pattern == "VertexAI":
-            extracted = self._extract_from_vertexai()
-        if self.pattern == "OpenAI Images Variations":
-            extracted = self._extract_from_openai_images_variations()
-        if self.pattern == "OpenAI Images Generations":
-            extracted = self._extract_from_openai_images_generations()
-        if self.pattern == "OpenAI Images Edits":
-            extracted = self._extract_from_openai_images_edit()
-        if self.pattern == "Ollama":
-            extracted = self._extract_from_ollama()
-        if self.pattern == "Groq":
-            extracted = self._extract_from_groq()
-        if self.pattern == "Huggingface":
-            extracted = self._extract_from_huggingface()
         if self.pattern == "Unsupported":
             raise UnsupportedProviderError(self.url)
+        extracted = getattr(self, PROVIDER_EXTRACTORS[self.pattern])()
 
         transaction_params.add_type(extracted["type"])
         transaction_params.add_provider(extracted["provider"])
@@ -1234,128 +1253,259 @@ class TransactionParamExtractor:
         return transaction_params.build()
 
 
-def token_counter_for_transactions(
-    transactions: list[StatisticTransactionSchema],
+STATISTICS_COLUMNS = {
+    "project_id": "object",
+    "provider": "object",
+    "model": "object",
+    "status_code": "int64",
+    "date": "datetime64[ns]",
+    "total_input_tokens": "int64",
+    "total_output_tokens": "int64",
+    "total_input_cost": "float64",
+    "total_output_cost": "float64",
+    "total_cost": "float64",
+    "latency": "float64",  # seconds
+    "generation_speed": "float64",
+    "total_transactions": "int64",
+}
+
+
+def statistics_dataframe(records: list[dict[str, Any]]) -> pd.DataFrame:
+    """
+    Build a statistics DataFrame column by column from aggregated buckets.
+
+    The records are read into typed columns in one pass, missing numbers become zeros.
+
+    :param records: Dictionaries with the STATISTICS_COLUMNS keys, e.g. MongoDB aggregation results.
+    :return: A DataFrame with the STATISTICS_COLUMNS columns.
+    """
+    df = pd.DataFrame.from_records(records, columns=list(STATISTICS_COLUMNS))
+    numeric = [
+        column for column, dtype in STATISTICS_COLUMNS.items() if dtype != "object"
+    ]
+    numeric.remove("date")
+    df[numeric] = df[numeric].astype("float64").fillna(0)
+    df["date"] = pd.to_datetime(df["date"])
+    return df.astype(STATISTICS_COLUMNS)
+
+
+def transactions_statistics_dataframe(
+    transactions: list[TransactionStatisticRow], project_id: str | None = None
+) -> pd.DataFrame:
+    """
+    Build a statistics DataFrame with a row per transaction.
+
+    :param transactions: The transactions as TransactionStatisticRow tuples.
+    :param project_id: Optional. The project ID set on every row.
+    :return: A DataFrame with the STATISTICS_COLUMNS columns.
+    """
+    df = pd.DataFrame.from_records(
+        transactions, columns=list(TransactionStatisticRow._fields)
+    )
+    response_time = pd.to_datetime(df["response_time"])
+    return statistics_dataframe(
+        {
+            "project_id": project_id if project_id is not None else df["project_id"],
+            "provider": df["provider"],
+            "model": df["model"],
+            "status_code": df["status_code"],
+            "date": response_time,
+            "total_input_tokens": df["input_tokens"],
+            "total_output_tokens": df["output_tokens"],
+            "total_input_cost": df["input_cost"],
+            "total_output_cost": df["output_cost"],
+            "total_cost": df["total_cost"],
+            "latency": (
+                response_time - pd.to_datetime(df["request_time"])
+            ).dt.total_seconds(),
+            "generation_speed": df["generation_speed"],
+            "total_transactions": 1,
+        }
+    )
+
+
+def tag_statistics_dataframe(records: list[dict[str, Any]]) -> pd.DataFrame:
+    """
+    Build a statistics DataFrame with an additional tag column from aggregated tag buckets.
+
+    :param records: Dictionaries with the tag and STATISTICS_COLUMNS keys, e.g. MongoDB aggregation results.
+    :return: A statistics DataFrame (see statistics_dataframe) with an additional tag column.
+    """
+    df = statistics_dataframe(records)
+    df["tag"] = pd.Series(
+        [record["tag"] for record in records], index=df.index, dtype="object"
+    )
+    return df
+
+
+def _naive_timestamp(date: datetime | str) -> pd.Timestamp:
+    timestamp = pd.Timestamp(date)
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.tz_convert(None)
+    return timestamp
+
+
+def _period_labels(dates: pd.Series, period: str) -> pd.Series:
+    """
+    Label the dates with the periods they fall into, the same way as DataFrame.resample.
+
+    :param dates: The dates to label.
+    :param period: A pandas frequency string, see pandas_period_from_string.
+    :return: The labels of the periods.
+    """
+    offset = to_offset(period)
+    if isinstance(offset, Tick):
+        return dates.dt.floor(offset)
+    # Anchored periods (week, month, year) are labelled with their last day
+    return dates.dt.normalize() + offset * 0
+
+
+def _with_boundary_rows(
+    df: pd.DataFrame,
+    keys: list[str],
+    dates: list[datetime | None],
+    **values,
+) -> pd.DataFrame:
+    """
+    Add rows for every key combination at the boundary dates, so the resampled periods span the whole range.
+
+    The rows are appended with a single concat. Numeric columns are zero unless given in values,
+    the other columns repeat the value of the first row.
+
+    :param df: The statistics DataFrame with a date column.
+    :param keys: The columns whose combinations get boundary rows.
+    :param dates: The boundary dates, empty dates are skipped.
+    :param values: Optional. Values of the boundary rows keyed by column.
+    :return: The DataFrame with the boundary rows.
+    """
+    dates = [_naive_timestamp(date) for date in dates if date]
+    if df.empty or not dates:
+        return df
+    boundary = (
+        df[keys]
+        .drop_duplicates()
+        .merge(pd.DataFrame({"date": pd.to_datetime(dates)}), how="cross")
+    )
+    for column in df.columns:
+        if column in keys or column == "date":
+            continue
+        if column in values:
+            boundary[column] = values[column]
+        elif pd.api.types.is_numeric_dtype(df[column]):
+            boundary[column] = 0
+        else:
+            boundary[column] = df[column].iloc[0]
+    return pd.concat([df, boundary[df.columns]], ignore_index=True)
+
+
+def group_statistics_by_date(
+    statistics: pd.DataFrame,
+    schema: type[BaseModel],
+    record_schema: type[BaseModel],
+) -> list[BaseModel]:
+    """
+    Group statistics rows by date in a single pass over the DataFrame.
+
+    :param statistics: A DataFrame with a date column and a column for every field of record_schema.
+    :param schema: The schema of a date with its records, e.g. GetTransactionsUsageStatisticsSchema.
+    :param record_schema: The schema of a record without the date.
+    :return: A list of schema objects ordered by date, the records keep the order of the rows.
+    """
+    statistics = statistics.sort_values("date", kind="stable")
+    fields = list(record_schema.model_fields)
+    records_by_date = {}
+    for date, *values in zip(
+        statistics["date"], *(statistics[field].tolist() for field in fields)
+    ):
+        records_by_date.setdefault(date, []).append(
+            record_schema(**dict(zip(fields, values)))
+        )
+    return [
+        schema(date=date, records=records) for date, records in records_by_date.items()
+    ]
+
+
+def token_usage_dataframe(
+    transactions: pd.DataFrame,
     period: str,
     date_from: datetime | None = None,
     date_to: datetime | None = None,
     cumulative_total_cost: bool = True,
-) -> list[GetTransactionUsageStatisticsSchema]:
+    keys: list[str] | None = None,
+) -> pd.DataFrame:
     """
-    Calculate token usage statistics based on a given period.
+    Calculate token usage statistics of every provider and model based on a given period.
 
-    This function takes a list of transactions and calculates token usage statistics
-    aggregated over the specified period (weekly, monthly, hourly, minutely or daily).
-
-    :param transactions: A list of StatisticTransactionSchema objects representing transactions.
+    :param transactions: A statistics DataFrame (see statistics_dataframe) of transactions or their buckets.
     :param period: A string indicating the aggregation period.
         Choose from 'weekly', 'monthly' 'hourly', 'minutely' or 'daily'.
     :param date_from: The starting date for the filter.
     :param date_to: The ending date for the filter.
     :param cumulative_total_cost: The switch that decides if total cost is cumulative or not.
-    :return: A list of GetTransactionUsageStatisticsSchema objects containing token usage statistics.
+    :param keys: Optional. The columns to calculate the statistics for instead of provider and model,
+        e.g. ["project_id"].
+    :return: A DataFrame with the date, keys and token usage (see GetTransactionUsageStatisticsWithoutDateSchema) columns.
     """
-    data_dicts = [dto.model_dump() for dto in transactions]
-    df = pd.DataFrame(data_dicts)
-    project_id = data_dicts[0]["project_id"]
-    pairs = list(set([(data["provider"], data["model"]) for data in data_dicts]))
-    if date_from:
-        for pair_idx in range(len(pairs)):
-            df.loc[len(df)] = {
-                "date": pd.Timestamp(date_from),
-                "project_id": project_id,
-                "provider": pairs[pair_idx][0],
-                "model": pairs[pair_idx][1],
-                "total_input_tokens": 0,
-                "total_output_tokens": 0,
-                "total_input_cost": 0,
-                "total_output_cost": 0,
-                "total_cost": 0,
-                "status_code": 0,
-                "latency": timedelta(0),
-                "total_transactions": 0,
-                "generation_speed": 0,
-            }
-    if date_to:
-        for pair in pairs:
-            df.loc[len(df)] = {
-                "date": pd.Timestamp(date_to),
-                "project_id": project_id,
-                "provider": pair[0],
-                "model": pair[1],
-                "total_input_tokens": 0,
-                "total_output_tokens": 0,
-                "total_input_cost": 0,
-                "total_output_cost": 0,
-                "total_cost": 0,
-                "status_code": 0,
-                "latency": timedelta(0),
-                "total_transactions": 0,
-                "generation_speed": 0,
-            }
+    keys = keys or ["provider", "model"]
+    df = _with_boundary_rows(transactions, keys, [date_from, date_to])
 
-    df.set_index("date", inplace=True)
+    df = df.set_index("date")
     period = pandas_period_from_string(period)
     result = (
-        df.groupby(["provider", "model"])
+        df.groupby(keys)
         .resample(period)
         .agg(
             {
-                "project_id": "first",
-                "provider": "first",
-                "model": "first",
                 "total_input_tokens": "sum",
                 "total_output_tokens": "sum",
-                "total_input_cost": "sum",
-                "total_output_cost": "sum",
                 "total_cost": "sum",
-                "status_code": "sum",
-                "latency": "sum",
                 "total_transactions": "sum",
-                "generation_speed": "sum",
             }
         )
+        .reset_index()
     )
 
-    del result["provider"]
-    del result["model"]
+    grouped = result.groupby(keys)
+    result["output_cumulative_total"] = grouped["total_output_tokens"].cumsum()
+    result["input_cumulative_total"] = grouped["total_input_tokens"].cumsum()
+    if cumulative_total_cost:
+        result["total_cost"] = grouped["total_cost"].cumsum()
 
-    result = result.reset_index()
+    return result
 
-    result["output_cumulative_total"] = result.groupby(["provider", "model"])[
-        "total_output_tokens"
-    ].cumsum()
-    result["input_cumulative_total"] = result.groupby(["provider", "model"])[
-        "total_input_tokens"
-    ].cumsum()
-    result["total_cumulative_cost"] = result.groupby(["provider", "model"])[
-        "total_cost"
-    ].cumsum()
 
-    data_dicts = result.to_dict(orient="records")
+def token_counter_for_transactions(
+    transactions: pd.DataFrame,
+    period: str,
+    date_from: datetime | None = None,
+    date_to: datetime | None = None,
+    cumulative_total_cost: bool = True,
+) -> list[GetTransactionsUsageStatisticsSchema]:
+    """
+    Calculate token usage statistics based on a given period.
 
-    result_list = [
-        GetTransactionUsageStatisticsSchema(
-            provider=data["provider"],
-            model=data["model"],
-            date=data["date"],
-            total_input_tokens=data["total_input_tokens"],
-            total_output_tokens=data["total_output_tokens"],
-            input_cumulative_total=data["input_cumulative_total"],
-            output_cumulative_total=data["output_cumulative_total"],
-            total_transactions=data["total_transactions"],
-            total_cost=data["total_cumulative_cost"]
-            if cumulative_total_cost
-            else data["total_cost"],
-        )
-        for data in data_dicts
-    ]
+    This function takes a list of transactions and calculates token usage statistics
+    aggregated over the specified period (weekly, monthly, hourly, minutely or daily).
 
-    return result_list
+    :param transactions: A statistics DataFrame (see statistics_dataframe) of transactions or their buckets.
+    :param period: A string indicating the aggregation period.
+        Choose from 'weekly', 'monthly' 'hourly', 'minutely' or 'daily'.
+    :param date_from: The starting date for the filter.
+    :param date_to: The ending date for the filter.
+    :param cumulative_total_cost: The switch that decides if total cost is cumulative or not.
+    :return: A list of GetTransactionsUsageStatisticsSchema objects containing token usage statistics grouped by date.
+    """
+    return group_statistics_by_date(
+        token_usage_dataframe(
+            transactions, period, date_from, date_to, cumulative_total_cost
+        ),
+        GetTransactionsUsageStatisticsSchema,
+        GetTransactionUsageStatisticsWithoutDateSchema,
+    )
 
 
 def status_counter_for_transactions(
-    transactions: list[StatisticTransactionSchema],
+    transactions: pd.DataFrame,
     period: str,
     date_from: datetime | None = None,
     date_to: datetime | None = None,
@@ -1366,63 +1516,38 @@ def status_counter_for_transactions(
     This function takes a list of transactions and calculates statistics
     on transaction statuses aggregated over the specified period (weekly, monthly, hourly, minutely or daily).
 
-    :param transactions: A list of StatisticTransactionSchema objects representing transactions.
+    :param transactions: A statistics DataFrame (see statistics_dataframe) of transactions
+        or buckets of transactions with the same status code class.
     :param period: A string indicating the aggregation period.
         Choose from 'weekly', 'monthly' 'hourly', 'minutely' or 'daily'.
     :param date_from: The starting date for the filter.
     :param date_to: The ending date for the filter.
     :return: A list of GetTransactionStatusStatisticsSchema objects containing status statistics.
     """
-    data_dicts = [dto.model_dump() for dto in transactions]
-    for x in range(len(data_dicts)):
-        data_dicts[x]["status_code"] = (data_dicts[x]["status_code"] // 100) * 100
-    df = pd.DataFrame(data_dicts)
-    df.set_index("date", inplace=True)
-
-    if date_from:
-        date_from = str(date_from)
-        df.loc[pd.Timestamp(date_from)] = pd.NA
-    if date_to:
-        date_to = str(date_to)
-        df.loc[pd.Timestamp(date_to)] = pd.NA
-
     period = pandas_period_from_string(period)
-
-    result = df.resample(period).agg(
-        {
-            "project_id": "first",
-            "provider": "first",
-            "model": "first",
-            "total_input_tokens": "sum",
-            "total_output_tokens": "sum",
-            "total_input_cost": "sum",
-            "total_output_cost": "sum",
-            "total_cost": "sum",
-            "status_code": [
-                ("status_200", lambda code: (code == 200).sum()),
-                ("status_300", lambda code: (code == 300).sum()),
-                ("status_400", lambda code: (code == 400).sum()),
-                ("status_500", lambda code: (code == 500).sum()),
-            ],
-            "latency": "sum",
-            "total_transactions": "sum",
-            "generation_speed": "sum",
-        }
+    labels = _period_labels(transactions["date"], period)
+    status_classes = np.floor_divide(transactions["status_code"].to_numpy(), 100) * 100
+    counts = (
+        transactions["total_transactions"]
+        .groupby([labels.to_numpy(), status_classes])
+        .sum()
+        .unstack(fill_value=0)
     )
-    result = result.reset_index()
-
-    data_dicts = result.to_dict(orient="records")
+    result = counts.reindex(columns=[200, 300, 400, 500], fill_value=0)
+    result.columns = [f"status_{code}" for code in result.columns]
+    result["total_transactions"] = counts.sum(axis=1)
+
+    # Zero-filled periods stretch the range to the boundary dates
+    boundaries = [_naive_timestamp(date) for date in (date_from, date_to) if date]
+    dates = result.index.union(
+        _period_labels(pd.Series(pd.to_datetime(boundaries)), period)
+    )
+    result = result.reindex(
+        pd.date_range(dates.min(), dates.max(), freq=period, name="date"),
+        fill_value=0,
+    ).reset_index()
 
-    new_data_dicts = []
-    for data in data_dicts:
-        new_data = {}
-        for key, value in data.items():
-            if key[0] == "status_code":
-                new_key = key[1]
-            else:
-                new_key = key[0]
-            new_data[new_key] = value
-        new_data_dicts.append(new_data)
+    new_data_dicts = result.to_dict(orient="records")
 
     result_list = [
         GetTransactionStatusStatisticsSchema(
@@ -1441,192 +1566,92 @@ def status_counter_for_transactions(
 # speed statistics utils functions
 
 def speed_counter_for_transactions(
-    transactions: list[StatisticTransactionSchema],
+    transactions: pd.DataFrame,
     period: str,
     date_from: datetime | None = None,
     date_to: datetime | None = None,
-) -> list[GetTransactionLatencyStatisticsSchema]:
+) -> list[GetTransactionsLatencyStatisticsSchema]:
     """
     Calculate transaction latency statistics based on a given period.
 
     This function takes a list of transactions and calculates statistics
     on transaction latency aggregated over the specified period (weekly, monthly, hourly, minutely or daily).
 
-    :param transactions: A list of StatisticTransactionSchema objects representing transactions.
+    :param transactions: A statistics DataFrame (see statistics_dataframe) of transactions.
     :param period: A string indicating the aggregation period.
         Choose from 'weekly', 'monthly' 'hourly', 'minutely' or 'daily'.
     :param date_from: The starting date for the filter.
     :param date_to: The ending date for the filter.
-    :return: A list of GetTransactionLatencyStatisticsSchema objects containing latency statistics.
+    :return: A list of GetTransactionsLatencyStatisticsSchema objects containing latency statistics grouped by date.
     """
-    data_dicts = [dto.model_dump() for dto in transactions]
-    df = pd.DataFrame(data_dicts)
-    project_id = data_dicts[0]["project_id"]
-    pairs = set([(data["provider"], data["model"]) for data in data_dicts])
-    if date_from:
-        for pair in pairs:
-            df.loc[len(df)] = {
-                "date": pd.Timestamp(date_from),
-                "project_id": project_id,
-                "provider": pair[0],
-                "model": pair[1],
-                "total_input_tokens": 0,
-                "total_output_tokens": 0,
-                "total_input_cost": 0,
-                "total_output_cost": 0,
-                "total_cost": 0,
-                "status_code": 0,
-                "latency": timedelta(0),
-                "total_transactions": 0,
-                "generation_speed": 0,
-            }
-    if date_to:
-        for pair in pairs:
-            df.loc[len(df)] = {
-                "date": pd.Timestamp(date_to),
-                "project_id": project_id,
-                "provider": pair[0],
-                "model": pair[1],
-                "total_input_tokens": 0,
-                "total_output_tokens": 0,
-                "total_input_cost": 0,
-                "total_output_cost": 0,
-                "total_cost": 0,
-                "status_code": 0,
-                "latency": timedelta(0),
-                "total_transactions": 0,
-                "generation_speed": 0,
-            }
-    df.set_index("date", inplace=True)
+    df = _with_boundary_rows(transactions, ["provider", "model"], [date_from, date_to])
+    df = df.set_index("date")
     period = pandas_period_from_string(period)
     result = (
-        df.assign(
-            transactions_code_200=lambda x: np.where(x["status_code"] == 200, 1, 0)
-        )
+        df.assign(transactions_code_200=np.where(df["status_code"] == 200, 1, 0))
         .groupby(["provider", "model"])
         .resample(period)
         .agg(
             {
-                "project_id": "first",
-                "provider": "first",
-                "model": "first",
-                "total_input_tokens": "sum",
-                "total_output_tokens": "sum",
-                "total_input_cost": "sum",
-                "total_output_cost": "sum",
-                "total_cost": "sum",
-                "status_code": "first",
                 "latency": "sum",
                 "total_transactions": "sum",
                 "generation_speed": "sum",
                 "transactions_code_200": "sum",
             }
         )
+        .reset_index()
     )
 
-    del result["provider"]
-    del result["model"]
-
-    result = result.reset_index()
-
-    data_dicts = result.to_dict(orient="records")
-    result_list = [
-        GetTransactionLatencyStatisticsSchema(
-            provider=data["provider"],
-            model=data["model"],
-            date=data["date"],
-            mean_latency=data["latency"].total_seconds() / data["total_transactions"]
-            if data["latency"].total_seconds() > 0
-            else 0,
-            tokens_per_second=data["generation_speed"] / data["transactions_code_200"]
-            if data["generation_speed"] > 0 and data["transactions_code_200"] > 0
-            else 0,
-            total_transactions=data["total_transactions"],
+    result["mean_latency"] = (
+        (result["latency"] / result["total_transactions"])
+        .where(result["latency"] > 0, 0)
+        .fillna(0)
+    )
+    result["tokens_per_second"] = (
+        (result["generation_speed"] / result["transactions_code_200"])
+        .where(
+            (result["generation_speed"] > 0) & (result["transactions_code_200"] > 0),
+            0,
         )
-        for data in data_dicts
-    ]
+        .fillna(0)
+    )
 
-    return result_list
+    return group_statistics_by_date(
+        result,
+        GetTransactionsLatencyStatisticsSchema,
+        GetTransactionLatencyStatisticsWithoutDateSchema,
+    )
 
 def prepare_transaction_dataframe(
-    transactions: list[Transaction],
+    transactions: pd.DataFrame,
     date_from: datetime | None = None,
     date_to: datetime | None = None,
 ) -> pd.DataFrame:
     """
-    Convert transactions to DataFrame and add boundary dates with zero values.
+    Add boundary dates with zero values to the transaction buckets.
+
+    Latency and generation speed are kept as sums, so the means can be weighted
+    by the number of transactions in every bucket.
     
     Args:
-        transactions: List of transactions
+        transactions: Statistics DataFrame of transaction buckets
         date_from: Start date for analysis
         date_to: End date for analysis
         
     Returns:
         DataFrame with transactions and boundary dates
     """
-    if not transactions:
+    if transactions.empty:
         return pd.DataFrame()
-        
-    # Convert transactions to DataFrame efficiently
-    df = pd.DataFrame([
-        {
-            "project_id": tx.project_id,
-            "provider": tx.provider,
-            "model": tx.model,
-            "total_input_tokens": tx.input_tokens or 0,
-            "total_output_tokens": tx.output_tokens or 0,
-            "total_input_cost": tx.input_cost or 0,
-            "total_output_cost": tx.output_cost or 0,
-            "total_cost": tx.total_cost or 0,
-            "date": tx.response_time,
-            "latency": (tx.response_time - tx.request_time).total_seconds(),
-            "generation_speed": tx.generation_speed or 0,
-            "total_transactions": 1,
-        }
-        for tx in transactions
-    ])
-    
-    # Add boundary dates if specified
-    if date_from or date_to:
-        boundary_records = _create_boundary_records(
-            df, date_from, date_to
-        )
-        if not boundary_records.empty:
-            df = pd.concat([df, boundary_records], ignore_index=True)
-    
-    return df
 
-def _create_boundary_records(
-    df: pd.DataFrame,
-    date_from: datetime | None,
-    date_to: datetime | None
-) -> pd.DataFrame:
-    """Create records for boundary dates with zero values."""
-    if df.empty:
-        return pd.DataFrame()
-        
-    # Get unique provider/model pairs
-    pairs = df[["provider", "model"]].drop_duplicates()
-    project_id = df["project_id"].iloc[0]
-    
-    records = []
-    for date in filter(None, [date_from, date_to]):
-        # Create zero-value records for each provider/model pair
-        zero_records = pairs.assign(
-            date=pd.Timestamp(date),
-            project_id=project_id,
-            total_input_tokens=0,
-            total_output_tokens=0,
-            total_input_cost=0,
-            total_output_cost=0,
-            total_cost=0,
-            # Set to NaN for values that should not affect mean calculations
-            latency=np.nan,
-            generation_speed=np.nan,
-        )
-        records.append(zero_records)
-    
-    return pd.concat(records) if records else pd.DataFrame()
+    # Set to NaN for values that should not affect mean calculations
+    return _with_boundary_rows(
+        transactions,
+        ["provider", "model"],
+        [date_from, date_to],
+        latency=np.nan,
+        generation_speed=np.nan,
+    )
 
 def calculate_speed_statistics(
     df: pd.DataFrame,
@@ -1650,10 +1675,14 @@ def calculate_speed_statistics(
     
     # Group by provider/model and resample by period
     grouped = df.groupby(['provider', 'model']).resample(period).agg({
-        'latency': 'mean',  # Direct mean calculation
-        'generation_speed': 'mean',  # Direct mean calculation
+        'latency': 'sum',
+        'generation_speed': 'sum',
         'total_transactions': 'sum'
     }).reset_index()
+
+    # Means weighted by the number of transactions in the buckets
+    grouped['latency'] = grouped['latency'] / grouped['total_transactions']
+    grouped['generation_speed'] = grouped['generation_speed'] / grouped['total_transactions']
     
     # Clean up the results
     grouped = grouped.fillna(0)
@@ -1666,130 +1695,69 @@ def format_statistics_response(
     """Convert DataFrame to API response format."""
     if df.empty:
         return []
-    
-    # Group by date first
-    date_groups = df.groupby('date')
-    
-    # Convert to final format
-    return [
-        GetTransactionsLatencyStatisticsSchema(
-            date=date,
-            records=[
-                GetTransactionLatencyStatisticsWithoutDateSchema(
-                    provider=row.provider,
-                    model=row.model,
-                    mean_latency=row.latency,
-                    tokens_per_second=row.generation_speed,
-                    total_transactions=row.total_transactions,
-                )
-                for _, row in group.iterrows()
-            ]
-        )
-        for date, group in date_groups
-    ]
+
+    return group_statistics_by_date(
+        df.rename(
+            columns={"latency": "mean_latency", "generation_speed": "tokens_per_second"}
+        ),
+        GetTransactionsLatencyStatisticsSchema,
+        GetTransactionLatencyStatisticsWithoutDateSchema,
+    )
 
 
 
 
 # 
 def token_counter_for_transactions_by_tag(
-    transactions: list[TagStatisticTransactionSchema],
+    transactions: pd.DataFrame,
     period: str,
     date_from: datetime | None = None,
     date_to: datetime | None = None,
     cumulative_total_cost: bool = True,
-) -> list[GetTagStatisticTransactionSchema]:
+) -> list[GetTagStatisticsInTime]:
     """
-    Calculate token usage statistics based on a given period.
+    Calculate token usage statistics of every tag based on a given period.
 
     This function takes a list of transactions and calculates token usage statistics
     aggregated over the specified period (weekly, monthly, hourly, minutely or daily).
 
-    :param transactions: A list of StatisticTransactionSchema objects representing transactions.
+    :param transactions: A statistics DataFrame (see statistics_dataframe) with an additional tag column.
     :param period: A string indicating the aggregation period.
         Choose from 'weekly', 'monthly' 'hourly', 'minutely' or 'daily'.
     :param date_from: The starting date for the filter.
     :param date_to: The ending date for the filter.
     :param cumulative_total_cost: The switch that decides if total cost is cumulative or not.
-    :return: A list of GetTransactionUsageStatisticsSchema objects containing token usage statistics.
+    :return: A list of GetTagStatisticsInTime objects containing token usage statistics grouped by date.
     """
-    data_dicts = [dto.model_dump() for dto in transactions]
-    df = pd.DataFrame(data_dicts)
-    tags = list(set([transaction.tag for transaction in transactions]))
-    if date_from:
-        for tag in tags:
-            df.loc[len(df)] = {
-                "date": pd.Timestamp(date_from),
-                "tag": tag,
-                "total_input_tokens": 0,
-                "total_output_tokens": 0,
-                "total_input_cost": 0,
-                "total_output_cost": 0,
-                "total_cost": 0,
-                "total_transactions": 0,
-            }
-    if date_to:
-        for tag in tags:
-            df.loc[len(df)] = {
-                "date": pd.Timestamp(date_to),
-                "tag": tag,
-                "total_input_tokens": 0,
-                "total_output_tokens": 0,
-                "total_input_cost": 0,
-                "total_output_cost": 0,
-                "total_cost": 0,
-                "total_transactions": 0,
-            }
-
-    df.set_index("date", inplace=True)
+    df = _with_boundary_rows(transactions, ["tag"], [date_from, date_to])
+    df = df.set_index("date")
     period = pandas_period_from_string(period)
     result = (
         df.groupby("tag")
         .resample(period)
         .agg(
             {
-                "tag": "first",
                 "total_input_tokens": "sum",
                 "total_output_tokens": "sum",
-                "total_input_cost": "sum",
-                "total_output_cost": "sum",
                 "total_cost": "sum",
                 "total_transactions": "sum",
             }
         )
+        .reset_index()
     )
 
-    del result["tag"]
-
-    result = result.reset_index()
-
     result["output_cumulative_total"] = result.groupby("tag")[
         "total_output_tokens"
     ].cumsum()
     result["input_cumulative_total"] = result.groupby("tag")[
         "total_input_tokens"
     ].cumsum()
-    result["total_cumulative_cost"] = result.groupby("tag")["total_cost"].cumsum()
-
-    data_dicts = result.to_dict(orient="records")
+    if cumulative_total_cost:
+        result["total_cost"] = result.groupby("tag")["total_cost"].cumsum()
 
-    result_list = [
-        GetTagStatisticTransactionSchema(
-            tag=data["tag"],
-            date=data["date"],
-            total_input_tokens=data["total_input_tokens"],
-            total_output_tokens=data["total_output_tokens"],
-            input_cumulative_total=data["input_cumulative_total"],
-            output_cumulative_total=data["output_cumulative_total"],
-            total_transactions=data["total_transactions"],
-            total_cost=data["total_cumulative_cost"]
-            if cumulative_total_cost
-            else data["total_cost"],
-        )
-        for data in data_dicts
-    ]
-
-    return result_list
+    return group_statistics_by_date(
+        result, GetTagStatisticsInTime, GetTagStatisticsSchema
+    )
 
 
 class ProviderPrice:
@@ -1855,24 +1823,76 @@ def read_provider_pricelist(
     return prices
 
 
+class PricingEngine:
+    """
+    Cost calculator built once from the provider price list.
+
+    Prices are grouped by provider with precompiled match patterns, and the price
+    resolved for each (provider, model) pair is kept in a bounded LRU cache.
+    """
+
+    def __init__(self, pricelist: list[ProviderPrice], cache_size: int = 1024) -> None:
+        """
+        Initialize the PricingEngine.
+
+        :param pricelist: The list of provider prices.
+        :param cache_size: The maximum number of cached (provider, model) resolutions.
+        """
+        self._prices_by_provider: dict[str, list[tuple[re.Pattern, ProviderPrice]]] = {}
+        for item in pricelist:
+            self._prices_by_provider.setdefault(item.provider, []).append(
+                (re.compile(item.match_pattern), item)
+            )
+        self.get_price = lru_cache(maxsize=cache_size)(self._find_price)
+
+    def _find_price(self, provider: str, model: str) -> ProviderPrice | None:
+        for pattern, item in self._prices_by_provider.get(provider, []):
+            if pattern.match(model):
+                return item
+        return None
+
+    def price(
+        self,
+        provider: str,
+        model: str,
+        input_tokens: int,
+        output_tokens: int,
+        n_images: int | None = None,
+    ) -> tuple[float, float, float] | tuple[None, None, None]:
+        """
+        Calculate the cost of a transaction.
+
+        :param provider: The name of the AI provider.
+        :param model: The name of the AI model.
+        :param input_tokens: The number of input tokens.
+        :param output_tokens: The number of output tokens.
+        :param n_images: Optional. The number of generated images, defaults to 1 for image generation models.
+        :return: A tuple of input, output and total cost, or Nones if the model has no price.
+        """
+        item = self.get_price(provider, model)
+        if item is None:
+            return None, None, None
+        if item.mode == "image_generation":
+            output_cost = int(n_images if n_images is not None else 1) * item.total_price
+            return 0, output_cost, output_cost
+        if item.input_price == 0:
+            return 0, 0, (input_tokens + output_tokens) / 1000 * item.total_price
+        input_cost = item.input_price * (input_tokens / 1000)
+        output_cost = item.output_price * (output_tokens / 1000)
+        return input_cost, output_cost, input_cost + output_cost
+
+
 class ApiURLBuilder:
     @staticmethod
-    def build(project, deployment_slug: str, path: str, target_path: str) -> str:
+    def build(api_base: str, path: str, target_path: str) -> str:
         """
-        Build an API URL using the specified project, deployment slug, path, and target path.
+        Build an API URL using the specified api_base of the AI provider, path, and target path.
 
-        :param project: The project object containing AI providers.
-        :param deployment_slug: The deployment slug to identify the AI provider.
+        :param api_base: The api_base of the AI provider selected by the deployment slug.
         :param path: The base path for the API URL.
         :param target_path: The target path to be appended to the base path.
         :return: The constructed API URL.
         """
-
-        api_base = [
-            prov.api_base
-            for prov in project.ai_providers
-            if prov.slug == deployment_slug
-        ][0]
         if path == "":
             path = unquote(unquote(target_path)) if target_path is not None else ""
             if len(path.split("/")[1:]) > 5:
@@ -1881,12 +1901,10 @@ class ApiURLBuilder:
                 path = "/" + "/".join(new_path)
 
         url = api_base + f"/{path}".replace("//", "/")
-        print("URL", url)
 
         if api_base.endswith("/"):
             url = api_base + f"{path}".replace("//", "/")
 
-        print("URL", url)
         return url
 
 
@@ -1934,6 +1952,30 @@ def pandas_period_from_string(period: str):
     return "D"
 
 
+def mongo_date_trunc_from_period(period: str) -> dict[str, Any]:
+    """
+    Translate a statistics period into the arguments of the MongoDB $dateTrunc operator.
+
+    The buckets are aligned with the bins of pandas_period_from_string, so rows grouped by
+    MongoDB can be resampled by pandas into the same periods.
+
+    :param period: The period of the statistics.
+    :return: The unit (and bin size or start of the week) arguments of $dateTrunc.
+    """
+    if period == PeriodEnum.week:
+        # pandas "W-Mon" bins end on Monday, so they start on Tuesday
+        return {"unit": "week", "startOfWeek": "tuesday"}
+    if period == PeriodEnum.month:
+        return {"unit": "month"}
+    if period == PeriodEnum.year:
+        return {"unit": "year"}
+    if period == PeriodEnum.hour:
+        return {"unit": "hour"}
+    if period == PeriodEnum.minutes:
+        return {"unit": "minute", "binSize": 5}
+    return {"unit": "day"}
+
+
 def generate_mock_transactions(n: int, date_from: datetime, date_to: datetime):
     """
     Generate a list of mock transactions.
@@ -2020,15 +2062,60 @@ def generate_mock_transactions(n: int, date_from: datetime, date_to: datetime):
 
 
 
+FALLBACK_ENCODING = "cl100k_base"
+MAX_CACHED_ENCODER_MODELS = 1024
+
+_encoders_by_name: dict[str, tiktoken.Encoding] = {}
+_encoders_by_model: dict[str, tiktoken.Encoding] = {}
+
+
+def get_encoder(model: str) -> tiktoken.Encoding:
+    """
+    Get the tiktoken encoder for a model from the process-wide cache.
+
+    Models unknown to tiktoken are counted with the fallback encoding instead of raising.
+
+    :param model: The name of the AI model.
+    :return: The cached tiktoken Encoding for the model.
+    """
+    encoder = _encoders_by_model.get(model)
+    if encoder is not None:
+        return encoder
+    try:
+        encoding_name = tiktoken.encoding_name_for_model(model)
+    except KeyError:
+        encoding_name = FALLBACK_ENCODING
+    encoder = _encoders_by_name.get(encoding_name)
+    if encoder is None:
+        encoder = _encoders_by_name[encoding_name] = tiktoken.get_encoding(
+            encoding_name
+        )
+    if len(_encoders_by_model) < MAX_CACHED_ENCODER_MODELS:
+        _encoders_by_model[model] = encoder
+    return encoder
+
+
+def warm_up_encoders(pricelist: list["ProviderPrice"]) -> list[str]:
+    """
+    Load the tiktoken encoders for all models from the price list into the cache.
+
+    :param pricelist: The list of provider prices.
+    :return: The names of the loaded encodings.
+    """
+    for item in pricelist:
+        get_encoder(item.model_name)
+    return sorted(_encoders_by_name)
+
+
 def count_tokens_for_streaming_response(messages: list | str, model: str) -> int:
-    encoder = tiktoken.encoding_for_model(model)
+    encoder = get_encoder(model)
     if isinstance(messages, str):
-        tokens = encoder.encode(messages)
+        tokens = encoder.encode_ordinary(messages)
     else:
         full_prompt = "\n".join(
             [f"{message['role']}: {message['content']}" for message in messages]
         )
-        tokens = encoder.encode(full_prompt)
+        tokens = encoder.encode_ordinary(full_prompt)
     return len(tokens)
 
 
@@ -2055,7 +2142,156 @@ def resize_b64_image(b64_image: str | str, new_size: tuple[int, int]) -> str:
     return resized_b64_string
 
 
-def preprocess_buffer(request, response, buffer) -> dict:
+class StreamAccumulator:
+    """
+    Incremental decoder of a streamed (server-sent events) chat completion.
+
+    Chunks are fed as they pass through the proxy, every complete event is parsed
+    once and merged into the accumulated completion, so the reconstructed response
+    is ready as soon as the stream ends and the raw chunks do not have to be kept.
+    """
+
+    def __init__(self, content_decoder=None):
+        """
+        Initialize the accumulator.
+
+        :param content_decoder: Optional. Incremental decoder of the response content-encoding.
+        """
+        self._content_decoder = content_decoder
+        self._text_decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._pending = ""
+        self.id = None
+        self.created = None
+        self.model = None
+        self.system_fingerprint = None
+        self.usage = None
+        self.choices = {}
+        self.events = 0
+
+    @classmethod
+    def from_response(cls, response) -> "StreamAccumulator | None":
+        """
+        Create an accumulator for a response if it is an event stream.
+
+        :param response: The streamed response of the AI provider.
+        :return: The StreamAccumulator, or None if the response is not an event stream.
+        """
+        if "text/event-stream" not in response.headers.get("content-type", ""):
+            return None
+        return cls(content_decoder=response._get_content_decoder())
+
+    def feed(self, chunk: bytes) -> None:
+        """
+        Decode a raw chunk of the stream and merge every completed event.
+
+        :param chunk: The raw bytes received from the AI provider.
+        """
+        if self._content_decoder is not None:
+            chunk = self._content_decoder.decode(chunk)
+        self._consume(self._text_decoder.decode(chunk))
+
+    def close(self) -> None:
+        """
+        Flush the decoders and merge the last event if it was not terminated.
+        """
+        tail = b""
+        if self._content_decoder is not None:
+            tail = self._content_decoder.flush()
+        self._consume(self._text_decoder.decode(tail, final=True))
+        if self._pending.strip():
+            self._handle_event(self._pending)
+        self._pending = ""
+
+    def _consume(self, text: str) -> None:
+        self._pending = (self._pending + text).replace("\r\n", "\n")
+        while "\n\n" in self._pending:
+            event, self._pending = self._pending.split("\n\n", 1)
+            self._handle_event(event)
+
+    def _handle_event(self, event: str) -> None:
+        data = "\n".join(
+            line[5:].lstrip() for line in event.split("\n") if line.startswith("data:")
+        )
+        if not data or data == "[DONE]":
+            return
+        try:
+            payload = json.loads(data)
+        except json.JSONDecodeError:
+            return
+        if isinstance(payload, dict):
+            self._merge(payload)
+
+    def _merge(self, payload: dict) -> None:
+        self.events += 1
+        for key in ("id", "created", "model", "system_fingerprint"):
+            if payload.get(key) is not None and getattr(self, key) is None:
+                setattr(self, key, payload[key])
+        if payload.get("usage"):
+            self.usage = payload["usage"]
+        for choice in payload.get("choices") or []:
+            state = self.choices.setdefault(
+                choice.get("index", 0),
+                dict(role="assistant", content=[], finish_reason=None),
+            )
+            delta = choice.get("delta") or {}
+            if delta.get("role"):
+                state["role"] = delta["role"]
+            if delta.get("content"):
+                state["content"].append(delta["content"].replace("\n", " "))
+            if choice.get("finish_reason"):
+                state["finish_reason"] = choice["finish_reason"]
+
+    def build(self, request, request_content: dict | None = None) -> dict:
+        """
+        Build the chat completion equivalent to the accumulated stream.
+
+        Token usage is taken from the stream when the provider sent it, otherwise
+        it is counted from the request messages and the generated content.
+
+        :param request: The request sent to the AI provider.
+        :param request_content: Optional. The decoded request content, the request is decoded if not provided.
+        :return: The reconstructed response content.
+        """
+        choices = [
+            dict(
+                index=index,
+                message=dict(role=state["role"], content="".join(state["content"])),
+                logprobs=None,
+                finish_reason=state["finish_reason"] or "stop",
+            )
+            for index, state in sorted(self.choices.items())
+        ]
+        usage = self.usage
+        if usage is None and self.model is None:
+            usage = dict(prompt_tokens=0, completion_tokens=0, total_tokens=0)
+        elif usage is None:
+            if request_content is None:
+                request_content = decode_request_content(request)
+            messages = request_content.get("messages", [])
+            input_tokens = count_tokens_for_streaming_response(messages, self.model)
+            output_tokens = sum(
+                count_tokens_for_streaming_response(
+                    choice["message"]["content"], self.model
+                )
+                for choice in choices
+            )
+            usage = dict(
+                prompt_tokens=input_tokens,
+                completion_tokens=output_tokens,
+                total_tokens=input_tokens + output_tokens,
+            )
+        return dict(
+            id=self.id,
+            object="chat.completion",
+            created=self.created,
+            model=self.model,
+            choices=choices,
+            system_fingerprint=self.system_fingerprint,
+            usage=usage,
+        )
+
+
+def preprocess_buffer(request, response, buffer, request_content=None) -> dict:
     decoder = response._get_content_decoder()
     buf = b"".join(buffer)
     if "localhost" in str(request.__dict__["url"]) or "host.docker.internal" in str(
@@ -2086,49 +2322,10 @@ def preprocess_buffer(request, response, buffer) -> dict:
             response_content = decoder.decode(buf)
             response_content = json.loads(response_content)
         except json.JSONDecodeError:
-            content = []
-            for i in (
-                chunks := buf.decode()
-                .replace("data: ", "")
-                .split("\n\n")[::-1][3:][::-1]
-            ):
-                content.append(
-                    json.loads(i)["choices"][0]["delta"]["content"].replace("\n", " ")
-                )
-            content = "".join(content)
-            example = json.loads(chunks[0])
-            messages = [
-                message
-                for message in json.loads(request.__dict__["_content"].decode("utf8"))[
-                    "messages"
-                ]
-            ]
-            input_tokens = count_tokens_for_streaming_response(
-                messages, example["model"]
-            )
-            output_tokens = count_tokens_for_streaming_response(
-                content, example["model"]
-            )
-            response_content = dict(
-                id=example["id"],
-                object="chat.completion",
-                created=example["created"],
-                model=example["model"],
-                choices=[
-                    dict(
-                        index=0,
-                        message=dict(role="assistant", content=content),
-                        logprobs=None,
-                        finish_reason="stop",
-                    )
-                ],
-                system_fingerprint=example["system_fingerprint"],
-                usage=dict(
-                    prompt_tokens=input_tokens,
-                    completion_tokens=output_tokens,
-                    total_tokens=input_tokens + output_tokens,
-                ),
-            )
+            accumulator = StreamAccumulator()
+            accumulator.feed(buf)
+            accumulator.close()
+            response_content = accumulator.build(request, request_content)
     if isinstance(response_content, list):
         response_content = response_content[0]
     if "usage" not in response_content:
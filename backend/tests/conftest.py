@@ -88,8 +88,10 @@ def test_transactions_count(application):
 
 
 @pytest.fixture(autouse=True)
-def clean_database(application):
-    """Automatically clean database before each test"""
+def clean_database(application, fastapi_instance):
+    """Automatically clean database, cached responses and proxy routes before each test"""
     for collection in application["db_client"].list_collection_names():
         application["db_client"][collection].drop()
+    fastapi_instance.container.response_cache().clear()
+    fastapi_instance.container.project_routing_table().load([])
     yield
@@ -191,6 +191,31 @@ def test_create_transaction_with_valid_data_returns_201_and_calculated_costs(cli
     assert transaction["output_cost"] > 0
     assert transaction["total_cost"] == transaction["input_cost"] + transaction["output_cost"]
   
+def test_get_transaction_details_returns_200_and_raw_data(client, application, test_project):
+    """Test reading a stored transaction with its raw request and response"""
+    # arrange
+    created = client.post("/api/transactions", headers=header, json=test_transaction).json()
+
+    # act
+    response = client.get(f"/api/transactions/{created['id']}", headers=header)
+
+    # assert
+    assert response.status_code == 200
+    transaction = response.json()
+    assert transaction["id"] == created["id"]
+    assert transaction["project_name"] == test_project.name
+    assert transaction["request"]["method"] == "POST"
+    assert transaction["response"] is not None
+
+
+def test_get_transaction_details_with_unknown_id_returns_404(client, application, test_project):
+    """Test reading a transaction which does not exist"""
+    # act
+    response = client.get("/api/transactions/not-existing-id", headers=header)
+
+    # assert
+    assert response.status_code == 404
+
 def test_create_transaction_with_failed_response_returns_201_and_error_details(client, application, test_project):
     """Test transaction creation with failed API response"""
     # arrange
@@ -222,14 +247,11 @@ def test_create_transaction_with_image_generation_model_returns_201_and_proper_c
     # act
     response = client.post("/api/transactions", headers=header, json=data)
 
-    pytest.skip("todo: add cost calculation")
     # assert
     assert response.status_code == 201
     transaction = response.json()
     assert transaction["type"] == "image_generation"
-    
-    # todo: add cost calculation
-    #assert transaction["total_cost"] == pytest.approx(0.040, rel=1e-4)
+    assert transaction["total_cost"] == pytest.approx(0.040, rel=1e-4)
     assert transaction["input_cost"] == 0  # Image generation has no input cost
 
 def test_create_transaction_with_missing_required_fields_returns_422(client, application):
@@ -706,3 +728,109 @@ def test_transaction_generation_speed_with_future_request_time_returns_201_and_n
 
 
 
+
+
+# --------------------------------
+# Transactions list tests
+# --------------------------------
+
+def test_get_paginated_transactions_sorted_by_field_returns_nulls_last(client, application, test_project):
+    """Test sorting and pagination of the transactions list"""
+    # arrange
+    from transactions.models import Transaction
+
+    with application.transaction_context() as ctx:
+        repo = ctx["transaction_repository"]
+        for idx, total_cost in enumerate([3, None, 1, 2, None]):
+            repo.add(
+                Transaction(
+                    id=f"transaction-{idx}",
+                    project_id=test_project.id,
+                    tags=[],
+                    provider="OpenAI",
+                    model="gpt-4o",
+                    type="chat",
+                    os=None,
+                    input_tokens=10,
+                    output_tokens=10,
+                    library="test",
+                    status_code=200,
+                    messages=None,
+                    last_message=None,
+                    prompt="",
+                    error_message=None,
+                    generation_speed=None,
+                    input_cost=None,
+                    output_cost=None,
+                    total_cost=total_cost,
+                    request_time=datetime(2024, 1, 1, idx, tzinfo=timezone.utc),
+                    response_time=datetime(2024, 1, 1, idx, 1, tzinfo=timezone.utc),
+                )
+            )
+
+    # act
+    pages = [
+        client.get(
+            f"/api/transactions?page={page}&page_size=2&sort_field=total_cost&sort_type=asc",
+            headers=header,
+        ).json()
+        for page in (1, 2, 3, 4)
+    ]
+    newest = [
+        client.get(f"/api/transactions?page={page}&page_size=2", headers=header).json()
+        for page in (1, 3, 4)
+    ]
+
+    # assert
+    assert [item["total_cost"] for page in pages for item in page["items"]] == [1, 2, 3, None, None]
+    assert [item["id"] for item in pages[2]["items"]] == ["transaction-1"]
+    assert pages[3]["items"] == []
+    assert [page["total_elements"] for page in pages + newest] == [5] * 7
+    assert pages[0]["total_pages"] == 3
+    assert [item["id"] for item in newest[0]["items"]] == ["transaction-4", "transaction-3"]
+    assert [item["id"] for item in newest[1]["items"]] == ["transaction-0"]
+
+
+def test_get_transactions_for_project_fetches_only_cost_fields(application, test_project):
+    """Test that the project transactions are read as lightweight rows"""
+    # arrange
+    from transactions.models import Transaction
+    from transactions.schemas import TransactionCostRow
+    from transactions.use_cases import get_transactions_for_project
+
+    with application.transaction_context() as ctx:
+        ctx["transaction_repository"].add(
+            Transaction(
+                id="transaction-projection",
+                project_id=test_project.id,
+                tags=[],
+                provider="OpenAI",
+                model="gpt-4o",
+                type="chat",
+                os=None,
+                input_tokens=10,
+                output_tokens=10,
+                library="test",
+                status_code=200,
+                messages=[{"role": "user", "content": "x" * 1000}],
+                last_message="x" * 1000,
+                prompt="x" * 1000,
+                error_message=None,
+                generation_speed=None,
+                input_cost=1,
+                output_cost=2,
+                total_cost=3,
+                request_time=datetime(2024, 1, 1, tzinfo=timezone.utc),
+                response_time=datetime(2024, 1, 1, 0, 1, tzinfo=timezone.utc),
+            )
+        )
+
+        # act
+        rows = ctx.call(get_transactions_for_project, project_id=test_project.id)
+        documents = ctx["transaction_repository"].get_for_project(
+            test_project.id, fields=["id", "total_cost"], as_model=False
+        )
+
+    # assert
+    assert rows == [TransactionCostRow(project_id=test_project.id, status_code=200, total_cost=3)]
+    assert documents == [{"id": "transaction-projection", "total_cost": 3}]
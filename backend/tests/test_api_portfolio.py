@@ -136,7 +136,59 @@ class TestPortfolioCostsByTagAPIContract(TestBasePortfolio):
         assert records_1[1]['output_cumulative_total'] == 4379
         assert records_1[1]['total_cost'] == pytest.approx(0, rel=1e-4)
         assert records_1[1]['total_transactions'] == 0
-        
-        
-        
 
+    def test_costs_by_tag_counts_untagged_transactions(self):
+        """Transactions without tags are reported under the untagged-transactions tag."""
+        with self.application.transaction_context() as ctx:
+            repo = ctx["transaction_repository"]
+            transaction = repo.find_one({"tags": "tag-0", "status_code": 200})
+            transaction.id = "untagged-transaction"
+            transaction.tags = []
+            repo.add(transaction)
+
+        response = self.client.get(
+            "/api/portfolio/costs_by_tag?period=year&date_from=2023-01-01&date_to=2024-12-31",
+            headers=self.header,
+        )
+
+        resp_data = response.json()
+        assert response.status_code == 200
+        untagged = [
+            record
+            for row in resp_data
+            for record in row["records"]
+            if record["tag"] == "untagged-transactions"
+        ]
+        assert sum(record["total_transactions"] for record in untagged) == 1
+        assert sum(record["total_input_tokens"] for record in untagged) == (
+            transaction.input_tokens
+        )
+
+
+class TestPortfolioUsageInTime(TestBasePortfolio):
+    """Tests for portfolio usage statistics over time."""
+
+    def test_usage_in_time_keeps_cumulative_totals_of_idle_models(self, test_project):
+        """Models without transactions in a period still count into the cumulative totals."""
+        response = self.client.get(
+            "/api/portfolio/usage_in_time?period=month&date_from=2023-10-01&date_to=2024-01-31",
+            headers=self.header,
+        )
+
+        resp_data = response.json()
+        assert response.status_code == 200
+        assert [row["date"] for row in resp_data] == [
+            "2023-10-31T00:00:00",
+            "2023-11-30T00:00:00",
+            "2023-12-31T00:00:00",
+            "2024-01-31T00:00:00",
+        ]
+        records = [row["records"] for row in resp_data]
+        assert all(len(record) == 1 for record in records)
+        assert all(record[0]["project_name"] == "Autotest" for record in records)
+
+        cumulative = [record[0]["input_cumulative_total"] for record in records]
+        assert cumulative == sorted(cumulative)
+        assert cumulative[-1] == sum(
+            record[0]["total_input_tokens"] for record in records
+        )
@@ -412,3 +412,122 @@ def test_get_projects_with_existing_project_returns_200_and_project_list(client,
     del expected_project["created_at"]
     
     assert response_data[0] == expected_project
+
+
+def test_indexes_are_created_for_repositories(application):
+    from app.app import create_indexes
+
+    with application.transaction_context() as ctx:
+        create_indexes(ctx)
+        db = application["db_client"]
+        project_indexes = db["projects"].index_information()
+        raw_transaction_indexes = db["raw_transactions"].index_information()
+        transaction_indexes = db["transactions"].index_information()
+
+    assert project_indexes["slug_1"]["unique"] is True
+    assert "transaction_id_1_type_1" in raw_transaction_indexes
+    assert "project_id_1_response_time_1" in transaction_indexes
+
+
+def test_slug_taken_after_the_check_returns_400(
+    client, application, test_project, monkeypatch
+):
+    from app.app import create_indexes
+    from projects.repositories import ProjectRepository
+
+    with application.transaction_context() as ctx:
+        create_indexes(ctx)
+    # another request takes the slug between the check and the write
+    monkeypatch.setattr(
+        ProjectRepository, "find", lambda self, filter_by=None, **kwargs: []
+    )
+    monkeypatch.setattr(
+        ProjectRepository,
+        "count",
+        lambda self, filter_by=None: 0 if "slug" in (filter_by or {}) else 1,
+    )
+    project_data = {
+        "name": "Duplicate",
+        "slug": test_project.slug,
+        "description": "",
+        "ai_providers": [],
+        "tags": [],
+        "org_id": test_project.org_id,
+    }
+
+    created = client.post("/api/projects", headers=header, json=project_data)
+    other = client.post(
+        "/api/projects", headers=header, json={**project_data, "slug": "other"}
+    )
+    updated = client.put(
+        f"/api/projects/{other.json()['id']}",
+        headers=header,
+        json={"slug": test_project.slug},
+    )
+
+    assert created.status_code == 400
+    assert created.json() == {"message": f"Slug already exists: {test_project.slug}"}
+    assert other.status_code == 201
+    assert updated.status_code == 400
+    assert updated.json() == {"message": f"Slug already exists: {test_project.slug}"}
+
+
+def test_project_totals_are_counted_on_write_and_rebuilt(client, application, test_project):
+    from transactions.schemas import CreateTransactionSchema
+    from transactions.use_cases import add_transaction
+
+    with application.transaction_context() as ctx:
+        for status_code, total_cost in [(200, 1.5), (200, 2), (500, 0.5)]:
+            ctx.call(
+                add_transaction,
+                data=CreateTransactionSchema(
+                    project_id=test_project.id,
+                    tags=[],
+                    provider="OpenAI",
+                    model="gpt-4o",
+                    type="chat",
+                    os=None,
+                    input_tokens=10,
+                    output_tokens=10,
+                    library="test",
+                    status_code=status_code,
+                    messages=None,
+                    last_message=None,
+                    prompt="",
+                    error_message=None,
+                    generation_speed=None,
+                    input_cost=None,
+                    output_cost=None,
+                    total_cost=total_cost,
+                    request_time=datetime(2024, 1, 1, tzinfo=timezone.utc),
+                    response_time=datetime(2024, 1, 1, 0, 1, tzinfo=timezone.utc),
+                ),
+            )
+
+    details = client.get(f"/api/projects/{test_project.id}", headers=header).json()
+    projects = client.get("/api/projects", headers=header).json()
+    with application.transaction_context() as ctx:
+        ctx["project_stats_repository"].remove_all()
+    rebuilt = client.post("/api/system/project_stats/rebuild", headers=header).json()
+    portfolio = client.get("/api/portfolio/details", headers=header).json()
+
+    assert (details["total_transactions"], details["total_cost"]) == (3, 4)
+    assert (projects[0]["total_transactions"], projects[0]["total_cost"]) == (3, 3.5)
+    assert rebuilt == {"projects": 1}
+    assert (portfolio["total_transactions"], portfolio["total_cost"]) == (3, 4)
+
+
+def test_project_totals_include_mocked_transactions(client, test_project):
+    client.post(
+        "/api/only_for_purpose/mock_transactions?count=20"
+        "&date_from=2023-11-01T00:00:00&date_to=2023-11-30T23:59:59",
+        headers=header,
+    )
+    seeded = client.get("/api/projects", headers=header).json()
+    client.post("/api/only_for_purpose/remove_mocked_transactions", headers=header)
+    removed = client.get("/api/projects", headers=header).json()
+    portfolio = client.get("/api/portfolio/details", headers=header).json()
+
+    assert seeded[0]["total_transactions"] == 20
+    assert removed[0]["total_transactions"] == 0
+    assert portfolio["total_transactions"] == 0
@@ -0,0 +1,83 @@
+import asyncio
+import json
+import time
+
+import httpx
+import jwt
+import pytest
+from auth.models import User
+from auth.tokens import JWKSKeyStore, TokenUserCache
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+ISSUER = "https://login.example.com"
+
+
+def signing_key(kid):
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    jwk = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(key.public_key()))
+    return key, {**jwk, "kid": kid, "use": "sig", "alg": "RS256"}
+
+
+@pytest.fixture
+def issuer():
+    """An OpenID Connect issuer counting the requests for its configuration and keys."""
+    state = {"keys": [signing_key("key-1")], "requests": []}
+
+    def handler(request):
+        state["requests"].append(request.url.path)
+        if request.url.path == "/.well-known/openid-configuration":
+            return httpx.Response(200, json={"jwks_uri": f"{ISSUER}/keys"})
+        return httpx.Response(200, json={"keys": [jwk for _, jwk in state["keys"]]})
+
+    state["transport"] = httpx.MockTransport(handler)
+    return state
+
+
+def test_key_set_is_fetched_once_within_ttl(issuer):
+    store = JWKSKeyStore(transport=issuer["transport"])
+
+    async def get_keys():
+        return [await store.get_signing_key(ISSUER, "key-1") for _ in range(3)]
+
+    keys = asyncio.run(get_keys())
+    token = jwt.encode({"sub": "user"}, issuer["keys"][0][0], "RS256")
+
+    assert jwt.decode(token, keys[-1].key, ["RS256"]) == {"sub": "user"}
+    assert issuer["requests"] == ["/.well-known/openid-configuration", "/keys"]
+
+
+def test_unknown_key_id_refreshes_key_set(issuer):
+    store = JWKSKeyStore(transport=issuer["transport"], min_refresh_interval=0)
+    asyncio.run(store.get_signing_key(ISSUER, "key-1"))
+    issuer["keys"].append(signing_key("key-2"))
+
+    key = asyncio.run(store.get_signing_key(ISSUER, "key-2"))
+
+    assert key.key_id == "key-2"
+    assert len(issuer["requests"]) == 4
+
+
+def test_unknown_key_id_does_not_refresh_key_set_within_min_refresh_interval(issuer):
+    store = JWKSKeyStore(transport=issuer["transport"])
+    asyncio.run(store.get_signing_key(ISSUER, "key-1"))
+
+    with pytest.raises(jwt.exceptions.PyJWKClientError):
+        asyncio.run(store.get_signing_key(ISSUER, "key-2"))
+    assert len(issuer["requests"]) == 2
+
+
+def test_users_are_cached_until_token_expires():
+    cache = TokenUserCache()
+    user = User(
+        external_id="user",
+        email="user@example.com",
+        given_name="Test",
+        family_name="User",
+        issuer=ISSUER,
+    )
+    cache.set("valid-token", user, exp=time.time() + 60)
+    cache.set("expired-token", user, exp=time.time() - 1)
+
+    assert cache.get("valid-token") is user
+    assert cache.get("expired-token") is None
+    assert cache.get("unknown-token") is None
@@ -0,0 +1,55 @@
+import asyncio
+
+from lato import TransactionContext
+from projects.repositories import ProjectRepository
+
+
+def test_transaction_contexts_share_repositories(application):
+    with application.transaction_context() as first:
+        with application.transaction_context() as second:
+            assert first["project_repository"] is second["project_repository"]
+            assert first["correlation_id"] != second["correlation_id"]
+
+
+def test_dependencies_registered_in_transaction_context_are_not_shared(application):
+    def resolve(ctx: TransactionContext, project_repository: ProjectRepository):
+        return ctx, project_repository
+
+    with application.transaction_context() as first:
+        with application.transaction_context() as second:
+            assert first.call(resolve)[0] is first
+            assert second.call(resolve) == (second, first["project_repository"])
+            assert first["ctx"] is first
+
+
+def test_async_repositories_use_a_motor_client_per_event_loop(application):
+    pool = application["async_db_client"]
+    with application.transaction_context() as ctx:
+        repository = ctx["async_project_repository"]
+
+    async def client_of_loop():
+        assert not await repository.exists()
+        return pool.get_database().client
+
+    first = asyncio.run(client_of_loop())
+    second = asyncio.run(client_of_loop())
+
+    assert first is not second
+    assert list(pool._clients.values()) == [second]
+    pool.close()
+    assert pool._clients == {}
+
+
+def test_shared_async_repositories_serve_transaction_contexts_of_any_event_loop(
+    application,
+):
+    async def find_projects():
+        with application.transaction_context() as ctx:
+            repository = ctx["async_project_repository"]
+            return repository, await repository.find()
+
+    first, first_projects = asyncio.run(find_projects())
+    second, second_projects = asyncio.run(find_projects())
+
+    assert first is second
+    assert first_projects == second_projects == []
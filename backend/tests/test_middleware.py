@@ -0,0 +1,54 @@
+import pytest
+from app.middleware import ExceptionHandlerMiddleware, TransactionContextMiddleware
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+
+@pytest.fixture
+def middleware_client(fastapi_instance):
+    app = FastAPI()
+    app.container = fastapi_instance.container
+    app.add_middleware(ExceptionHandlerMiddleware)
+    app.add_middleware(TransactionContextMiddleware)
+    exits = []
+
+    @app.get("/stream")
+    async def stream(request: Request):
+        ctx = request.state.transaction_context
+        ctx.configure(
+            on_exit_transaction_context=lambda ctx, exception: exits.append(exception)
+        )
+
+        async def iterate():
+            for chunk in (b"first", b"second"):
+                yield chunk
+            # The transaction context is still open after the last chunk
+            yield str(len(exits)).encode()
+
+        return StreamingResponse(iterate())
+
+    @app.get("/error")
+    async def error():
+        raise RuntimeError("unexpected")
+
+    client = TestClient(app)
+    client.exits = exits
+    return client
+
+
+def test_transaction_context_is_exited_after_the_streamed_response(middleware_client):
+    response = middleware_client.get("/stream")
+
+    assert response.content == b"firstsecond0"
+    assert middleware_client.exits == [None]
+
+
+def test_unhandled_exception_returns_internal_server_error(middleware_client):
+    response = middleware_client.get("/error")
+
+    assert response.status_code == 500
+    assert response.json() == {
+        "error": "Internal Server Error",
+        "message": "An unexpected error occurred.",
+    }
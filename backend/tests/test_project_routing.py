@@ -0,0 +1,74 @@
+import asyncio
+
+from projects.models import AIProvider, Project
+from projects.routing import ProjectRoutingTable
+from projects.use_cases import get_project_route_async
+from test_api_projects import header
+
+
+def make_project(slug="autotest", api_base="https://api.openai.com/v1"):
+    return Project(
+        id="project-test",
+        name="Autotest",
+        slug=slug,
+        description="",
+        ai_providers=[
+            AIProvider(
+                deployment_name="openai",
+                slug="openai",
+                api_base=api_base,
+                description="",
+                provider_name="OpenAI",
+            )
+        ],
+        tags=[],
+        org_id="test-organization",
+        owner="test@example.com",
+    )
+
+
+def test_routes_follow_changed_slugs_and_removed_projects():
+    table = ProjectRoutingTable()
+    table.set(make_project())
+    table.set(make_project(slug="renamed", api_base="https://example.com/v1"))
+
+    assert table.get("autotest") is None
+    assert table.get("renamed").api_bases == {"openai": "https://example.com/v1"}
+
+    table.remove("project-test")
+    assert table.get("renamed") is None
+
+
+def test_expired_routes_are_not_returned():
+    table = ProjectRoutingTable(ttl=0)
+    table.load([make_project()])
+
+    assert table.get("autotest") is None
+
+
+def test_route_is_read_from_database_only_on_miss(application, fastapi_instance):
+    routing_table = fastapi_instance.container.project_routing_table()
+    with application.transaction_context() as ctx:
+        ctx["project_repository"].add(make_project())
+
+        route = asyncio.run(ctx.call_async(get_project_route_async, slug="autotest"))
+        ctx["project_repository"].delete("project-test")
+        cached = asyncio.run(ctx.call_async(get_project_route_async, slug="autotest"))
+
+    assert route.api_bases == {"openai": "https://api.openai.com/v1"}
+    assert cached is route is routing_table.get("autotest")
+
+
+def test_project_changes_update_routes(client, fastapi_instance):
+    routing_table = fastapi_instance.container.project_routing_table()
+    project = make_project().model_dump(exclude={"id", "created_at"})
+
+    project_id = client.post("/api/projects", headers=header, json=project).json()["id"]
+    assert routing_table.get("autotest").project_id == project_id
+
+    client.put(f"/api/projects/{project_id}", headers=header, json={"slug": "renamed"})
+    assert routing_table.get("autotest") is None
+    assert routing_table.get("renamed").project_id == project_id
+
+    client.delete(f"/api/projects/{project_id}", headers=header)
+    assert routing_table.get("renamed") is None
@@ -0,0 +1,175 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from config.containers import create_response_cache
+from seedwork.cache import (
+    InMemoryCacheBackend,
+    ResponseCache,
+    ResponseCacheBackend,
+    load_cache_backend,
+)
+from test_api_projects import header
+from test_utils import read_transactions_from_csv, transaction_data
+from transactions.use_cases import add_transaction, delete_multiple_transactions
+
+
+def test_in_memory_backend_evicts_least_recently_used_entries():
+    backend = InMemoryCacheBackend(max_entries=2)
+    backend.set("a", [1], None, "project:a")
+    backend.set("b", [2], None, "project:b")
+    backend.get("a")
+    backend.set("c", [3], None, "project:c")
+
+    assert backend.get("a") == [1]
+    assert backend.get("b") is None
+    assert backend.get("c") == [3]
+    assert backend.size() == 2
+
+
+def test_in_memory_backend_expires_entries():
+    backend = InMemoryCacheBackend()
+    backend.set("a", [1], 0, "project:a")
+    backend.set("b", [2], None, "project:b")
+
+    assert backend.get("a") is None
+    assert backend.get("b") == [2]
+
+
+class IncompleteCacheBackend(ResponseCacheBackend):
+    def get(self, key):
+        return None
+
+
+def test_incomplete_backend_fails_when_it_is_loaded():
+    with pytest.raises(TypeError):
+        load_cache_backend("test_response_cache:IncompleteCacheBackend")
+
+
+DATE_FROM = datetime(2023, 11, 1)
+
+
+def lookup(cache, project_id, date_to, value="new"):
+    return cache.get_or_compute(
+        lambda: [value], "stats", project_id, DATE_FROM, date_to
+    )
+
+
+def test_invalidation_removes_project_and_portfolio_entries():
+    cache = ResponseCache(InMemoryCacheBackend())
+    date_to = datetime(2023, 11, 30)
+    for project_id in ("project-a", "project-b", None):
+        lookup(cache, project_id, date_to, value="old")
+
+    assert cache.invalidate(["project-a"]) == 2
+    assert lookup(cache, "project-a", date_to) == ["new"]
+    assert lookup(cache, "project-b", date_to) == ["old"]
+    assert lookup(cache, None, date_to) == ["new"]
+
+
+def test_response_computed_while_invalidated_is_not_stored():
+    cache = ResponseCache(InMemoryCacheBackend())
+    date_to = datetime(2023, 11, 30)
+
+    def compute_during_write():
+        # a transaction of the project is stored while the response is computed
+        cache.invalidate(["project-a"])
+        return ["stale"]
+
+    assert lookup(cache, "project-b", date_to, value="old") == ["old"]
+    assert cache.get_or_compute(
+        compute_during_write, "stats", "project-a", DATE_FROM, date_to
+    ) == ["stale"]
+    assert lookup(cache, "project-a", date_to) == ["new"]
+    assert lookup(cache, "project-b", date_to) == ["old"]
+
+
+def test_only_open_date_ranges_expire():
+    cache = ResponseCache(InMemoryCacheBackend(), ttl=0)
+    closed_date_to = datetime(2023, 11, 30)
+    open_date_to = datetime.now(tz=timezone.utc) + timedelta(days=1)
+    lookup(cache, "project-a", closed_date_to, value="old")
+    lookup(cache, "project-a", open_date_to, value="old")
+
+    assert lookup(cache, "project-a", closed_date_to) == ["old"]
+    assert lookup(cache, "project-a", open_date_to) == ["new"]
+
+
+def test_closed_date_ranges_of_the_in_memory_cache_expire_after_ttl(test_config):
+    in_memory = create_response_cache(test_config.model_copy())
+    shared = create_response_cache(
+        test_config.model_copy(
+            update={"RESPONSE_CACHE_BACKEND": "seedwork.cache:InMemoryCacheBackend"}
+        )
+    )
+    configured = create_response_cache(
+        test_config.model_copy(update={"RESPONSE_CACHE_CLOSED_TTL": 3600.0})
+    )
+
+    assert test_config.RESPONSE_CACHE_CLOSED_TTL is None
+    assert in_memory.closed_ttl == test_config.RESPONSE_CACHE_TTL
+    assert shared.closed_ttl is None
+    assert configured.closed_ttl == 3600.0
+
+
+def test_keys_of_the_same_moment_in_different_time_zones_are_equal():
+    utc = datetime(2023, 11, 1, 12, tzinfo=timezone.utc)
+    cet = datetime(2023, 11, 1, 13, tzinfo=timezone(timedelta(hours=1)))
+
+    assert ResponseCache.key(
+        "stats", "project-a", utc, utc, "day"
+    ) == ResponseCache.key("stats", "project-a", cet, datetime(2023, 11, 1, 12), "day")
+
+
+def get_cost_statistics(client):
+    response = client.get(
+        "/api/statistics/transactions_cost?project_id=project-test&period=day"
+        "&date_from=2023-11-01T00:00:00&date_to=2023-11-30T23:59:59",
+        headers=header,
+    )
+    assert response.status_code == 200
+    return response.json()
+
+
+def count_transactions(statistics):
+    return sum(
+        record["total_transactions"]
+        for bucket in statistics
+        for record in bucket["records"]
+    )
+
+
+def get_cache_stats(client):
+    response = client.get("/api/system/cache", headers=header)
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_statistics_are_served_from_cache_until_transactions_are_written(
+    client, application
+):
+    with application.transaction_context() as ctx:
+        repo = ctx["transaction_repository"]
+        for transaction in read_transactions_from_csv("test_transactions.csv"):
+            repo.add(transaction)
+
+    before = get_cache_stats(client)
+    first = get_cost_statistics(client)
+    second = get_cost_statistics(client)
+    stats = get_cache_stats(client)
+
+    assert first == second
+    assert stats["hits"] - before["hits"] == 1
+    assert stats["misses"] - before["misses"] == 1
+    assert stats["entries"] == 1
+
+    with application.transaction_context() as ctx:
+        ctx.call(add_transaction, data=transaction_data())
+
+    after_write = get_cost_statistics(client)
+    assert count_transactions(after_write) == count_transactions(first) + 1
+    assert get_cache_stats(client)["invalidated"] - before["invalidated"] == 1
+
+    with application.transaction_context() as ctx:
+        ctx.call(delete_multiple_transactions, project_id="project-test")
+
+    assert get_cost_statistics(client) == []
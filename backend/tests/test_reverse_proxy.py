@@ -0,0 +1,34 @@
+import asyncio
+
+import httpx
+from app.reverse_proxy import iterate_stream
+
+
+class UpstreamStream(httpx.AsyncByteStream):
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.closed = False
+
+    async def __aiter__(self):
+        for chunk in self.chunks:
+            yield chunk
+
+    async def aclose(self):
+        self.closed = True
+
+
+def test_upstream_response_is_closed_when_the_client_disconnects():
+    stream = UpstreamStream([b"first", b"second"])
+    response = httpx.Response(200, stream=stream)
+    buffer = []
+
+    async def disconnect_after_first_chunk():
+        chunks = iterate_stream(response, buffer)
+        await chunks.__anext__()
+        await chunks.aclose()
+
+    asyncio.run(disconnect_after_first_chunk())
+
+    assert buffer == [b"first"]
+    assert stream.closed
+    assert response.is_closed
@@ -0,0 +1,197 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from test_api_projects import header
+from test_utils import read_transactions_from_csv, transaction_data
+from transactions.models import Transaction
+from transactions.use_cases import (
+    add_transaction,
+    compact_transaction_rollups,
+    rebuild_transaction_rollups,
+)
+
+
+def rounded(value):
+    if isinstance(value, float):
+        return round(value, 6)
+    if isinstance(value, list):
+        return [rounded(item) for item in value]
+    if isinstance(value, dict):
+        return {key: rounded(item) for key, item in value.items()}
+    return value
+
+
+def get_statistics(client, endpoint, period, date_from, date_to):
+    response = client.get(
+        f"/api/statistics/{endpoint}?project_id=project-test&period={period}"
+        f"&date_from={date_from}&date_to={date_to}",
+        headers=header,
+    )
+    assert response.status_code == 200
+    return rounded(response.json())
+
+
+@pytest.fixture
+def rollups(application):
+    with application.transaction_context() as ctx:
+        repo = ctx["transaction_repository"]
+        for transaction in read_transactions_from_csv("test_transactions.csv"):
+            repo.add(transaction)
+        ctx.call(rebuild_transaction_rollups)
+        yield ctx["transaction_rollup_repository"]
+
+
+@pytest.mark.parametrize(
+    "endpoint, period, date_from, date_to",
+    [
+        ("transactions_count", "day", "2023-11-01T00:00:00", "2023-11-30T23:59:59"),
+        ("transactions_count", "week", "2023-11-01T00:00:00", "2024-03-31T23:59:59"),
+        ("transactions_count", "month", "2023-11-01T00:00:00", "2024-03-31T23:59:59"),
+        ("transactions_cost", "hour", "2023-11-01T12:00:00", "2023-11-01T13:59:59"),
+        ("transactions_cost", "day", "2023-11-01T12:03:00", "2023-11-02T23:59:59"),
+        (
+            "transactions_speed",
+            "5minutes",
+            "2023-11-01T12:00:00",
+            "2023-11-01T12:59:59",
+        ),
+        ("transactions_speed", "day", "2023-11-01T00:00:00", "2024-03-31T23:59:59"),
+    ],
+)
+def test_statistics_from_rollups_match_transactions(
+    client, rollups, endpoint, period, date_from, date_to
+):
+    from_rollups = get_statistics(client, endpoint, period, date_from, date_to)
+    rollups.delete(rollups.state_id)
+    client.app.container.response_cache().clear()
+    from_transactions = get_statistics(client, endpoint, period, date_from, date_to)
+
+    assert from_rollups == from_transactions
+    assert len(from_rollups) > 0
+
+
+def test_transactions_stored_after_compaction_are_added_to_coarser_rollups(
+    client, application, rollups
+):
+    def daily_statistics():
+        return [
+            get_statistics(
+                client, endpoint, "day", "2023-11-01T00:00:00", "2023-11-30T23:59:59"
+            )
+            for endpoint in (
+                "transactions_count",
+                "transactions_cost",
+                "transactions_speed",
+            )
+        ]
+
+    with application.transaction_context() as ctx:
+        ctx.call(add_transaction, data=transaction_data())
+        stale = rollups.get_stale_buckets()
+        from_stale_rollups = daily_statistics()
+        ctx.call(compact_transaction_rollups)
+
+    from_rollups = daily_statistics()
+    rollups.delete(rollups.state_id)
+    client.app.container.response_cache().clear()
+    from_transactions = daily_statistics()
+
+    assert stale == {
+        "hour": {datetime(2023, 11, 1, 12): 1},
+        "day": {datetime(2023, 11, 1): 1},
+    }
+    assert rollups.get_stale_buckets() == {"hour": {}, "day": {}}
+    assert from_stale_rollups == from_transactions
+    assert from_rollups == from_transactions
+
+
+def total_transactions(rollups, granularity):
+    return sum(
+        rollup["total_transactions"]
+        for rollup in rollups._collection.find({"granularity": granularity})
+    )
+
+
+def test_transactions_stored_while_compacting_are_added_to_coarser_rollups(rollups):
+    now = datetime.now(tz=timezone.utc)
+    set_watermarks = rollups.set_watermarks
+    added = []
+
+    def add_before_watermark(watermarks):
+        # the transaction is added after the buckets were aggregated
+        # but sees the watermarks from before the compaction
+        if not added:
+            transaction = Transaction(
+                **transaction_data(
+                    request_time=now - timedelta(seconds=2), response_time=now
+                ).model_dump()
+            )
+            rollups.add_transactions([transaction])
+            added.append(transaction)
+        return set_watermarks(watermarks)
+
+    rollups.set_watermarks = add_before_watermark
+    rollups.compact(now + timedelta(days=2))
+    del rollups.set_watermarks
+
+    assert added
+    assert rollups.get_stale_buckets() == {"hour": {}, "day": {}}
+    assert total_transactions(rollups, "hour") == total_transactions(
+        rollups, "5minutes"
+    )
+    assert total_transactions(rollups, "day") == total_transactions(rollups, "5minutes")
+
+
+def test_compaction_and_rebuild_are_skipped_while_the_lock_is_held(
+    application, rollups
+):
+    token = rollups.acquire_lock(timedelta(minutes=1))
+
+    with application.transaction_context() as ctx:
+        compacted = ctx.call(compact_transaction_rollups)
+        rebuilt = ctx.call(rebuild_transaction_rollups)
+        assert rollups.acquire_lock(timedelta(minutes=1)) is None
+        rollups.release_lock(token)
+        rebuilt_if_missing = ctx.call(rebuild_transaction_rollups, only_missing=True)
+
+    assert token is not None
+    assert compacted is None
+    assert rebuilt is None
+    assert rebuilt_if_missing is None
+    assert total_transactions(rollups, "5minutes") > 0
+
+
+def test_mocked_transactions_are_counted_in_statistics(client, application):
+    with application.transaction_context() as ctx:
+        ctx.call(rebuild_transaction_rollups)
+        assert ctx["transaction_rollup_repository"].get_watermarks() is not None
+
+    def count_transactions():
+        statistics = get_statistics(
+            client,
+            "transactions_count",
+            "month",
+            "2023-11-01T00:00:00",
+            "2023-11-30T23:59:59",
+        )
+        return sum(
+            record[status]
+            for record in statistics
+            for status in ("status_200", "status_300", "status_400", "status_500")
+        )
+
+    response = client.post(
+        "/api/only_for_purpose/mock_transactions?count=50"
+        "&date_from=2023-11-01T00:00:00&date_to=2023-11-30T23:59:59",
+        headers=header,
+    )
+    assert response.status_code == 200
+    seeded = count_transactions()
+
+    response = client.post(
+        "/api/only_for_purpose/remove_mocked_transactions", headers=header
+    )
+    assert response.status_code == 200
+
+    assert seeded == 50
+    assert count_transactions() == 0
@@ -0,0 +1,97 @@
+import asyncio
+
+import app.transaction_writer
+from app.transaction_writer import OverflowPolicy, TransactionWriter
+from test_utils import transaction_data
+from transactions.models import Transaction
+
+
+def test_writer_flushes_queue_on_stop(application, monkeypatch):
+    written = []
+    writer = TransactionWriter(application, queue_size=10, workers=2, batch_size=3)
+    monkeypatch.setattr(writer, "_write_batch", lambda batch: written.extend(batch))
+
+    async def run():
+        writer.start()
+        for idx in range(7):
+            await writer.submit({"idx": idx})
+        await writer.stop()
+
+    asyncio.run(run())
+
+    stats = writer.stats()
+    assert sorted(item["idx"] for item in written) == list(range(7))
+    assert stats["running"] is False
+    assert stats["enqueued"] == 7
+    assert stats["queue_size"] == 0
+
+
+def test_writer_drops_newest_when_queue_is_full(application, monkeypatch):
+    written = []
+    writer = TransactionWriter(
+        application,
+        queue_size=2,
+        workers=1,
+        overflow_policy=OverflowPolicy.drop_newest,
+    )
+    monkeypatch.setattr(writer, "_write_batch", lambda batch: written.extend(batch))
+
+    async def run():
+        writer.start()
+        for idx in range(5):
+            await writer.submit({"idx": idx})
+        await writer.stop()
+
+    asyncio.run(run())
+
+    stats = writer.stats()
+    assert stats["dropped"] == 3
+    assert stats["high_watermark"] == 2
+    assert [item["idx"] for item in written] == [0, 1]
+
+
+def test_writer_writes_inline_when_not_started(application, monkeypatch):
+    written = []
+    writer = TransactionWriter(application)
+    monkeypatch.setattr(writer, "_write_batch", lambda batch: written.extend(batch))
+
+    asyncio.run(writer.submit({"idx": 0}))
+
+    assert written == [{"idx": 0}]
+    assert writer.stats()["enqueued"] == 0
+
+
+def test_writer_counts_each_failed_transaction_once(application, monkeypatch):
+    def prepare_transaction(idx, **kwargs):
+        if idx == 0:
+            raise ValueError("Invalid transaction")
+        transaction = Transaction(**transaction_data().model_dump())
+        return dict(transaction=transaction, request_content={}, response_content={})
+
+    def add_many(transactions):
+        raise ConnectionError("Database is down")
+
+    monkeypatch.setattr(
+        app.transaction_writer, "prepare_transaction", prepare_transaction
+    )
+    monkeypatch.setattr(
+        app.transaction_writer, "prepare_raw_transactions", lambda **kwargs: []
+    )
+    with application.transaction_context() as ctx:
+        monkeypatch.setattr(ctx["transaction_repository"], "add_many", add_many)
+    writer = TransactionWriter(application, workers=1, batch_size=3)
+
+    async def run():
+        writer.start()
+        for idx in range(3):
+            await writer.submit(
+                {"idx": idx, "ai_provider_request": None, "ai_provider_response": None}
+            )
+        await writer.stop()
+
+    asyncio.run(run())
+
+    stats = writer.stats()
+    assert stats["failed"] == 3
+    assert stats["written"] == 0
+    assert stats["batches"] == 0
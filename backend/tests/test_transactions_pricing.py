@@ -229,3 +229,20 @@ def test_anthropic_costs(client, application):
     assert case4["total_cost"] - 0.00001 <= 0.049290000 <= case4["total_cost"] + 0.00001
     assert case5["total_cost"] - 0.00001 <= 0.007581000 <= case5["total_cost"] + 0.00001
     assert case6["total_cost"] - 0.00001 <= 0.000845600 <= case6["total_cost"] + 0.00001
+
+
+def test_pricing_engine_resolves_and_caches_prices(test_config):
+    from utils import PricingEngine, read_provider_pricelist
+
+    engine = PricingEngine(read_provider_pricelist(test_config.PRICE_LIST_PATH))
+
+    input_cost, output_cost, total_cost = engine.price("OpenAI", "gpt-3.5-turbo-0125", 1000, 2000)
+    engine.price("OpenAI", "gpt-3.5-turbo-0125", 10, 20)
+
+    assert input_cost == 0.0005
+    assert output_cost == 0.003
+    assert total_cost == input_cost + output_cost
+    assert engine.get_price.cache_info().hits == 1
+    assert engine.price("OpenAI", "standard/1024x1024/dall-e-3", 0, 0, n_images=2) == (0, 0.08, 0.08)
+    assert engine.price("OpenAI", "gpt-5-future-model", 100, 50) == (None, None, None)
+    assert engine.price("Unknown provider", "gpt-3.5-turbo-0125", 100, 50) == (None, None, None)
@@ -1,9 +1,25 @@
-from utils import detect_subdomain, read_provider_pricelist
+import base64
+import copy
+import io
+import json
 
-from datetime import datetime, timedelta
+import httpx
+import utils
+from utils import (
+    StreamAccumulator,
+    TransactionParamExtractor,
+    decode_request_content,
+    detect_provider_pattern,
+    detect_subdomain,
+    read_provider_pricelist,
+)
+
+from datetime import datetime, timedelta, timezone
 import pandas as pd
 import re
+from PIL import Image
 from transactions.models import Transaction
+from transactions.schemas import CreateTransactionSchema
 from pathlib import Path
 
 
@@ -238,4 +254,245 @@ def read_transactions_with_prices_from_csv(fixture_file_name: str, providers_pri
                     total_cost=0,
                 )
             )
-    return transactions
\ No newline at end of file
+    return transactions
+
+
+def transaction_data(**fields) -> CreateTransactionSchema:
+    """
+    Create the data of a successful chat transaction of the test project.
+
+    :param fields: The fields overriding the defaults.
+    :return: The CreateTransactionSchema object.
+    """
+    return CreateTransactionSchema(
+        **{
+            "project_id": "project-test",
+            "tags": [],
+            "provider": "Azure",
+            "model": "gpt-35-turbo",
+            "type": "chat",
+            "os": None,
+            "input_tokens": 10,
+            "output_tokens": 20,
+            "library": "test",
+            "status_code": 200,
+            "messages": None,
+            "last_message": None,
+            "prompt": "",
+            "error_message": None,
+            "generation_speed": 10,
+            "input_cost": 1,
+            "output_cost": 2,
+            "total_cost": 3,
+            "request_time": datetime(2023, 11, 1, 12, 2, tzinfo=timezone.utc),
+            "response_time": datetime(2023, 11, 1, 12, 2, 2, tzinfo=timezone.utc),
+            **fields,
+        }
+    )
+
+
+def _sse_event(payload):
+    return f"data: {json.dumps(payload)}\n\n"
+
+
+def test_stream_accumulator_reconstructs_chat_completion_from_split_chunks():
+    chunk = dict(
+        id="chatcmpl-1", created=1700000000, model="gpt-4o", system_fingerprint="fp"
+    )
+    stream = (
+        _sse_event(
+            {
+                **chunk,
+                "choices": [
+                    {"index": 0, "delta": {"role": "assistant", "content": ""}}
+                ],
+            }
+        )
+        + _sse_event(
+            {**chunk, "choices": [{"index": 0, "delta": {"content": "Zażółć"}}]}
+        )
+        + _sse_event(
+            {**chunk, "choices": [{"index": 0, "delta": {"content": " gęślą"}}]}
+        )
+        + _sse_event(
+            {**chunk, "choices": [{"index": 0, "delta": {}, "finish_reason": "length"}]}
+        )
+        + _sse_event(
+            {
+                **chunk,
+                "choices": [],
+                "usage": {
+                    "prompt_tokens": 7,
+                    "completion_tokens": 3,
+                    "total_tokens": 10,
+                },
+            }
+        )
+        + "data: [DONE]\n\n"
+    ).encode("utf-8")
+
+    accumulator = StreamAccumulator()
+    for idx in range(0, len(stream), 7):
+        accumulator.feed(stream[idx : idx + 7])
+    accumulator.close()
+    response = accumulator.build(request=None)
+
+    assert response["id"] == "chatcmpl-1"
+    assert response["model"] == "gpt-4o"
+    assert response["choices"][0]["message"] == {
+        "role": "assistant",
+        "content": "Zażółć gęślą",
+    }
+    assert response["choices"][0]["finish_reason"] == "length"
+    assert response["usage"]["total_tokens"] == 10
+    assert accumulator.events == 5
+
+
+def test_stream_accumulator_counts_tokens_when_usage_is_missing(monkeypatch):
+    monkeypatch.setattr(
+        utils,
+        "count_tokens_for_streaming_response",
+        lambda messages, model: (
+            len(messages) if isinstance(messages, list) else len(messages.split())
+        ),
+    )
+    request = httpx.Request(
+        "POST",
+        "https://api.openai.com/v1/chat/completions",
+        content=json.dumps({"messages": [{"role": "user", "content": "Hi"}]}),
+    )
+    chunk = dict(
+        id="chatcmpl-2", created=1700000000, model="gpt-4o", system_fingerprint=None
+    )
+
+    accumulator = StreamAccumulator()
+    accumulator.feed(
+        _sse_event(
+            {**chunk, "choices": [{"index": 0, "delta": {"content": "Hello there"}}]}
+        ).encode()
+    )
+    accumulator.feed(
+        b'data: {"id": "chatcmpl-2", "choices": [{"index": 0, "delta": {"content": " friend"}}]}'
+    )
+    accumulator.close()
+    response = accumulator.build(request)
+
+    assert response["choices"][0]["message"]["content"] == "Hello there friend"
+    assert response["choices"][0]["finish_reason"] == "stop"
+    assert response["usage"] == dict(
+        prompt_tokens=1, completion_tokens=3, total_tokens=4
+    )
+
+
+def test_get_encoder_caches_encoders_and_falls_back_for_unknown_models(monkeypatch):
+    loaded = []
+
+    def get_encoding(name):
+        loaded.append(name)
+        return f"encoder-{name}"
+
+    monkeypatch.setattr(utils.tiktoken, "get_encoding", get_encoding)
+    monkeypatch.setattr(utils, "_encoders_by_name", {})
+    monkeypatch.setattr(utils, "_encoders_by_model", {})
+
+    assert utils.get_encoder("gpt-4o") == "encoder-o200k_base"
+    assert utils.get_encoder("gpt-4o-2024-08-06") == "encoder-o200k_base"
+    assert utils.get_encoder("claude-3-opus") == f"encoder-{utils.FALLBACK_ENCODING}"
+    assert utils.get_encoder("llama-3-70b") == f"encoder-{utils.FALLBACK_ENCODING}"
+    assert loaded == ["o200k_base", utils.FALLBACK_ENCODING]
+
+
+def test_transaction_param_extractor_detects_provider_pattern_without_query():
+    detect = TransactionParamExtractor._detect_pattern
+
+    assert (
+        detect("https://api.openai.com/v1/chat/completions?tags=dev")
+        == "OpenAI Chat Completions"
+    )
+    assert (
+        detect("https://api.openai.com/v1/completions?tags=chat")
+        == "OpenAI Completions"
+    )
+    assert (
+        detect(
+            "https://x.openai.azure.com/openai/deployments/d/embeddings?api-version=1"
+        )
+        == "Azure Embeddings"
+    )
+    assert detect("http://localhost:11434/api/generate") == "Ollama"
+    assert detect("https://example.com/v1/chat/completions") == "Unsupported"
+    assert detect_provider_pattern.cache_info().currsize > 0
+
+
+def test_transaction_param_extractor_does_not_change_decoded_request():
+    image = io.BytesIO()
+    Image.new("RGB", (512, 512)).save(image, format="PNG")
+    image_url = "data:image/png;base64," + base64.b64encode(image.getvalue()).decode()
+    request = httpx.Request(
+        "POST",
+        "https://api.openai.com/v1/chat/completions",
+        headers={"user-agent": "OpenAI/Python 1.0.0"},
+        content=json.dumps(
+            {
+                "model": "gpt-4o",
+                "messages": [
+                    {"role": "system", "content": "Describe images."},
+                    {
+                        "role": "user",
+                        "content": [
+                            {"type": "text", "text": "What is it?"},
+                            {"type": "image_url", "image_url": {"url": image_url}},
+                        ],
+                    },
+                ],
+            }
+        ),
+    )
+    response_content = {
+        "model": "gpt-4o",
+        "choices": [{"message": {"role": "assistant", "content": "A square."}}],
+        "usage": {"prompt_tokens": 10, "completion_tokens": 3},
+    }
+    response = httpx.Response(200, json=response_content)
+    request_content = decode_request_content(request)
+    decoded = copy.deepcopy(request_content)
+
+    extractor = TransactionParamExtractor(
+        request, response, copy.deepcopy(response_content), request_content
+    )
+    params = extractor.extract()
+
+    assert extractor.request_content is request_content
+    assert request_content == decoded
+    assert extractor.response_content == response_content
+    assert params["prompt"] == "What is it?"
+    assert len(params["messages"]) == 3
+    resized = params["messages"][1]["content"][1]["image_url"]["url"]
+    assert resized != image_url and len(resized) < len(image_url)
+    assert params["messages"][0] is request_content["messages"][0]
+
+
+def test_transaction_param_extractor_resizes_generated_images():
+    image = io.BytesIO()
+    Image.new("RGB", (512, 512)).save(image, format="PNG")
+    b64_image = base64.b64encode(image.getvalue()).decode()
+    request = httpx.Request(
+        "POST",
+        "https://api.openai.com/v1/images/generations",
+        headers={"user-agent": "OpenAI/Python 1.0.0"},
+        content=json.dumps({"model": "dall-e-3", "prompt": "A square."}),
+    )
+    response_content = {"created": 1, "data": [{"b64_json": b64_image}]}
+    response = httpx.Response(200, json=response_content)
+
+    extractor = TransactionParamExtractor(
+        request, response, copy.deepcopy(response_content)
+    )
+    params = extractor.extract()
+
+    resized = params["messages"][1]["content"]
+    assert params["messages"][0] == {"role": "user", "content": "A square."}
+    assert params["messages"][1]["role"] == "system"
+    assert len(resized) < len(b64_image)
+    assert params["last_message"] == resized
+    assert extractor.response_content == response_content